@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+import os
+import json
+import shutil
+import hashlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+########################################################
+#  Parallel, cached MAFFT runner
+#
+#  Every orthogroup FASTA is one job. Jobs run in a bounded pool and each job gets a
+#  fixed MAFFT thread budget, so workers x threads never oversubscribes the machine.
+#  Finished alignments are stored under a hash of the input sequences + aligner
+#  options, which makes reruns skip unchanged groups and lets an interrupted run
+#  resume where it stopped. Failed jobs are retried and then written to a report.
+########################################################
+
+DEFAULT_OPTIONS = ("--anysymbol", "--auto")
+
+
+def _as_command(cmd):
+    return [cmd] if isinstance(cmd, str) else list(cmd)
+
+
+def alignment_key(fasta_path, options=DEFAULT_OPTIONS):
+    """Cache key: SHA-256 of the input FASTA bytes and the aligner options."""
+    h = hashlib.sha256()
+    with open(fasta_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    h.update(json.dumps(list(options)).encode())
+    return h.hexdigest()
+
+
+def run_alignment(fasta_path, cache_path, aligner_cmd, options=DEFAULT_OPTIONS,
+                  threads=1, thread_flag="--thread", timeout=None):
+    """
+    Align one FASTA into `cache_path`.
+
+    Output goes to a temporary file that is only renamed into place once the aligner has
+    exited successfully, so a killed run never leaves a truncated alignment in the cache.
+    """
+    cmd = _as_command(aligner_cmd) + list(options)
+    if thread_flag and threads:
+        cmd += [thread_flag, str(threads)]
+    cmd.append(os.path.abspath(fasta_path))
+
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w") as out:
+            subprocess.run(cmd, stdout=out, stderr=subprocess.PIPE, check=True, text=True, timeout=timeout)
+        if os.path.getsize(tmp_path) == 0:
+            raise RuntimeError("aligner produced an empty alignment")
+        os.replace(tmp_path, cache_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return cache_path
+
+
+def align_groups(group_fastas, aligned_dir, aligner_cmd="mafft", options=DEFAULT_OPTIONS,
+                 max_workers=None, threads_per_job=1, thread_flag="--thread",
+                 cache_dir=None, retries=2, timeout=None):
+    """
+    Align many orthogroup FASTAs in parallel with caching, resume and retries.
+
+    Parameters:
+        group_fastas (dict): {group_id: unaligned FASTA path}
+        aligned_dir (str): Where group_<id>_aligned.fasta files are written
+        aligner_cmd (str or list): Aligner executable, e.g. MAFFT's full path or
+            [sys.executable, "stub_aligner.py"] for a stand-in in tests
+        options (tuple): Aligner options (part of the cache key)
+        max_workers (int, optional): Concurrent jobs (default: CPU count // threads_per_job)
+        threads_per_job (int): Threads given to each aligner process
+        thread_flag (str, optional): Option used to pass the thread count (None to omit it)
+        cache_dir (str, optional): Content-addressed alignment cache (default: <aligned_dir>/.cache)
+        retries (int): Extra rounds for jobs that failed (retried single-threaded)
+        timeout (float, optional): Seconds before an aligner process is killed
+
+    Returns:
+        tuple: ({group_id: aligned FASTA path}, {group_id: error message})
+    """
+    cache_dir = cache_dir or os.path.join(aligned_dir, ".cache")
+    os.makedirs(aligned_dir, exist_ok=True)
+    os.makedirs(cache_dir, exist_ok=True)
+    if max_workers is None:
+        max_workers = max(1, (os.cpu_count() or 1) // max(1, threads_per_job))
+
+    # Groups with identical input share one cache entry and are aligned once
+    cache_of = {grp: os.path.join(cache_dir, alignment_key(fasta_path, options) + ".fasta")
+                for grp, fasta_path in group_fastas.items()}
+    pending = {}
+    for grp, cache_path in cache_of.items():
+        if not os.path.exists(cache_path):
+            pending.setdefault(cache_path, group_fastas[grp])
+    n_cached = sum(os.path.exists(cache_path) for cache_path in cache_of.values())
+    print(f"[INFO] {n_cached} alignments reused from cache, {len(pending)} to run "
+          f"({max_workers} workers x {threads_per_job} threads).")
+
+    errors = {}
+    threads = threads_per_job
+    for attempt in range(retries + 1):
+        if not pending:
+            break
+        if attempt:
+            print(f"[INFO] Retry round {attempt}: {len(pending)} failed alignments.")
+        retry_queue = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(run_alignment, fasta_path, cache_path, aligner_cmd, options,
+                                   threads, thread_flag, timeout): cache_path
+                       for cache_path, fasta_path in pending.items()}
+            for future in as_completed(futures):
+                cache_path = futures[future]
+                try:
+                    future.result()
+                    errors.pop(cache_path, None)
+                except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError, RuntimeError) as e:
+                    errors[cache_path] = (getattr(e, "stderr", None) or str(e)).strip()
+                    retry_queue[cache_path] = pending[cache_path]
+        pending = retry_queue
+        threads = 1  # failures are often memory-related; retry with the smallest footprint
+
+    # Publish alignments under their group names
+    results, failed = {}, {}
+    for grp, cache_path in cache_of.items():
+        if cache_path in errors:
+            failed[grp] = errors[cache_path]
+            continue
+        aligned_out = os.path.join(aligned_dir, f"group_{grp}_aligned.fasta")
+        shutil.copyfile(cache_path, aligned_out)
+        results[grp] = aligned_out
+
+    report = os.path.join(aligned_dir, "failed_alignments.tsv")
+    if os.path.exists(report):
+        os.remove(report)
+    if failed:
+        with open(report, "w") as f:
+            for grp, message in failed.items():
+                f.write(f"{grp}\t{group_fastas[grp]}\t{message.splitlines()[-1] if message else ''}\n")
+        print(f"[ERROR] {len(failed)} groups failed after {retries} retries. See {report}")
+    print(f"[INFO] {len(results)} groups aligned ({n_cached} from cache) in '{aligned_dir}'.")
+    return results, failed
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+import os
+import sys
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from fasta_index import iter_fasta
+
+########################################################
+#  Column trimming of protein alignments (trimAl-like)
+#
+#  Each alignment becomes a (sequences x columns) uint8 matrix and every column
+#  statistic is computed with array operations:
+#    gap fraction  - share of '-' / '.' in the column
+#    ambiguity     - share of X / ? / B / Z / J / * residues
+#    conservation  - frequency of the most common residue (gaps count against it)
+#    entropy       - Shannon entropy (bits) of the residue distribution, gaps ignored
+#
+#  Modes:
+#    gappyout - gap cutoff taken from the steepest rise of the sorted gap-fraction curve
+#    strict   - gappyout cutoff (capped at max_gap) plus conservation and ambiguity filters
+#    custom   - only the thresholds passed in
+########################################################
+
+GAP_CHARS = b"-."
+AMBIGUOUS_CHARS = b"XxBbZzJj?*"
+
+_IS_GAP = np.zeros(256, dtype=bool)
+_IS_GAP[np.frombuffer(GAP_CHARS, dtype=np.uint8)] = True
+_IS_AMBIGUOUS = np.zeros(256, dtype=bool)
+_IS_AMBIGUOUS[np.frombuffer(AMBIGUOUS_CHARS, dtype=np.uint8)] = True
+
+
+def load_alignment(aln_path):
+    """Return (headers, uint8 matrix of shape (n_sequences, n_columns))."""
+    records = list(iter_fasta(aln_path, full_header=True))
+    if not records:
+        return [], np.zeros((0, 0), dtype=np.uint8)
+    lengths = {len(seq) for _, seq in records}
+    if len(lengths) != 1:
+        raise ValueError(f"{aln_path}: sequences have different lengths {sorted(lengths)}")
+    matrix = np.frombuffer("".join(seq for _, seq in records).upper().encode(), dtype=np.uint8)
+    return [h for h, _ in records], matrix.reshape(len(records), lengths.pop())
+
+
+def column_stats(matrix):
+    """
+    Per-column gap fraction, ambiguity fraction, conservation and entropy.
+
+    Returns:
+        pd.DataFrame: One row per alignment column
+    """
+    n_seq, n_col = matrix.shape
+    gap = _IS_GAP[matrix]
+    residue = ~gap & ~_IS_AMBIGUOUS[matrix]
+
+    # Residue counts per (symbol, column) with one bincount over symbol * n_col + column
+    cols = np.broadcast_to(np.arange(n_col), matrix.shape)
+    counts = np.bincount((matrix[residue].astype(np.int64) * n_col + cols[residue]),
+                         minlength=256 * n_col).reshape(256, n_col)
+    n_res = counts.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        p = counts / n_res
+        entropy = np.maximum(-np.nansum(np.where(p > 0, p * np.log2(p), 0.0), axis=0), 0.0)
+
+    return pd.DataFrame({
+        "gap_fraction": gap.mean(axis=0),
+        "ambiguous_fraction": _IS_AMBIGUOUS[matrix].mean(axis=0),
+        "conservation": counts.max(axis=0) / n_seq,
+        "entropy": np.where(n_res > 0, entropy, np.nan),
+    })
+
+
+def gappyout_cutoff(gap_fraction):
+    """
+    Gap-fraction threshold at the knee of the sorted gap curve.
+
+    Distinct gap levels are sorted with the cumulative share of columns at or below each
+    level; the cutoff is the level just before the steepest increase in gap fraction per
+    additional column kept, so the long tail of gap-rich columns is cut off.
+    """
+    levels, counts = np.unique(gap_fraction[gap_fraction < 1], return_counts=True)
+    if len(levels) < 2:
+        return levels[0] if len(levels) else 0.0
+    kept = np.cumsum(counts) / len(gap_fraction)
+    slope = np.diff(levels) / np.diff(kept)
+    knee = len(slope) - 1 - int(np.argmax(slope[::-1]))  # ties resolve to the more lenient cutoff
+    return float(levels[knee])
+
+
+def column_mask(stats, mode="gappyout", max_gap=None, min_conservation=None,
+                max_entropy=None, max_ambiguous=None):
+    """Boolean mask of columns to keep under the given mode and thresholds."""
+    gap = stats["gap_fraction"].to_numpy()
+    keep = gap < 1
+    if mode in ("gappyout", "strict"):
+        cutoff = gappyout_cutoff(gap)
+        if mode == "strict":
+            cutoff = min(cutoff, 0.5 if max_gap is None else max_gap)
+            min_conservation = 0.5 if min_conservation is None else min_conservation
+            max_ambiguous = 0.5 if max_ambiguous is None else max_ambiguous
+        keep &= gap <= cutoff
+    elif mode != "custom":
+        raise ValueError(f"Unknown trimming mode: {mode}")
+
+    if max_gap is not None:
+        keep &= gap <= max_gap
+    if min_conservation is not None:
+        keep &= stats["conservation"].to_numpy() >= min_conservation
+    if max_entropy is not None:
+        keep &= np.nan_to_num(stats["entropy"].to_numpy(), nan=np.inf) <= max_entropy
+    if max_ambiguous is not None:
+        keep &= stats["ambiguous_fraction"].to_numpy() <= max_ambiguous
+    return keep
+
+
+def trim_alignment(aln_path, out_path, mode="gappyout", **rules):
+    """
+    Trim one alignment and write the kept columns.
+
+    Returns:
+        tuple: (columns before, columns after)
+    """
+    headers, matrix = load_alignment(aln_path)
+    if matrix.size == 0:
+        return 0, 0
+    keep = column_mask(column_stats(matrix), mode=mode, **rules)
+    trimmed = np.ascontiguousarray(matrix[:, keep])
+    if trimmed.shape[1]:
+        with open(out_path, "w") as f:
+            for header, row in zip(headers, trimmed):
+                f.write(f">{header}\n{row.tobytes().decode()}\n")
+    return matrix.shape[1], trimmed.shape[1]
+
+
+def _trim_job(args):
+    grp, aln_path, out_path, mode, rules = args
+    try:
+        before, after = trim_alignment(aln_path, out_path, mode, **rules)
+        return grp, before, after, ""
+    except ValueError as e:
+        return grp, 0, 0, str(e)
+
+
+def trim_alignments(aligned_files, trimmed_dir, mode="gappyout", max_workers=None, **rules):
+    """
+    Trim many alignments in parallel and report how much the matrix shrank.
+
+    Parameters:
+        aligned_files (dict): {group_id: aligned FASTA}
+        trimmed_dir (str): Output folder for group_<id>_trimmed.fasta and trim_report.tsv
+        mode (str): 'gappyout', 'strict' or 'custom'
+        max_workers (int, optional): Worker processes
+        **rules: max_gap, min_conservation, max_entropy, max_ambiguous
+
+    Returns:
+        tuple: ({group_id: trimmed FASTA} for alignments with columns left, report DataFrame)
+    """
+    os.makedirs(trimmed_dir, exist_ok=True)
+    jobs = [(grp, aln_path, os.path.join(trimmed_dir, f"group_{grp}_trimmed.fasta"), mode, rules)
+            for grp, aln_path in aligned_files.items()]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(_trim_job, jobs, chunksize=max(1, len(jobs) // 64)))
+
+    report = pd.DataFrame(results, columns=["GroupID", "Columns_Before", "Columns_After", "Error"])
+    report["Kept_Fraction"] = report["Columns_After"] / report["Columns_Before"].replace(0, np.nan)
+    report.to_csv(os.path.join(trimmed_dir, "trim_report.tsv"), sep="\t", index=False)
+
+    trimmed = {grp: out_path for (grp, _, out_path, _, _), (_, _, after, _) in zip(jobs, results) if after > 0}
+    before, after = report["Columns_Before"].sum(), report["Columns_After"].sum()
+    print(f"[INFO] Trimming ({mode}) kept {after:,} of {before:,} columns "
+          f"({(after / before if before else 0):.1%}); {len(aligned_files) - len(trimmed)} alignments dropped.")
+    return trimmed, report
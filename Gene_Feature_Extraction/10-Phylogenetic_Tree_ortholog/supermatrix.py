@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+import os
+import sys
+import shutil
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from fasta_index import iter_fasta
+from orthogroups import load_orthogroups
+
+########################################################
+#  Supermatrix assembly
+#
+#  Single-copy orthogroups are selected from the member counts of the parsed
+#  ProteinOrtho table, and each alignment is appended to one spool file per
+#  species as it is read, so concatenation is linear in the matrix size. The
+#  gene partition coordinates are recorded in the same pass.
+########################################################
+
+
+def single_copy_groups(proteinortho_tsv, species_columns=None):
+    """
+    Orthogroups with exactly one protein in every species.
+
+    The table is read through the shared ProteinOrtho loader, so species columns come
+    from the header, "*" means absent and paralogues count as several members. Groups
+    have no ID in the file, so the 1-based row number is used.
+
+    Parameters:
+        proteinortho_tsv (str): myproject.proteinortho.tsv
+        species_columns (list, optional): Proteome columns to use (default: all)
+
+    Returns:
+        pd.DataFrame: GroupID plus one protein ID column per species
+    """
+    og = load_orthogroups(proteinortho_tsv)
+    species_columns = list(species_columns or og.columns)
+    groups = og.id_frame(species_columns, rows=og.single_copy(species_columns))
+    groups.columns = ["GroupID"] + species_columns
+    groups["GroupID"] = groups["GroupID"].astype(str)
+    return groups
+
+
+def write_partitions(partitions, partition_path, partition_format="nexus", model="LG"):
+    """
+    Write per-gene coordinates as an IQ-TREE/NEXUS sets block or a RAxML partition file.
+
+    Parameters:
+        partitions (list): (name, start, end) tuples, 1-based inclusive
+        partition_path (str): Output file
+        partition_format (str): 'nexus' or 'raxml'
+        model (str): Substitution model written on each RAxML line
+    """
+    with open(partition_path, "w") as f:
+        if partition_format == "nexus":
+            f.write("#nexus\nbegin sets;\n")
+            for name, start, end in partitions:
+                f.write(f"    charset {name} = {start}-{end};\n")
+            f.write("end;\n")
+        elif partition_format == "raxml":
+            for name, start, end in partitions:
+                f.write(f"{model}, {name} = {start}-{end}\n")
+        else:
+            raise ValueError(f"Unknown partition format: {partition_format}")
+    return partition_path
+
+
+def assemble_supermatrix(aligned_files, species, output_fasta, partition_path=None,
+                         partition_format="nexus", model="LG", min_species=None):
+    """
+    Concatenate per-group alignments into a supermatrix FASTA plus a partition file.
+
+    Each alignment is parsed once and its rows are appended to one temporary spool
+    file per species (gap-filled where a species is missing), then the spools are
+    streamed into the output FASTA. Memory stays at one alignment at a time.
+
+    Parameters:
+        aligned_files (dict): {group_id: aligned FASTA}; headers are "<group_id>_<species>"
+        species (list): Species labels in output order, e.g. ["Takin", "Buffalo", "Yak"]
+        output_fasta (str): Supermatrix FASTA path
+        partition_path (str, optional): Partition file (default: <output>.partitions.nex/.txt)
+        partition_format (str): 'nexus' (IQ-TREE) or 'raxml'
+        model (str): Model name for RAxML partition lines
+        min_species (int, optional): Skip alignments with fewer species (default: all required)
+
+    Returns:
+        dict: {"n_genes", "n_sites", "partition_path", "skipped"}
+    """
+    min_species = len(species) if min_species is None else min_species
+    species_set = set(species)
+    partitions, skipped = [], []
+    n_sites = 0
+
+    spool_dir = tempfile.mkdtemp(prefix="supermatrix_", dir=os.path.dirname(os.path.abspath(output_fasta)))
+    try:
+        spools = {sp: open(os.path.join(spool_dir, f"{i}.seq"), "w") for i, sp in enumerate(species)}
+        for grp, aln_file in aligned_files.items():
+            prefix = f"{grp}_"
+            rows = {}
+            for header, seq in iter_fasta(aln_file, full_header=True):
+                label = header[len(prefix):] if header.startswith(prefix) else header
+                if label in species_set:
+                    rows[label] = seq
+            lengths = {len(seq) for seq in rows.values()}
+            if len(rows) < min_species or len(lengths) != 1:
+                skipped.append(grp)
+                continue
+
+            width = lengths.pop()
+            for sp, spool in spools.items():
+                spool.write(rows.get(sp, "-" * width))
+            partitions.append((f"group_{grp}", n_sites + 1, n_sites + width))
+            n_sites += width
+
+        for spool in spools.values():
+            spool.close()
+
+        with open(output_fasta, "w") as out:
+            for i, sp in enumerate(species):
+                out.write(f">{sp}\n")
+                with open(os.path.join(spool_dir, f"{i}.seq")) as spool:
+                    shutil.copyfileobj(spool, out, 1 << 20)
+                out.write("\n")
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+
+    if partition_path is None:
+        suffix = ".partitions.nex" if partition_format == "nexus" else ".partitions.txt"
+        partition_path = os.path.splitext(output_fasta)[0] + suffix
+    write_partitions(partitions, partition_path, partition_format, model)
+
+    return {"n_genes": len(partitions), "n_sites": n_sites, "partition_path": partition_path, "skipped": skipped}
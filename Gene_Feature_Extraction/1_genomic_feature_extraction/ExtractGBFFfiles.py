@@ -1,6 +1,34 @@
 from Bio import SeqIO
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import io
 import os
+import sys
+import mmap
+import glob
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from feature_store import FEATURE_SCHEMA, build_feature_store
+
+
+def _feature_row(record_id, feature):
+    return {
+        "Contig": record_id,
+        "Feature_Type": feature.type,
+        "Start": int(feature.location.start),
+        "End": int(feature.location.end),
+        "Strand": feature.location.strand,
+        "Locus_Tag": feature.qualifiers.get("locus_tag", [""])[0],
+        "Gene": feature.qualifiers.get("gene", [""])[0],
+        "Product": feature.qualifiers.get("product", [""])[0],
+        "Protein_ID": feature.qualifiers.get("protein_id", [""])[0],
+        "Translation": feature.qualifiers.get("translation", [""])[0] if "translation" in feature.qualifiers else "",
+        "Note": feature.qualifiers.get("note", [""])[0] if "note" in feature.qualifiers else ""
+    }
+
 
 def extract_features_from_gbff(gbff_path, output_csv=None):
     """
@@ -17,20 +45,7 @@ def extract_features_from_gbff(gbff_path, output_csv=None):
 
     for record in SeqIO.parse(gbff_path, "genbank"):
         for feature in record.features:
-            data = {
-                "Contig": record.id,
-                "Feature_Type": feature.type,
-                "Start": int(feature.location.start),
-                "End": int(feature.location.end),
-                "Strand": feature.location.strand,
-                "Locus_Tag": feature.qualifiers.get("locus_tag", [""])[0],
-                "Gene": feature.qualifiers.get("gene", [""])[0],
-                "Product": feature.qualifiers.get("product", [""])[0],
-                "Protein_ID": feature.qualifiers.get("protein_id", [""])[0],
-                "Translation": feature.qualifiers.get("translation", [""])[0] if "translation" in feature.qualifiers else "",
-                "Note": feature.qualifiers.get("note", [""])[0] if "note" in feature.qualifiers else ""
-            }
-            features.append(data)
+            features.append(_feature_row(record.id, feature))
 
     df = pd.DataFrame(features)
 
@@ -48,13 +63,137 @@ def extract_features_from_gbff(gbff_path, output_csv=None):
 
     return df
 
-# List of GBFF files to process
-gbff_files = [
-    r"D:\Documents\Python Stuff - Programming\AMOD Big Data research project\Gene_Feature_Extraction\takin_genomic.gbff",
-    r"D:\Documents\Python Stuff - Programming\AMOD Big Data research project\Gene_Feature_Extraction\waterbuffalo_genomic.gbff",
-    r"D:\Documents\Python Stuff - Programming\AMOD Big Data research project\Gene_Feature_Extraction\wildyak_genomic.gbff"
-]
 
-# Loop over and extract features from each GBFF file
-for gbff in gbff_files:
-    extract_features_from_gbff(gbff)
+def split_gbff_records(gbff_path, chunk_bytes=256 * 1024 * 1024):
+    """
+    Split a GBFF file into byte ranges made of whole records.
+
+    Record starts are located with a memory-mapped search for "LOCUS" lines (every record
+    before one ends with "//"), and neighbouring records are grouped until a chunk reaches
+    ``chunk_bytes``. Whole chromosomes therefore become one chunk each, while thousands of
+    small unplaced scaffolds are batched together.
+
+    Parameters:
+        gbff_path (str): Path to the .gbff file
+        chunk_bytes (int): Target size of one chunk
+
+    Returns:
+        list: (start_offset, n_records, n_bytes) tuples in file order
+    """
+    with open(gbff_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        starts = [0] if mm[:6] == b"LOCUS " else []
+        pos = mm.find(b"\nLOCUS ")
+        while pos != -1:
+            starts.append(pos + 1)
+            pos = mm.find(b"\nLOCUS ", pos + 1)
+
+    chunks = []
+    chunk_start, n_records = None, 0
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else size
+        if chunk_start is None:
+            chunk_start = start
+        n_records += 1
+        if end - chunk_start >= chunk_bytes or i + 1 == len(starts):
+            chunks.append((chunk_start, n_records, end - chunk_start))
+            chunk_start, n_records = None, 0
+    return chunks
+
+
+def _write_chunk(gbff_path, start, n_records, part_path, batch_rows):
+    """Parse one byte range and stream its features into a Parquet part, one row group per batch."""
+    columns = {name: [] for name in FEATURE_SCHEMA.names}
+    n_rows, writer = 0, None
+
+    def flush():
+        nonlocal writer
+        table = pa.Table.from_pydict(columns, schema=FEATURE_SCHEMA)
+        if writer is None:
+            writer = pq.ParquetWriter(part_path, FEATURE_SCHEMA, compression="zstd")
+        writer.write_table(table)
+        for values in columns.values():
+            values.clear()
+
+    with open(gbff_path, "rb") as raw:
+        raw.seek(start)
+        handle = io.TextIOWrapper(raw, encoding="utf-8", errors="replace")
+        for record in islice(SeqIO.parse(handle, "genbank"), n_records):
+            for feature in record.features:
+                for name, value in _feature_row(record.id, feature).items():
+                    columns[name].append(value)
+            n_rows += len(record.features)
+            if len(columns["Contig"]) >= batch_rows:
+                flush()
+            del record  # don't keep the contig sequence alive while the next one is parsed
+
+    if columns["Contig"]:
+        flush()
+    if writer is not None:
+        writer.close()
+    return n_rows
+
+
+def extract_features_to_parquet(gbff_files, output_dir="genomic_features_parquet", max_workers=None,
+                                chunk_bytes=256 * 1024 * 1024, batch_rows=50000):
+    """
+    Stream features from several GBFF files into per-species Parquet datasets in parallel.
+
+    Every file is split into record-aligned byte ranges and all ranges from all genomes go
+    into one process pool, so the genomes are parsed concurrently. Each worker holds at most
+    one GenBank record plus ``batch_rows`` feature rows before writing them as a row group,
+    so memory does not grow with genome size. Output layout:
+
+        <output_dir>/<species>/part-00000.parquet, part-00001.parquet, ...
+
+    where <species> is the GBFF file name without "_genomic.gbff" (e.g. "takin").
+
+    Parameters:
+        gbff_files (list): Paths to .gbff files
+        output_dir (str): Root folder of the Parquet datasets
+        max_workers (int, optional): Number of parser processes (defaults to CPU count)
+        chunk_bytes (int): Target byte size of one parse job
+        batch_rows (int): Rows per Parquet row group
+
+    Returns:
+        dict: {species: dataset folder}
+    """
+    jobs, datasets = [], {}
+    for gbff_path in gbff_files:
+        species = os.path.basename(gbff_path).split("_genomic")[0].split(".")[0]
+        species_dir = os.path.join(output_dir, species)
+        os.makedirs(species_dir, exist_ok=True)
+        for stale in glob.glob(os.path.join(species_dir, "part-*.parquet")):
+            os.remove(stale)
+        datasets[species] = species_dir
+        for idx, (start, n_records, n_bytes) in enumerate(split_gbff_records(gbff_path, chunk_bytes)):
+            part_path = os.path.join(species_dir, f"part-{idx:05d}.parquet")
+            jobs.append((n_bytes, species, gbff_path, start, n_records, part_path))
+
+    # Largest ranges first so the big chromosomes don't end up as the last stragglers
+    jobs.sort(key=lambda job: job[0], reverse=True)
+    rows = dict.fromkeys(datasets, 0)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(_write_chunk, gbff_path, start, n_records, part_path, batch_rows): species
+                   for _, species, gbff_path, start, n_records, part_path in jobs}
+        for future in as_completed(futures):
+            rows[futures[future]] += future.result()
+
+    for species, species_dir in datasets.items():
+        print(f"[✓] {species}: {rows[species]:,} features written to {species_dir}")
+    return datasets
+
+
+if __name__ == "__main__":
+    # List of GBFF files to process
+    gbff_files = [
+        r"D:\Documents\Python Stuff - Programming\AMOD Big Data research project\Gene_Feature_Extraction\takin_genomic.gbff",
+        r"D:\Documents\Python Stuff - Programming\AMOD Big Data research project\Gene_Feature_Extraction\waterbuffalo_genomic.gbff",
+        r"D:\Documents\Python Stuff - Programming\AMOD Big Data research project\Gene_Feature_Extraction\wildyak_genomic.gbff"
+    ]
+
+    # All three genomes are parsed concurrently and streamed to Parquet
+    datasets = extract_features_to_parquet(gbff_files)
+
+    # Partitioned store read by the downstream scripts (see feature_store.load_features)
+    build_feature_store(datasets)
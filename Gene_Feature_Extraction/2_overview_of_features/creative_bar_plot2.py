@@ -1,12 +1,16 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from feature_store import load_features
 
 plt.style.use('grayscale')
 
 def creative_bar_grid(csv_path, species_name):
-    # Load data from CSV
-    df = pd.read_csv(csv_path)
+    # Load only the columns that are plotted
+    df = load_features(species_name, columns=['Feature_Type', 'Gene', 'Product', 'Strand'], csv_path=csv_path)
 
     # 1. Feature Type Counts (top 10)
     feature_counts = df['Feature_Type'].value_counts().head(10)
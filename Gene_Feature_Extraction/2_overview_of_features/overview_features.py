@@ -1,11 +1,14 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import pprint
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from feature_store import load_features
 
 def analyze_gbff_csv(csv_path, species_name):
-    df = pd.read_csv(csv_path)
+    df = load_features(species_name, csv_path=csv_path)
     summary = {}
 
     print(f"\n📊 Analysis for {species_name}")
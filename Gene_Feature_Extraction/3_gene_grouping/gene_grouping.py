@@ -1,42 +1,36 @@
 import os
-import pandas as pd
+import sys
 import matplotlib.pyplot as plt
 import seaborn as sns
-import csv
 
-def detect_separator(file_path):
-    """Auto-detect CSV delimiter (comma or tab)."""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        sample = f.read(1024)
-        try:
-            dialect = csv.Sniffer().sniff(sample, delimiters=[',', '\t'])
-            return dialect.delimiter
-        except csv.Error:
-            print(f"⚠️ Could not detect delimiter for {file_path}, defaulting to comma.")
-            return ','
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from feature_store import load_features
+from keyword_engine import count_keywords
 
 def analyze_gene_families(
     csv_paths_dict,
     keyword_list=None,
     output_dir="gene_family_output",
     output_csv="gene_family_comparison.csv",
-    output_png="gene_family_heatmap.png"
+    output_png="gene_family_heatmap.png",
+    hits_csv="gene_keyword_hits.csv"
 ):
     """
     Analyze and compare gene family keyword counts across species.
 
     Args:
-        csv_paths_dict (dict): {species_name: path_to_csv}
+        csv_paths_dict (dict): {species_name: path_to_csv} (CSV is only read if the species is not in the feature store)
         keyword_list (list): List of keywords to search for in Product column
         output_dir (str): Directory to save output files
         output_csv (str): CSV filename for keyword comparison
         output_png (str): PNG filename for heatmap
+        hits_csv (str): CSV filename for the per-gene keyword hits
 
     Returns:
         pd.DataFrame: Keyword count matrix (keywords x species)
     """
     if keyword_list is None:
-        keywords = [
+        keyword_list = [
     # Original + GPCR family
     "kinase", "GPCR", "G protein-coupled", "7TM", "seven transmembrane", "zinc", "transport", "receptor","cytochrome", "ATPase", "ubiquitin", "oxidase", "synthetase",
 
@@ -62,39 +56,20 @@ def analyze_gene_families(
     "growth factor", "morphogen", "developmental", "Wnt", "BMP", "Notch"]
 
     os.makedirs(output_dir, exist_ok=True)
-    comparison_data = {}
+    cds_products = {}
 
     for species, path in csv_paths_dict.items():
-        if not os.path.exists(path):
-            print(f"⚠️ File not found: {path} — skipping {species}")
-            continue
-
         try:
-            sep = detect_separator(path)
-            df = pd.read_csv(path, sep=sep, encoding="utf-8")
-            df.columns = [col.strip().lower() for col in df.columns]
-
-            # Debug: Show available columns
-            if species not in comparison_data:
-                print(f"📋 Columns in {species}: {df.columns.tolist()}")
-
-            if "feature_type" not in df.columns or "product" not in df.columns:
-                print(f"⚠️ Missing required columns in {species} — skipping")
-                continue
-
-            cds_df = df[df["feature_type"] == "CDS"]
-
-            counts = {}
-            for keyword in keyword_list:
-                count = cds_df["product"].str.contains(keyword, case=False, na=False).sum()
-                counts[keyword] = count
-
-            comparison_data[species] = counts
+            # Only the CDS partition and the columns needed for the hit table are read
+            cds_df = load_features(species, columns=["Gene", "Protein_ID", "Product"], feature_types=["CDS"], csv_path=path)
+            cds_df.columns = [col.strip().lower() for col in cds_df.columns]
+            cds_products[species] = cds_df
 
         except Exception as e:
             print(f"❌ Error processing {species}: {e}")
 
-    result_df = pd.DataFrame(comparison_data).fillna(0).astype(int)
+    # All keywords are matched in one scan of each distinct product string
+    result_df, hits_df, _ = count_keywords(cds_products, keyword_list)
 
     if result_df.empty:
         print("❌ No data to visualize. Exiting.")
@@ -105,6 +80,10 @@ def analyze_gene_families(
     result_df.to_csv(csv_path)
     print(f"✅ Saved keyword comparison to: {csv_path}")
 
+    hits_path = os.path.join(output_dir, hits_csv)
+    hits_df.to_csv(hits_path, index=False)
+    print(f"✅ Saved per-gene keyword hits to: {hits_path}")
+
     # Save very large heatmap
     plt.figure(figsize=(40, 20))  # Make the figure extremely large
     sns.heatmap(result_df, annot=True, cmap="YlGnBu", fmt="d", cbar_kws={'label': 'Count'})
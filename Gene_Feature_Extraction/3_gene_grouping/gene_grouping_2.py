@@ -1,18 +1,11 @@
 import os
-import pandas as pd
+import sys
 import matplotlib.pyplot as plt
 import seaborn as sns
-import csv
 
-def detect_separator(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        sample = f.read(1024)
-        try:
-            dialect = csv.Sniffer().sniff(sample, delimiters=[',', '\t'])
-            return dialect.delimiter
-        except csv.Error:
-            print(f"⚠️ Could not detect delimiter for {file_path}, defaulting to comma.")
-            return ','
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from feature_store import load_features
+from keyword_engine import count_keywords
 
 def analyze_gene_families(
     csv_paths_dict,
@@ -22,43 +15,37 @@ def analyze_gene_families(
     output_csv="gene_family_comparison.csv",
     grouped_csv="gene_function_summary.csv",
     output_png="gene_family_heatmap.png",
-    grouped_png="gene_function_grouped_heatmap.png"
+    grouped_png="gene_function_grouped_heatmap.png",
+    hits_csv="gene_keyword_hits.csv"
 ):
     if keyword_list is None:
         print("❌ No keywords provided.")
         return
 
     os.makedirs(output_dir, exist_ok=True)
-    comparison_data = {}
+    cds_products = {}
 
     for species, path in csv_paths_dict.items():
-        if not os.path.exists(path):
-            print(f"⚠️ File not found: {path} — skipping {species}")
-            continue
-
         try:
-            sep = detect_separator(path)
-            df = pd.read_csv(path, sep=sep, encoding="utf-8")
-            df.columns = [col.strip().lower() for col in df.columns]
-
-            if "feature_type" not in df.columns or "product" not in df.columns:
-                print(f"⚠️ Missing required columns in {species} — skipping")
-                continue
-
-            cds_df = df[df["feature_type"] == "CDS"]
-            counts = {kw: cds_df["product"].str.contains(kw, case=False, na=False).sum() for kw in keyword_list}
-            comparison_data[species] = counts
+            cds_df = load_features(species, columns=["Gene", "Protein_ID", "Product"], feature_types=["CDS"], csv_path=path)
+            cds_df.columns = [col.strip().lower() for col in cds_df.columns]
+            cds_products[species] = cds_df
 
         except Exception as e:
             print(f"X Error processing {species}: {e}")
 
-    result_df = pd.DataFrame(comparison_data).fillna(0).astype(int)
+    # One scan per distinct product gives keyword counts, per-gene hits and group counts
+    result_df, hits_df, grouped_df = count_keywords(cds_products, keyword_list, keyword_groups)
 
     # Save keyword-level CSV and heatmap
     keyword_csv = os.path.join(output_dir, output_csv)
     result_df.to_csv(keyword_csv)
     print(f":D Saved keyword comparison to: {keyword_csv}")
 
+    hits_path = os.path.join(output_dir, hits_csv)
+    hits_df.to_csv(hits_path, index=False)
+    print(f":D Saved per-gene keyword hits to: {hits_path}")
+
     plt.figure(figsize=(40, 20))
     sns.heatmap(result_df, annot=True, cmap="YlGnBu", fmt="d", cbar_kws={'label': 'Count'})
     plt.title("Gene Family Keyword Counts Across Species", fontsize=24)
@@ -69,15 +56,8 @@ def analyze_gene_families(
     plt.close()
     print(f":D Saved keyword-level heatmap to: {output_png}")
 
-    # Grouped analysis by shared function
+    # Grouped analysis by shared function (genes counted once per group, from the same hits)
     if keyword_groups:
-        grouped_data = {}
-        for group_name, keywords in keyword_groups.items():
-            relevant = result_df.loc[result_df.index.intersection(keywords)]
-            grouped_data[group_name] = relevant.sum()
-
-        grouped_df = pd.DataFrame(grouped_data).T.astype(int)
-
         # Save grouped CSV and heatmap
         grouped_csv_path = os.path.join(output_dir, grouped_csv)
         grouped_df.to_csv(grouped_csv_path)
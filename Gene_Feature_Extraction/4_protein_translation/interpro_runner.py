@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+import os
+import sys
+import hashlib
+import sqlite3
+import subprocess
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from fasta_index import iter_fasta
+from fasta_export import balanced_shards, write_fasta
+
+########################################################
+#  Cached, sharded InterProScan runner
+#
+#  Every protein is keyed by the MD5 of its sequence (the same value InterProScan writes
+#  in its MD5 column). Annotations live in a SQLite cache, so a sequence shared by takin,
+#  wild yak and water buffalo - or already annotated in an earlier run - is never sent
+#  to InterProScan again. Unseen sequences are written once each into length-balanced
+#  shards that run in a bounded local pool; each finished shard is committed to the
+#  cache straight away, which is also the checkpoint: an interrupted run resumes with
+#  only the shards that did not finish. Per-species TSVs are then rebuilt from the cache
+#  with the original protein IDs.
+########################################################
+
+INTERPROSCAN_CMD = "/home/sathya/interproscan/interproscan.sh"
+INTERPROSCAN_OPTIONS = ("-f", "tsv", "-goterms", "-pa", "-dp")
+
+
+def sequence_md5(seq):
+    """MD5 of a protein sequence as InterProScan computes it (upper case, no stop '*')."""
+    return hashlib.md5(seq.upper().rstrip("*").encode()).hexdigest()
+
+
+class AnnotationCache:
+    """
+    InterProScan results keyed by sequence MD5, stored in SQLite.
+
+    Tables:
+        sequences(md5, length, n_matches) - one row per annotated sequence, including
+                                            sequences without any match
+        matches(md5, line)                - TSV match lines without the protein ID column
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS sequences (md5 TEXT PRIMARY KEY, length INTEGER, n_matches INTEGER)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS matches (md5 TEXT, line TEXT)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS matches_md5 ON matches (md5)")
+        self.conn.commit()
+
+    def known(self, md5s, batch=900):
+        """Subset of `md5s` that is already annotated."""
+        md5s, found = list(md5s), set()
+        for i in range(0, len(md5s), batch):
+            chunk = md5s[i:i + batch]
+            query = f"SELECT md5 FROM sequences WHERE md5 IN ({','.join('?' * len(chunk))})"
+            found.update(row[0] for row in self.conn.execute(query, chunk))
+        return found
+
+    def add(self, lengths, lines_by_md5):
+        """
+        Store one finished batch in a single transaction.
+
+        Parameters:
+            lengths (dict): {md5: sequence length} for every sequence that was submitted
+            lines_by_md5 (dict): {md5: [match line without protein ID, ...]}
+        """
+        with self.conn:
+            self.conn.executemany("DELETE FROM matches WHERE md5 = ?", ((m,) for m in lengths))
+            self.conn.executemany("INSERT INTO matches VALUES (?, ?)",
+                                  ((m, line) for m, lines in lines_by_md5.items() if m in lengths for line in lines))
+            self.conn.executemany("INSERT OR REPLACE INTO sequences VALUES (?, ?, ?)",
+                                  ((m, n, len(lines_by_md5.get(m, ()))) for m, n in lengths.items()))
+
+    def lines(self, md5):
+        """Stored match lines of one sequence, in InterProScan output order."""
+        return [row[0] for row in self.conn.execute("SELECT line FROM matches WHERE md5 = ? ORDER BY rowid", (md5,))]
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_tsv_lines(tsv_path):
+    """{protein ID: [rest of line, ...]} from an InterProScan TSV."""
+    lines = {}
+    with open(tsv_path, "r") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            pid, _, rest = line.partition("\t")
+            lines.setdefault(pid, []).append(rest)
+    return lines
+
+
+def import_tsv(cache, tsv_path, fasta_path):
+    """
+    Seed the cache from an existing InterProScan run (e.g. takin_interpro.tsv and the FASTA it came from).
+
+    Every sequence of the FASTA is marked as annotated, so proteins without matches are not resubmitted.
+    """
+    lines = read_tsv_lines(tsv_path)
+    lengths, by_md5 = {}, {}
+    for pid, seq in iter_fasta(fasta_path):
+        md5 = sequence_md5(seq)
+        lengths[md5] = len(seq)
+        if pid in lines and md5 not in by_md5:
+            by_md5[md5] = lines[pid]
+    cache.add(lengths, by_md5)
+    print(f"[INFO] Imported {len(lengths):,} sequences ({len(by_md5):,} with matches) from {tsv_path}")
+    return len(lengths)
+
+
+def run_shard(shard_fasta, out_tsv, interproscan_cmd=INTERPROSCAN_CMD, options=INTERPROSCAN_OPTIONS,
+              cpu=None, timeout=None):
+    """Run InterProScan (or a stand-in with the same -i/-o interface) on one shard."""
+    cmd = ([interproscan_cmd] if isinstance(interproscan_cmd, str) else list(interproscan_cmd)) + list(options)
+    if cpu:
+        cmd += ["-cpu", str(cpu)]
+    tmp_path = out_tsv + ".tmp"
+    cmd += ["-i", os.path.abspath(shard_fasta), "-o", os.path.abspath(tmp_path)]
+    try:
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True, text=True, timeout=timeout)
+        if not os.path.exists(tmp_path):
+            open(tmp_path, "w").close()  # no matches at all
+        os.replace(tmp_path, out_tsv)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return out_tsv
+
+
+def annotate_species(species_fastas, output_dir, cache_db=None, interproscan_cmd=INTERPROSCAN_CMD,
+                     options=INTERPROSCAN_OPTIONS, n_shards=None, max_workers=2, cpu_per_job=None,
+                     timeout=None, output_suffix="_interpro.tsv"):
+    """
+    Annotate several proteomes with InterProScan, running each distinct unseen sequence once.
+
+    Parameters:
+        species_fastas (dict): {species: protein FASTA}
+        output_dir (str): Per-species TSVs (<species><output_suffix>) and the shards/ work folder
+        cache_db (str, optional): SQLite annotation cache (default: <output_dir>/interpro_cache.sqlite)
+        interproscan_cmd (str or list): interproscan.sh path, or e.g. [sys.executable, "stub_interproscan.py"]
+        options (tuple): Extra InterProScan options
+        n_shards (int, optional): Number of shards (default: 4 x max_workers)
+        max_workers (int): Shards running at the same time
+        cpu_per_job (int, optional): Passed as -cpu to each InterProScan run
+        timeout (float, optional): Seconds before a shard is killed
+        output_suffix (str): Suffix of the merged per-species TSVs
+
+    Returns:
+        dict: {"n_proteins", "n_unique", "n_cached", "n_submitted", "failed_shards", "tsv_paths"}
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    shard_dir = os.path.join(output_dir, "shards")
+    os.makedirs(shard_dir, exist_ok=True)
+    for name in os.listdir(shard_dir):  # leftovers of an interrupted run are rebuilt from the cache state
+        if name.startswith("shard_"):
+            os.remove(os.path.join(shard_dir, name))
+    cache = AnnotationCache(cache_db or os.path.join(output_dir, "interpro_cache.sqlite"))
+
+    # 1) Key every protein by sequence MD5
+    proteomes, sequences = {}, {}
+    for species, fasta_path in species_fastas.items():
+        ids, md5s = [], []
+        for pid, seq in iter_fasta(fasta_path):
+            md5 = sequence_md5(seq)
+            sequences.setdefault(md5, seq.upper().rstrip("*"))
+            ids.append(pid)
+            md5s.append(md5)
+        proteomes[species] = (ids, md5s)
+    n_proteins = sum(len(ids) for ids, _ in proteomes.values())
+
+    # 2) Only sequences missing from the cache are submitted, each once
+    cached = cache.known(sequences)
+    todo = sorted(set(sequences) - cached)
+    print(f"[INFO] {n_proteins:,} proteins, {len(sequences):,} distinct sequences: "
+          f"{len(cached):,} cached, {len(todo):,} to annotate.")
+
+    failed = {}
+    if todo:
+        n_shards = max(1, min(n_shards or 4 * max_workers, len(todo)))
+        lengths = np.array([len(sequences[m]) for m in todo])
+        shard_of = balanced_shards(lengths, n_shards)
+        shards = {}
+        for k in range(n_shards):
+            members = [todo[i] for i in np.flatnonzero(shard_of == k)]
+            if not members:
+                continue
+            shard_fasta = os.path.join(shard_dir, f"shard_{k + 1:04d}.fasta")
+            write_fasta(members, [sequences[m] for m in members], shard_fasta)
+            shards[shard_fasta] = members
+
+        # 3) Run shards in a bounded pool; each result is committed to the cache as it arrives
+        done = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(run_shard, shard_fasta, shard_fasta[:-len(".fasta")] + ".tsv",
+                                   interproscan_cmd, options, cpu_per_job, timeout): shard_fasta
+                       for shard_fasta in shards}
+            for future in as_completed(futures):
+                shard_fasta = futures[future]
+                members = shards[shard_fasta]
+                try:
+                    out_tsv = future.result()
+                except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError) as e:
+                    failed[shard_fasta] = (getattr(e, "stderr", None) or str(e)).strip()
+                    print(f"X Error in {os.path.basename(shard_fasta)}: {failed[shard_fasta].splitlines()[-1:] or e}")
+                    continue
+                cache.add({m: len(sequences[m]) for m in members}, read_tsv_lines(out_tsv))
+                done += len(members)
+                print(f"[INFO] {os.path.basename(shard_fasta)} done ({done:,}/{len(todo):,} sequences cached).")
+                os.remove(shard_fasta)
+                os.remove(out_tsv)
+
+    # 4) Merge back into per-species TSVs with the original protein IDs
+    tsv_paths = {}
+    for species, (ids, md5s) in proteomes.items():
+        out_path = os.path.join(output_dir, f"{species}{output_suffix}")
+        with open(out_path, "w", buffering=1 << 20) as out:
+            for pid, md5 in zip(ids, md5s):
+                for rest in cache.lines(md5):
+                    out.write(f"{pid}\t{rest}\n")
+        tsv_paths[species] = out_path
+        print(f":D Saved {out_path}")
+    cache.close()
+
+    if failed:
+        print(f"[ERROR] {len(failed)} shards failed; rerun to retry only their sequences.")
+    return {"n_proteins": n_proteins, "n_unique": len(sequences), "n_cached": len(cached),
+            "n_submitted": len(todo), "failed_shards": failed, "tsv_paths": tsv_paths}
+
+
+if __name__ == "__main__":
+    # Protein FASTAs written by protein_translation_to_fasta.py (WSL paths)
+    SPECIES_FASTAS = {
+        "takin": "/home/sathya/interproscan_protein/takin_proteins.fasta",
+        "water_buffalo": "/home/sathya/interproscan_protein/water_buffalo_proteins.fasta",
+        "wild_yak": "/home/sathya/interproscan_protein/wild_yak_proteins.fasta",
+    }
+    OUTPUT_DIR = "/home/sathya/interproscan_protein/interpro_cached"
+    CACHE_DB = os.path.join(OUTPUT_DIR, "interpro_cache.sqlite")
+
+    # Finished runs to seed the cache with, so those proteins are never annotated again:
+    # {"takin": ("/home/sathya/interproscan_protein/takin_interpro.tsv", SPECIES_FASTAS["takin"])}
+    EXISTING_RUNS = {}
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    with AnnotationCache(CACHE_DB) as cache:
+        for species, (tsv_path, fasta_path) in EXISTING_RUNS.items():
+            import_tsv(cache, tsv_path, fasta_path)
+
+    annotate_species(SPECIES_FASTAS, OUTPUT_DIR, cache_db=CACHE_DB, interproscan_cmd=INTERPROSCAN_CMD,
+                     max_workers=2, cpu_per_job=7)
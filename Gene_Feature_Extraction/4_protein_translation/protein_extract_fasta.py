@@ -1,19 +1,22 @@
-import pandas as pd
+import os
+import sys
+import pyarrow.compute as pc
 
-def extract_subset_fasta(csv_path, fasta_out, n=5000):
-    df = pd.read_csv(csv_path, sep=None, engine='python')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from feature_store import load_features
+from fasta_export import export_proteins
+
+def extract_subset_fasta(csv_path, fasta_out, n=5000, species=None, seed=None, dedupe=False):
+    if species is None:
+        species = os.path.basename(csv_path).split("_genomic")[0]
+    df = load_features(species, columns=["Protein_ID", "Translation"],
+                       filters=pc.field("Translation").is_valid(), csv_path=csv_path)
     df.columns = [col.strip().lower() for col in df.columns]
 
-    count = 0
-    with open(fasta_out, "w") as f:
-        for idx, row in df.iterrows():
-            if pd.notna(row.get("protein_id")) and pd.notna(row.get("translation")):
-                f.write(f">{row['protein_id']}\n{row['translation']}\n")
-                count += 1
-                if count >= n:
-                    break
+    # First n proteins, or a reproducible random n when a seed is given
+    summary = export_proteins(df, fasta_out, dedupe=dedupe, n=n, seed=seed)
 
-    print(f":D Saved {count} proteins to: {fasta_out}")
+    print(f":D Saved {summary['n_written']} proteins to: {fasta_out}")
 
 
 extract_subset_fasta(
@@ -1,19 +1,28 @@
-import pandas as pd
+import pyarrow.compute as pc
 import os
+import sys
 
-def extract_protein_fastas(csv_paths_dict, output_dir="protein_fastas"):
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from feature_store import load_features
+from fasta_export import export_proteins
+
+def extract_protein_fastas(csv_paths_dict, output_dir="protein_fastas", dedupe=False, n_shards=1):
     """
-    Extracts protein FASTA files from .csv annotation files for multiple species.
+    Extracts protein FASTA files from the feature store (or .csv annotation files) for multiple species.
 
     Args:
         csv_paths_dict (dict): Dictionary of {species_name: csv_path}
         output_dir (str): Output directory to save FASTA files
+        dedupe (bool): Write one representative per identical translation (plus a .map.tsv of ID -> representative)
+        n_shards (int): Split each proteome into this many length-balanced FASTA chunks
     """
     os.makedirs(output_dir, exist_ok=True)
 
     for species, csv_path in csv_paths_dict.items():
         try:
-            df = pd.read_csv(csv_path, sep=None, engine='python')  # Auto-detect comma/tab
+            # Only rows that carry a translation, and only the two columns written out
+            df = load_features(species, columns=["Protein_ID", "Translation"],
+                               filters=pc.field("Translation").is_valid(), csv_path=csv_path)
             df.columns = [col.strip().lower() for col in df.columns]
 
             if "protein_id" not in df.columns or "translation" not in df.columns:
@@ -22,16 +31,12 @@ def extract_protein_fastas(csv_paths_dict, output_dir="protein_fastas"):
 
             fasta_file = os.path.join(output_dir, f"{species.lower().replace(' ', '_')}_proteins.fasta")
 
-            with open(fasta_file, "w") as f:
-                count = 0
-                for idx, row in df.iterrows():
-                    protein_id = row["protein_id"]
-                    sequence = row["translation"]
-                    if pd.notna(protein_id) and pd.notna(sequence):
-                        f.write(f">{protein_id}\n{sequence}\n")
-                        count += 1
+            summary = export_proteins(df, fasta_file, dedupe=dedupe, n_shards=n_shards)
 
-            print(f":D Saved {count} protein sequences for {species} → {fasta_file}")
+            print(f":D Saved {summary['n_written']} protein sequences for {species} "
+                  f"({summary['n_input']} before collapsing) → {', '.join(summary['fasta_paths'])}")
+            if summary["mapping_path"]:
+                print(f":D ID → representative mapping saved to: {summary['mapping_path']}")
 
         except Exception as e:
             print(f"X Error processing {species}: {e}")
@@ -42,5 +47,6 @@ csv_files = {
     "Water Buffalo": r"D:\Documents\Python Stuff - Programming\AMOD Big Data research project\Wild-Yak--Takin--and-High-Altitude-Bovids---Genomic-and-Geographic-Adaptations\Gene_Feature_Extraction\1_genomic_feature_extraction\waterbuffalo_genomic_features.csv"
 }
 
-extract_protein_fastas(csv_files)
+# Identical isoform translations are collapsed before InterProScan / BLAST
+extract_protein_fastas(csv_files, dedupe=True)
 
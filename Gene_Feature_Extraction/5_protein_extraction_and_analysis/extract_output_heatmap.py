@@ -1,31 +1,32 @@
-import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 import os
+import sys
 
-def compare_interpro_domains(tsv_files, output_dir="interpro_output", top_n=20):
-    os.makedirs(output_dir, exist_ok=True)
-    domain_counts = {}
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from interpro_matrix import build_interpro_matrix, top_domains
 
-    for species, path in tsv_files.items():
-        print(f"DATA Processing: {species}")
-        try:
-            df = pd.read_csv(path, sep="\t", header=None)
-            df.columns = [
-                "Protein_ID", "MD5", "Length", "Analysis", "Signature_Acc",
-                "Signature_Desc", "Start", "End", "Score", "Status", "Date",
-                "InterPro_Acc", "InterPro_Desc", "GO", "Pathways"
-            ][:len(df.columns)]
+def compare_interpro_domains(tsv_files, output_dir="interpro_output", top_n=20, max_workers=None):
+    """
+    Count every InterPro entry per species (and per protein) and plot the top entries.
 
-            top_domains = df["InterPro_Desc"].value_counts().head(top_n)
-            domain_counts[species] = top_domains
+    The TSVs are streamed in parallel into the full domain x species matrix plus a sparse
+    protein x domain matrix (see interpro_matrix.py), which are saved in output_dir for
+    func_clustering_interpro.py; the heatmap is a top_n view of that matrix.
+    """
+    os.makedirs(output_dir, exist_ok=True)
 
-        except Exception as e:
-            print(f"X Error reading {species}: {e}")
+    readable = {}
+    for species, path in tsv_files.items():
+        if os.path.exists(path):
+            readable[species] = path
+        else:
+            print(f"X Error reading {species}: {path} not found")
 
     # Combine into one matrix
-    if domain_counts:
-        domain_df = pd.concat(domain_counts, axis=1).fillna(0).astype(int)
+    if readable:
+        domain_matrix, _, _ = build_interpro_matrix(readable, output_dir, max_workers=max_workers)
+        domain_df = top_domains(domain_matrix, top_n)
         domain_df.to_csv(os.path.join(output_dir, "interpro_domain_comparison.csv"))
         print(f":D Saved CSV: interpro_domain_comparison.csv")
 
@@ -47,4 +48,5 @@ tsv_files = {
     "Takin": r"D:\Documents\Python Stuff - Programming\AMOD Big Data research project\Wild-Yak--Takin--and-High-Altitude-Bovids---Genomic-and-Geographic-Adaptations\Gene_Feature_Extraction\4_protein_translation\takin_interpro.tsv"
 }
 
-compare_interpro_domains(tsv_files)
+if __name__ == "__main__":
+    compare_interpro_domains(tsv_files)
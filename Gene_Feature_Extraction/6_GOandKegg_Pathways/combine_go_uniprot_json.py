@@ -1,99 +1,115 @@
 import os
+import sys
 import json
 import pandas as pd
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from go_ontology import load_ontology
+
+try:
+    import ijson  # optional, streams large JSON exports instead of loading them whole
+except ImportError:
+    ijson = None
+
 # ---------------------------
 csv_path = r"D:\Documents\Python Stuff - Programming\AMOD Big Data research project\Genomic_and_Geographic_analysis_of_high_altitude_bovids- NONGITHUB\Gene_Feature_Extraction\6_GOandKegg_Pathways\compareCluster_GO\GO_compareCluster.csv"
-uniprot_json_path = r"uniprot_results.json" 
-go_json_path = r"go_results.json"           
+uniprot_json_path = r"uniprot_results.json"
+go_json_path = r"go_results.json"           # only used when go-basic.obo is missing
+go_obo_path = r"go-basic.obo"                # http://purl.obolibrary.org/obo/go/go-basic.obo
 output_csv_path = r"merged_enriched_GO.csv"
 # ---------------------------
 
-# Load the CSV file into a DataFrame.
-df = pd.read_csv(csv_path)
 
-# Load the UniProt JSON file.
-with open(uniprot_json_path, "r") as f:
-    uniprot_data = json.load(f)
+def iter_json_items(json_path):
+    """(key, value) pairs of a top-level JSON object, streamed with ijson when it is installed."""
+    with open(json_path, "rb") as f:
+        if ijson is not None:
+            yield from ijson.kvitems(f, "")
+        else:
+            yield from json.load(f).items()
 
-# Load the GO JSON file.
-with open(go_json_path, "r") as f:
-    go_data = json.load(f)
 
-def extract_go_info(go_id):
+def uniprot_name_table(uniprot_json_path):
     """
-    Look up a GO term's details in go_data.
-    Returns a tuple: (name, definition, synonyms) if found,
-    Otherwise ("N/A", "N/A", "").
+    Reduce the UniProt export to one recommended protein name per accession.
+
+    Returns:
+        pd.Series: accession -> name ("ERROR" for failed lookups, "Unnamed" without a name)
     """
-    if go_id in go_data:
-        results = go_data[go_id].get("results", [])
-        if results:
-            entry = results[0]
-            name = entry.get("name", "N/A")
-            definition = entry.get("definition", {}).get("text", "N/A")
-            syns = entry.get("synonyms", [])
-            # Combine synonyms names separated by semicolon.
-            synonyms = "; ".join([syn.get("name", "") for syn in syns]) if syns else ""
-            return name, definition, synonyms
-    return "N/A", "N/A", ""
-
-def summarize_uniprot_info(gene_list):
+    names = {}
+    for gene, entry in iter_json_items(uniprot_json_path):
+        if "error" in entry:
+            names[gene] = "ERROR"
+            continue
+        full_name = ((entry.get("proteinDescription") or {}).get("recommendedName") or {}).get("fullName") or {}
+        names[gene] = full_name.get("value") or "Unnamed"
+    return pd.Series(names, dtype=object, name="Protein_Name")
+
+
+def go_term_table(go_json_path):
     """
-    Given a list of gene (protein) accessions,
-    return a string summary containing the protein recommended name for each accession.
-    If an entry contains an "error", note it.
+    Reduce the QuickGO export to one row per GO ID.
+
+    Returns:
+        pd.DataFrame: Indexed by GO ID, with GO_Name, GO_Definition and GO_Synonyms
+                      (synonym names joined with "; ")
     """
-    summaries = []
-    for gene in gene_list:
-        gene = gene.strip()
-        entry = uniprot_data.get(gene, {})
-        if "error" in entry:
-            summaries.append(f"{gene}: ERROR")
-        else:
-            # Extract recommended protein name 
-            try:
-                protein_name = (
-                    entry.get("proteinDescription", {})
-                        .get("recommendedName", {})
-                        .get("fullName", {})
-                        .get("value", "Unnamed")
-                )
-            except Exception:
-                protein_name = "Unnamed"
-            summaries.append(f"{gene}: {protein_name}")
-    return " | ".join(summaries)
-
-# Lists to store new columns.
-go_names = []
-go_definitions = []
-go_synonyms = []
-uniprot_summaries = []
-
-# Process each row in the CSV.
-for idx, row in df.iterrows():
-    # Extract and clean the GO identifier from the "ID" column.
-    raw_go_id = str(row["ID"])
-    clean_go_id = raw_go_id.split("(")[0].strip()
-    
-    # Retrieve GO details.
-    name, definition, synonyms = extract_go_info(clean_go_id)
-    go_names.append(name)
-    go_definitions.append(definition)
-    go_synonyms.append(synonyms)
-    
-    # Process gene IDs from the "geneID" column 
-    raw_gene_ids = str(row["geneID"])
-    gene_list = raw_gene_ids.split("/")
-    up_summary = summarize_uniprot_info(gene_list)
-    uniprot_summaries.append(up_summary)
-
-# Add the new annotation columns to the DataFrame.
-df["GO_Name"] = go_names
-df["GO_Definition"] = go_definitions
-df["GO_Synonyms"] = go_synonyms
-df["UniProt_Summary"] = uniprot_summaries
-
-# DF TO CSV
-df.to_csv(output_csv_path, index=False)
-print(f"Enriched CSV file saved as: {output_csv_path}")
+    rows = {}
+    for go_id, record in iter_json_items(go_json_path):
+        results = record.get("results") or []
+        if not results:
+            continue
+        entry = results[0]
+        synonyms = entry.get("synonyms") or []
+        rows[go_id] = (entry.get("name", "N/A"),
+                       (entry.get("definition") or {}).get("text", "N/A"),
+                       "; ".join(syn.get("name", "") for syn in synonyms))
+    return pd.DataFrame.from_dict(rows, orient="index", columns=["GO_Name", "GO_Definition", "GO_Synonyms"])
+
+
+def annotate_enrichment(df, go_terms, protein_names):
+    """
+    Add GO term details and a per-row UniProt summary to a compareCluster table.
+
+    GO IDs are joined with one reindex; geneID lists are exploded to one gene per row,
+    mapped to their protein names in one pass and joined back per enrichment row.
+
+    Parameters:
+        df (pd.DataFrame): compareCluster output with "ID" (GO:0004984(PANTHER)) and "geneID" (a/b/c)
+        go_terms (pd.DataFrame): Output of go_term_table or GeneOntology.term_table
+        protein_names (pd.Series): Output of uniprot_name_table
+
+    Returns:
+        pd.DataFrame: df with GO_Name, GO_Definition, GO_Synonyms and UniProt_Summary added
+    """
+    df = df.copy()
+    go_ids = df["ID"].astype(str).str.split("(").str[0].str.strip()
+    go_info = go_terms.reindex(go_ids.to_numpy())
+    df["GO_Name"] = go_info["GO_Name"].fillna("N/A").to_numpy()
+    df["GO_Definition"] = go_info["GO_Definition"].fillna("N/A").to_numpy()
+    df["GO_Synonyms"] = go_info["GO_Synonyms"].fillna("").to_numpy()
+
+    genes = df["geneID"].astype(str).reset_index(drop=True).str.split("/").explode().str.strip()
+    labels = genes + ": " + genes.map(protein_names).fillna("Unnamed")
+    df["UniProt_Summary"] = labels.groupby(level=0, sort=False).agg(" | ".join).to_numpy()
+    return df
+
+
+if __name__ == "__main__":
+    # Load the CSV file and the lookup tables: GO terms from the local ontology
+    # (QuickGO export as fallback), protein names from the UniProt export.
+    df = pd.read_csv(csv_path)
+    protein_names = uniprot_name_table(uniprot_json_path)
+    if os.path.exists(go_obo_path):
+        go_ids = df["ID"].astype(str).str.split("(").str[0].str.strip()
+        go_terms = load_ontology(go_obo_path).term_table(go_ids)
+    else:
+        print(f"[INFO] {go_obo_path} not found, using QuickGO export {go_json_path}.")
+        go_terms = go_term_table(go_json_path)
+    print(f"[INFO] {len(df):,} enrichment rows, {len(protein_names):,} UniProt entries, {len(go_terms):,} GO terms.")
+
+    df = annotate_enrichment(df, go_terms, protein_names)
+
+    # DF TO CSV
+    df.to_csv(output_csv_path, index=False)
+    print(f"Enriched CSV file saved as: {output_csv_path}")
@@ -1,77 +1,267 @@
 import os
-import pandas as pd
-import requests
+import re
 import json
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import random
+import sqlite3
+import asyncio
+import pandas as pd
+import aiohttp
 
-# Function to fetch protein information from UniProt
-def fetch_uniprot_data(accession, timeout=5):
-    url = f"https://rest.uniprot.org/uniprotkb/{accession}.json"
-    try:
-        response = requests.get(url, timeout=timeout)
-        response.raise_for_status()
-        return accession, response.json()
-    except Exception as e:
-        return accession, {"error": str(e)}
-
-# Function to fetch GO term details from QuickGO
-def fetch_go_term(go_id, timeout=5):
-    url = f"https://www.ebi.ac.uk/QuickGO/services/ontology/go/terms/{go_id}"
+########################################################
+#  Cached asyncio client for UniProt and QuickGO
+#
+#  IDs are fetched in batches over one pooled aiohttp session: UniProt accessions through
+#  the /accessions endpoint, RefSeq protein IDs (XP_/NP_, as in GO_compareCluster.csv)
+#  through an OR-ed xref search, and GO terms through QuickGO's comma-separated /terms
+#  endpoint. 429 and 5xx answers are retried with exponential backoff (honouring
+#  Retry-After). Every finished batch is written to a SQLite cache, so a rerun only asks
+#  for IDs that were never fetched or failed last time. The base URLs can be pointed at a
+#  local mock server for testing.
+########################################################
+
+UNIPROT_URL = "https://rest.uniprot.org/uniprotkb"
+QUICKGO_URL = "https://www.ebi.ac.uk/QuickGO/services/ontology/go"
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+UNIPROT_ACCESSION = re.compile(r"^(?:[OPQ][0-9][A-Z0-9]{3}[0-9]|[A-NR-Z][0-9](?:[A-Z][A-Z0-9]{2}[0-9]){1,2})$")
+NEXT_LINK = re.compile(r'<([^>]+)>;\s*rel="next"')
+
+
+class ResponseCache:
+    """
+    API results stored in SQLite, one row per (source, ID).
+
+    status is "ok" (data holds the JSON), "not_found" (the service has no such ID) or
+    "error" (request failed; fetched again on the next run).
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS responses "
+                          "(source TEXT, id TEXT, status TEXT, data TEXT, PRIMARY KEY (source, id))")
+        self.conn.commit()
+
+    def _rows(self, source, ids, batch=900):
+        ids = list(ids)
+        for i in range(0, len(ids), batch):
+            chunk = ids[i:i + batch]
+            query = f"SELECT id, status, data FROM responses WHERE source = ? AND id IN ({','.join('?' * len(chunk))})"
+            yield from self.conn.execute(query, [source] + chunk)
+
+    def pending(self, source, ids, retry_not_found=False):
+        """IDs of `ids` that still have to be fetched (never fetched, failed, or optionally not found)."""
+        done = {"ok"} if retry_not_found else {"ok", "not_found"}
+        finished = {i for i, status, _ in self._rows(source, ids) if status in done}
+        return [i for i in dict.fromkeys(ids) if i not in finished]
+
+    def put(self, source, results):
+        """Store {id: (status, data)} in one transaction."""
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                                  ((source, i, status, json.dumps(data, separators=(",", ":")))
+                                   for i, (status, data) in results.items()))
+
+    def load(self, source, ids):
+        """{id: JSON} for `ids`; IDs without a result get {"error": ...} as in the JSON exports."""
+        found = {}
+        for i, status, data in self._rows(source, ids):
+            data = json.loads(data)
+            found[i] = data if status == "ok" else {"error": data}
+        return {i: found.get(i, {"error": "not fetched"}) for i in dict.fromkeys(ids)}
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _batches(ids, size):
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+
+def _retry_after(value):
     try:
-        response = requests.get(url, timeout=timeout)
-        response.raise_for_status()
-        return go_id, response.json()
-    except Exception as e:
-        return go_id, {"error": str(e)}
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+async def get_json(session, url, params=None, retries=5, backoff=1.0):
+    """
+    GET a JSON document, retrying 429/5xx answers and connection errors.
+
+    Returns:
+        tuple: (parsed JSON, URL of the next page from the Link header or None)
+    """
+    for attempt in range(retries + 1):
+        try:
+            async with session.get(url, params=params) as resp:
+                if resp.status in RETRY_STATUS and attempt < retries:
+                    delay = _retry_after(resp.headers.get("Retry-After"))
+                    if delay is None:
+                        delay = backoff * 2 ** attempt * (1 + random.random())
+                    await asyncio.sleep(delay)
+                    continue
+                resp.raise_for_status()
+                link = NEXT_LINK.search(resp.headers.get("Link", ""))
+                return await resp.json(content_type=None), link.group(1) if link else None
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if attempt == retries:
+                raise
+            await asyncio.sleep(backoff * 2 ** attempt * (1 + random.random()))
+
+
+async def _uniprot_accessions(session, base_url, ids, **retry):
+    """UniProt entries for a batch of UniProt accessions (primary or secondary)."""
+    data, _ = await get_json(session, f"{base_url}/accessions",
+                             params={"accessions": ",".join(ids), "format": "json"}, **retry)
+    wanted, found = set(ids), {}
+    for entry in data.get("results", []):
+        for acc in [entry.get("primaryAccession")] + entry.get("secondaryAccessions", []):
+            if acc in wanted:
+                found.setdefault(acc, entry)
+    return found
+
+
+async def _uniprot_refseq(session, base_url, ids, page_size=500, **retry):
+    """UniProt entries cross-referenced to a batch of RefSeq protein IDs (e.g. XP_052509028.1)."""
+    query = " OR ".join(f"xref:refseq-{i}" for i in ids)
+    url, params = f"{base_url}/search", {"query": query, "format": "json", "size": page_size}
+    wanted, found = set(ids), {}
+    while url:
+        data, url = await get_json(session, url, params=params, **retry)
+        params = None  # the next-page link already carries the query
+        for entry in data.get("results", []):
+            for xref in entry.get("uniProtKBCrossReferences", []):
+                if xref.get("database") == "RefSeq" and xref.get("id") in wanted:
+                    found.setdefault(xref["id"], entry)
+    return found
+
+
+async def _quickgo_terms(session, base_url, ids, **retry):
+    """QuickGO term records for a batch of GO IDs, in the single-term response layout."""
+    data, _ = await get_json(session, f"{base_url}/terms/{','.join(ids)}", **retry)
+    wanted, found = set(ids), {}
+    for entry in data.get("results", []):
+        for go_id in [entry.get("id")] + entry.get("secondaryIds", []):
+            if go_id in wanted:
+                found.setdefault(go_id, {"numberOfHits": 1, "results": [entry]})
+    return found
+
+
+async def _run_batch(sem, source, fetch, ids):
+    async with sem:
+        try:
+            found = await fetch(ids)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            message = f"{type(e).__name__}: {e}"
+            return source, ids, {i: ("error", message) for i in ids}
+    return source, ids, {i: ("ok", found[i]) if i in found else ("not_found", "Not found") for i in ids}
+
+
+async def _fetch_batches(cache, jobs, concurrency, timeout):
+    """Run (source, fetch, ids) jobs on one pooled session, caching each batch as it completes."""
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout,
+                                     headers={"Accept": "application/json"}) as session:
+        sem = asyncio.Semaphore(concurrency)
+        tasks = [_run_batch(sem, source, lambda ids, f=fetch: f(session, ids), ids) for source, fetch, ids in jobs]
+        n_failed = 0
+        for done, task in enumerate(asyncio.as_completed(tasks), 1):
+            source, ids, results = await task
+            cache.put(source, results)
+            failed = sum(status == "error" for status, _ in results.values())
+            n_failed += failed
+            print(f"[INFO] {source} batch {done}/{len(tasks)}: {len(ids)} IDs"
+                  + (f", X {failed} failed" if failed else ""))
+    return n_failed
+
+
+def fetch_annotations(gene_ids, go_ids, cache_db="api_cache.sqlite", uniprot_url=UNIPROT_URL,
+                      quickgo_url=QUICKGO_URL, concurrency=8, uniprot_batch=100, quickgo_batch=100,
+                      timeout=60, retries=5, backoff=1.0, retry_not_found=False):
+    """
+    Fetch UniProt entries for gene IDs and QuickGO records for GO IDs, through the cache.
+
+    Parameters:
+        gene_ids (list): UniProt accessions and/or RefSeq protein IDs
+        go_ids (list): GO term IDs (GO:0004984)
+        cache_db (str): SQLite cache path
+        uniprot_url, quickgo_url (str): Service base URLs (point them at a mock server for tests)
+        concurrency (int): Requests in flight (also the connection pool size)
+        uniprot_batch, quickgo_batch (int): IDs per request
+        timeout (float): Seconds per request
+        retries (int): Retries per request on 429/5xx/connection errors
+        backoff (float): First retry delay in seconds, doubled each retry
+        retry_not_found (bool): Ask again for IDs the services did not know last time
+
+    Returns:
+        tuple: ({gene ID: UniProt entry JSON}, {GO ID: QuickGO JSON}); failures are {"error": ...}
+    """
+    retry = {"retries": retries, "backoff": backoff}
+
+    async def accessions(session, ids):
+        return await _uniprot_accessions(session, uniprot_url, ids, **retry)
+
+    async def refseq(session, ids):
+        return await _uniprot_refseq(session, uniprot_url, ids, **retry)
+
+    async def terms(session, ids):
+        return await _quickgo_terms(session, quickgo_url, ids, **retry)
+
+    with ResponseCache(cache_db) as cache:
+        todo_genes = cache.pending("uniprot", gene_ids, retry_not_found)
+        todo_go = cache.pending("quickgo", go_ids, retry_not_found)
+        print(f"[INFO] UniProt: {len(todo_genes):,} of {len(set(gene_ids)):,} IDs to fetch; "
+              f"QuickGO: {len(todo_go):,} of {len(set(go_ids)):,} terms to fetch.")
+
+        uniprot_acc = [i for i in todo_genes if UNIPROT_ACCESSION.match(i)]
+        other = [i for i in todo_genes if not UNIPROT_ACCESSION.match(i)]
+        jobs = [("uniprot", accessions, ids) for ids in _batches(uniprot_acc, uniprot_batch)]
+        jobs += [("uniprot", refseq, ids) for ids in _batches(other, uniprot_batch)]
+        jobs += [("quickgo", terms, ids) for ids in _batches(todo_go, quickgo_batch)]
+        if jobs:
+            n_failed = asyncio.run(_fetch_batches(cache, jobs, concurrency, timeout))
+            if n_failed:
+                print(f"[ERROR] {n_failed:,} IDs failed; rerun to fetch only those.")
+
+        return cache.load("uniprot", gene_ids), cache.load("quickgo", go_ids)
+
 
 if __name__ == '__main__':
     # Path to your CSV file:
     csv_path = r"D:\Documents\Python Stuff - Programming\AMOD Big Data research project\Genomic_and_Geographic_analysis_of_high_altitude_bovids- NONGITHUB\Gene_Feature_Extraction\6_GOandKegg_Pathways\compareCluster_GO\GO_compareCluster.csv"
-    
+    cache_db = "api_cache.sqlite"
+    go_obo_path = "go-basic.obo"  # when present, GO terms come from the local ontology instead of QuickGO
+
     # Read the CSV file into a DataFrame.
     df = pd.read_csv(csv_path)
-    
-    # Extract unique gene IDs from the 'geneID' column.
-    gene_ids = set()
-    for ids in df['geneID'].dropna():
-        for gene in ids.split('/'):
-            gene_ids.add(gene.strip())
-    gene_ids = list(gene_ids)
-    print(f"Found {len(gene_ids)} unique gene IDs.")
 
-    # Extract unique GO IDs from the 'ID' column.
+    # Unique gene IDs from the 'geneID' column and GO IDs from the 'ID' column.
+    gene_ids = df['geneID'].dropna().str.split('/').explode().str.strip()
+    gene_ids = list(dict.fromkeys(gene_ids[gene_ids != ""]))
+    print(f"Found {len(gene_ids)} unique gene IDs.")
 
-    go_ids = set()
-    for go in df['ID'].dropna():
-        go_id = go.split('(')[0].strip()
-        go_ids.add(go_id)
-    go_ids = list(go_ids)
+    go_ids = list(dict.fromkeys(df['ID'].dropna().str.split('(').str[0].str.strip()))
     print(f"Found {len(go_ids)} unique GO term IDs.")
+    if os.path.exists(go_obo_path):
+        print(f"[INFO] {go_obo_path} found; GO terms are read from it by combine_go_uniprot_json.py.")
+        go_ids = []
 
-    # Dictionaries to store fetched API results
-    uniprot_results = {}
-    go_results = {}
-
-    #FETCH API CALLS
-    max_workers = 20 
-
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        #  UniProt API calls concurrently for gene IDs
-        future_to_gene = {executor.submit(fetch_uniprot_data, gene_id): gene_id for gene_id in gene_ids}
-        for future in as_completed(future_to_gene):
-            gene_id, data = future.result()
-            uniprot_results[gene_id] = data
-
-        # QuickGO API calls concurrently for GO term IDs
-        future_to_go = {executor.submit(fetch_go_term, go_id): go_id for go_id in go_ids}
-        for future in as_completed(future_to_go):
-            go_id, data = future.result()
-            go_results[go_id] = data
+    uniprot_results, go_results = fetch_annotations(gene_ids, go_ids, cache_db=cache_db, concurrency=8)
 
-    # save the results to JSON files for later examination
+    # save the results to JSON files for combine_go_uniprot_json.py
     with open("uniprot_results.json", "w") as f:
-        json.dump(uniprot_results, f, indent=2)
+        json.dump(uniprot_results, f, separators=(",", ":"))
     with open("go_results.json", "w") as f:
-        json.dump(go_results, f, indent=2)
+        json.dump(go_results, f, separators=(",", ":"))
 
     print("Completed fetching API data.")
@@ -1,19 +1,127 @@
 import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import silhouette_score
 import scipy.cluster.hierarchy as sch
 
-def functional_clustering_interpro(csv_path, output_dir, n_clusters=4):
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from pattern_pca import collapse_patterns
+
+# Tables up to this many domains are clustered exactly (full Ward dendrogram with one leaf
+# per domain, KMeans); larger ones, e.g. the full interpro_domain_matrix.csv, use the
+# scalable path below.
+MAX_EXACT_ROWS = 2000
+
+
+def _fit_minibatch(X, weights, k, random_state=42):
+    return MiniBatchKMeans(n_clusters=k, n_init=3, batch_size=4096,
+                           random_state=random_state).fit(X, sample_weight=weights)
+
+
+def _evaluate_k(X, weights, inverse, k, sample_size, random_state=42):
+    """Weighted inertia over all domains and silhouette on a random subsample of domains."""
+    model = _fit_minibatch(X, weights, k, random_state)
+    rng = np.random.default_rng(random_state)
+    rows = inverse[rng.choice(len(inverse), size=min(sample_size, len(inverse)), replace=False)]
+    labels = model.labels_[rows]
+    silhouette = silhouette_score(X[rows], labels) if len(np.unique(labels)) > 1 else np.nan
+    return {"k": k, "inertia": float(model.inertia_), "silhouette": float(silhouette)}
+
+
+def k_sweep(X, weights, inverse, k_range, sample_size=5000, max_workers=None, random_state=42):
+    """
+    MiniBatchKMeans for every k in parallel, scored by inertia and subsampled silhouette.
+
+    Parameters:
+        X (np.ndarray): Distinct standardized rows
+        weights (np.ndarray): Number of domains per distinct row
+        inverse (np.ndarray): Distinct-row index of every domain
+        k_range (iterable): Cluster counts to try
+        sample_size (int): Domains drawn for each silhouette score
+        max_workers (int, optional): Parallel fits
+
+    Returns:
+        pd.DataFrame: k, inertia, silhouette
+    """
+    ks = [k for k in k_range if 1 < k <= len(X)]
+    with ThreadPoolExecutor(max_workers=max_workers or min(len(ks), os.cpu_count() or 1) or 1) as pool:
+        results = list(pool.map(lambda k: _evaluate_k(X, weights, inverse, k, sample_size, random_state), ks))
+    return pd.DataFrame(results, columns=["k", "inertia", "silhouette"])
+
+
+def _plot_k_sweep(sweep, output_path):
+    fig, ax1 = plt.subplots(figsize=(8, 5))
+    ax1.plot(sweep["k"], sweep["inertia"], "o-", color="steelblue")
+    ax1.set_xlabel("Number of clusters (k)")
+    ax1.set_ylabel("Inertia", color="steelblue")
+    ax2 = ax1.twinx()
+    ax2.plot(sweep["k"], sweep["silhouette"], "s--", color="darkred")
+    ax2.set_ylabel("Silhouette (subsample)", color="darkred")
+    plt.title("MiniBatchKMeans k sweep")
+    plt.tight_layout()
+    plt.savefig(output_path)
+    plt.close()
+
+
+def _plot_dendrogram(X, weights, output_path, n_micro=256, n_leaves=30, random_state=42):
+    """
+    Ward dendrogram of micro-cluster centroids, drawn truncated to its last `n_leaves` merges.
+
+    The distinct rows are first summarised by up to `n_micro` MiniBatchKMeans centroids, so
+    the linkage works on a few hundred points instead of every domain (approximate Ward).
+    Leaf labels give the number of domains below each leaf.
+    """
+    if len(X) > n_micro:
+        micro = _fit_minibatch(X, weights, n_micro, random_state)
+        centers = micro.cluster_centers_
+        sizes = np.bincount(micro.labels_, weights=weights, minlength=n_micro)
+        centers, sizes = centers[sizes > 0], sizes[sizes > 0]
+    else:
+        centers, sizes = X, weights
+    if len(centers) < 2:
+        print("[INFO] Dendrogram skipped: fewer than two distinct domain profiles.")
+        return
+
+    Z = sch.linkage(centers, method="ward")
+    # Domains below every node (leaves carry their micro-cluster size)
+    counts = np.concatenate([sizes, np.zeros(len(Z))])
+    for i, (a, b) in enumerate(Z[:, :2].astype(int)):
+        counts[len(sizes) + i] = counts[a] + counts[b]
+
+    plt.figure(figsize=(14, 8))
+    sch.dendrogram(Z, truncate_mode="lastp", p=min(n_leaves, len(centers)), leaf_rotation=90,
+                   leaf_label_func=lambda node: f"{int(counts[node]):,} domains")
+    plt.title("Hierarchical Clustering of InterPro Domains (truncated)")
+    plt.tight_layout()
+    plt.savefig(output_path)
+    plt.close()
+
+
+def functional_clustering_interpro(csv_path, output_dir, n_clusters=4, k_range=None,
+                                   max_exact_rows=MAX_EXACT_ROWS, sample_size=5000, max_workers=None):
     """
     Performs functional clustering of InterPro domains across species.
 
+    Small tables (top-N comparisons) are clustered exactly. Larger ones are collapsed to
+    their distinct count profiles and clustered with weighted MiniBatchKMeans; the
+    dendrogram is built on micro-cluster centroids and drawn truncated.
+
     Parameters:
-        csv_path (str): Path to the InterPro domain count CSV.
+        csv_path (str): Path to the InterPro domain count CSV (interpro_domain_matrix.csv from
+                        interpro_matrix.build_interpro_matrix, or a top-N comparison CSV).
         output_dir (str): Output directory to save plots and clustered CSV.
-        n_clusters (int): Number of clusters for KMeans (default=4).
+        n_clusters (int or None): Number of clusters (default=4); None picks the k with the best
+                                  silhouette from k_range.
+        k_range (iterable, optional): k values to sweep (scalable mode), e.g. range(2, 13)
+        max_exact_rows (int): Largest table clustered exactly
+        sample_size (int): Domains used per silhouette score
+        max_workers (int, optional): Parallel fits in the k sweep
     """
     os.makedirs(output_dir, exist_ok=True)
 
@@ -23,29 +131,53 @@ def functional_clustering_interpro(csv_path, output_dir, n_clusters=4):
     # Fill missing values with 0
     df.fillna(0, inplace=True)
 
-    # Features = counts for each species (skip first column)
-    features = df.columns[1:]
+    # Features = counts for each species (numeric columns; InterPro_Acc / InterPro_Desc are labels)
+    features = df.select_dtypes("number").columns
     X = df[features].values
 
     # Standardize the data
-    X_scaled = StandardScaler().fit_transform(X)
+    scaler = StandardScaler().fit(X)
+    X_scaled = scaler.transform(X)
+    dendrogram_path = os.path.join(output_dir, "interpro_hierarchical_clustering.png")
 
-    # === Hierarchical Clustering (Dendrogram) ===
-    plt.figure(figsize=(14, 8))
-    dendrogram = sch.dendrogram(
-        sch.linkage(X_scaled, method='ward'),
-        labels=df['InterPro_Desc'].values,
-        leaf_rotation=90
-    )
-    plt.title("Hierarchical Clustering of InterPro Domains")
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, "interpro_hierarchical_clustering.png"))
-    plt.close()
+    if len(df) <= max_exact_rows:
+        # === Hierarchical Clustering (Dendrogram) ===
+        plt.figure(figsize=(14, 8))
+        dendrogram = sch.dendrogram(
+            sch.linkage(X_scaled, method='ward'),
+            labels=df['InterPro_Desc'].values,
+            leaf_rotation=90
+        )
+        plt.title("Hierarchical Clustering of InterPro Domains")
+        plt.tight_layout()
+        plt.savefig(dendrogram_path)
+        plt.close()
+
+        # === KMeans Clustering ===
+        kmeans = KMeans(n_clusters=n_clusters or 4, random_state=42)
+        clusters = kmeans.fit_predict(X_scaled)
+        df['Cluster'] = clusters
+    else:
+        # Identical count profiles are clustered once, weighted by how many domains share them
+        patterns, inverse, weights = collapse_patterns(X)
+        P = scaler.transform(patterns)
+        print(f"DATA Processing: {len(df):,} domains, {len(P):,} distinct count profiles")
+
+        # === k sweep (parallel, subsampled silhouette) ===
+        if k_range is not None or n_clusters is None:
+            sweep = k_sweep(P, weights, inverse, k_range or range(2, 13), sample_size, max_workers)
+            sweep.to_csv(os.path.join(output_dir, "interpro_k_sweep.csv"), index=False)
+            _plot_k_sweep(sweep, os.path.join(output_dir, "interpro_k_sweep.png"))
+            if n_clusters is None:
+                n_clusters = int(sweep.loc[sweep["silhouette"].idxmax(), "k"])
+                print(f"[INFO] Best silhouette at k = {n_clusters}")
+
+        # === Hierarchical Clustering (truncated dendrogram on micro-clusters) ===
+        _plot_dendrogram(P, weights, dendrogram_path)
 
-    # === KMeans Clustering ===
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-    clusters = kmeans.fit_predict(X_scaled)
-    df['Cluster'] = clusters
+        # === MiniBatchKMeans Clustering ===
+        kmeans = _fit_minibatch(P, weights, min(n_clusters, len(P)))
+        df['Cluster'] = kmeans.labels_[inverse]
 
     # Save clustered data
     clustered_path = os.path.join(output_dir, "interpro_clustered.csv")
@@ -71,7 +203,7 @@ def functional_clustering_interpro(csv_path, output_dir, n_clusters=4):
 
 #_---------------------------
 if __name__ == "__main__":
-    csv_path = r"D:\Documents\Python Stuff - Programming\AMOD Big Data research project\Genomic_and_Geographic_analysis_of_high_altitude_bovids- NONGITHUB\Gene_Feature_Extraction\6_GOandKegg_Pathways\interpro_output\interpro_domain_comparison.csv"
+    csv_path = r"D:\Documents\Python Stuff - Programming\AMOD Big Data research project\Genomic_and_Geographic_analysis_of_high_altitude_bovids- NONGITHUB\Gene_Feature_Extraction\6_GOandKegg_Pathways\interpro_output\interpro_domain_matrix.csv"
     output_dir = r"D:\Documents\Python Stuff - Programming\AMOD Big Data research project\Genomic_and_Geographic_analysis_of_high_altitude_bovids- NONGITHUB\Gene_Feature_Extraction\6_GOandKegg_Pathways\interpro_output\functional_clustering_output"
 
     functional_clustering_interpro(csv_path, output_dir)
@@ -0,0 +1,71 @@
+import os
+import sys
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from go_ontology import load_ontology
+from go_enrichment import interpro_go_pairs, incidence_matrix, enrich_clusters
+
+# Python counterpart of run_go_enrichment_from_interpro.R: GO terms from the InterProScan
+# TSVs, one gene cluster per species, enricher-style hypergeometric tests with BH correction.
+# With go-basic.obo present, annotations are propagated to all ancestor terms first.
+
+
+def run_compare_cluster_enrichment(file_paths, species_names, output_dir="compareCluster_GO",
+                                   obo_path=None, pvalue_cutoff=0.1, min_size=10, max_size=500):
+    """
+    Species-level GO enrichment in compareCluster layout.
+
+    Parameters:
+        file_paths (list): InterProScan TSVs (run with -goterms)
+        species_names (list): Cluster label per file
+        output_dir (str): Where GO_compareCluster.csv is written
+        obo_path (str, optional): go-basic.obo for ancestor propagation and term names
+        pvalue_cutoff (float): pvalue / p.adjust cutoff
+        min_size, max_size (int): Term size limits
+
+    Returns:
+        pd.DataFrame: Enrichment table
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    pairs, clusters = [], {}
+    for path, species in zip(file_paths, species_names):
+        if not os.path.exists(path):
+            print(f"X File not found for species {species}: {path}")
+            continue
+        df = interpro_go_pairs(path)
+        print(f"DATA Processing: {species} ({df['Protein_ID'].nunique():,} proteins, {len(df):,} GO annotations)")
+        pairs.append(df)
+        clusters[species] = df["Protein_ID"].unique()
+
+    if not pairs or all(df.empty for df in pairs):
+        print("X No GO terms found in any species.")
+        return None
+    pairs = pd.concat(pairs, ignore_index=True)
+
+    ontology = load_ontology(obo_path) if obo_path and os.path.exists(obo_path) else None
+    if ontology is None:
+        print("[INFO] No ontology given; testing annotated terms only (no ancestor propagation).")
+    A, genes, terms = incidence_matrix(pairs["Protein_ID"], pairs["GO"], ontology)
+
+    describe = (lambda go_id: ontology.term(go_id)["name"] if go_id in ontology else go_id) if ontology else None
+    result = enrich_clusters(clusters, A, genes, terms, min_size=min_size, max_size=max_size,
+                             pvalue_cutoff=pvalue_cutoff, descriptions=describe)
+
+    result_file = os.path.join(output_dir, "GO_compareCluster.csv")
+    result.to_csv(result_file, index=False)
+    print(f":D Saved enrichment table ({len(result):,} terms) to: {result_file}")
+    return result
+
+
+if __name__ == "__main__":
+    base = r"D:/Documents/Python Stuff - Programming/AMOD Big Data research project/Wild-Yak--Takin--and-High-Altitude-Bovids---Genomic-and-Geographic-Adaptations/Gene_Feature_Extraction/4_protein_translation"
+    file_paths = [
+        os.path.join(base, "wildyak_full_interpro.tsv"),
+        os.path.join(base, "takin_interpro.tsv"),
+        os.path.join(base, "buffalo_interpro.tsv"),
+    ]
+    species_names = ["WildYak", "Takin", "WaterBuffalo"]
+
+    run_compare_cluster_enrichment(file_paths, species_names, obo_path="go-basic.obo", pvalue_cutoff=0.1)
@@ -1,6 +1,10 @@
-import pandas as pd
+import os
+import sys
 
-def extract_genes_from_csv(csv_path, feature_types=["CDS", "gene", "mRNA"], save_as=None):
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from feature_store import load_features
+
+def extract_genes_from_csv(csv_path, feature_types=["CDS", "gene", "mRNA"], save_as=None, species=None):
     """
     Extract gene-related entries from a .csv file converted from .gbff.
 
@@ -8,14 +12,16 @@ def extract_genes_from_csv(csv_path, feature_types=["CDS", "gene", "mRNA"], save
     - csv_path: str — Path to the input CSV file.
     - feature_types: list — List of feature types to extract (default: CDS, gene, mRNA).
     - save_as: str — Optional output CSV filename to save results.
+    - species: str — Feature store species key (default: CSV name without '_genomic_features.csv').
 
     Returns:
     - DataFrame with filtered gene-related entries.
     """
-    df = pd.read_csv(csv_path)
+    if species is None:
+        species = os.path.basename(csv_path).split("_genomic")[0]
 
-    # Filter gene-related features
-    gene_df = df[df['Feature_Type'].isin(feature_types)].copy()
+    # Filter gene-related features (only the matching Feature_Type partitions are read)
+    gene_df = load_features(species, feature_types=feature_types, csv_path=csv_path)
 
 
     if save_as:
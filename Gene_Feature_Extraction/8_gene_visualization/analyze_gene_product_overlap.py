@@ -1,39 +1,48 @@
 import pandas as pd
 import matplotlib.pyplot as plt
-from matplotlib_venn import venn3
 import seaborn as sns
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from intersections import membership_bitmask, pattern_counts, select, plot_venn_patterns, plot_upset
 
 def analyze_gene_product_overlap(wildyak_csv, takin_csv, buffalo_csv, output_dir):
     os.makedirs(output_dir, exist_ok=True)
 
-    # Load CSVs
-    wildyak_df = pd.read_csv(wildyak_csv)
-    takin_df = pd.read_csv(takin_csv)
-    buffalo_df = pd.read_csv(buffalo_csv)
+    # Load only the Product column of each CSV
+    products = {
+        "WildYak": pd.read_csv(wildyak_csv, usecols=["Product"])["Product"],
+        "Takin": pd.read_csv(takin_csv, usecols=["Product"])["Product"],
+        "WaterBuffalo": pd.read_csv(buffalo_csv, usecols=["Product"])["Product"],
+    }
+    species = list(products)
+
+    # One presence bitmask per distinct product (NAs dropped); every set below is a mask test
+    all_products, masks = membership_bitmask(products)
+    patterns = pattern_counts(masks, species)
+    patterns.to_csv(os.path.join(output_dir, "gene_product_intersections.csv"), index=False)
 
-    # Drop NAs and convert to sets
-    wildyak_set = set(wildyak_df['Product'].dropna())
-    takin_set = set(takin_df['Product'].dropna())
-    buffalo_set = set(buffalo_df['Product'].dropna())
+    def pick(include=(), exclude=()):
+        return all_products[select(masks, species, include, exclude)]
 
     # Shared and unique sets
-    shared_all = wildyak_set & takin_set & buffalo_set
-    unique_yak = wildyak_set - (takin_set | buffalo_set)
-    unique_takin = takin_set - (wildyak_set | buffalo_set)
-    unique_buffalo = buffalo_set - (wildyak_set | takin_set)
-    only_yak = wildyak_set - buffalo_set
-    only_buffalo = buffalo_set - wildyak_set
-    only_takin = takin_set - buffalo_set
+    shared_all = pick(species)
+    unique_yak = pick(["WildYak"], ["Takin", "WaterBuffalo"])
+    unique_takin = pick(["Takin"], ["WildYak", "WaterBuffalo"])
+    unique_buffalo = pick(["WaterBuffalo"], ["WildYak", "Takin"])
+    only_yak = pick(["WildYak"], ["WaterBuffalo"])
+    only_buffalo = pick(["WaterBuffalo"], ["WildYak"])
+    only_takin = pick(["Takin"], ["WaterBuffalo"])
 
     # Save each gene product set to CSV
-    pd.Series(list(shared_all)).to_csv(os.path.join(output_dir, "shared_all_species.csv"), index=False, header=["Gene_Product"])
-    pd.Series(list(unique_yak)).to_csv(os.path.join(output_dir, "unique_to_wildyak.csv"), index=False, header=["Gene_Product"])
-    pd.Series(list(unique_takin)).to_csv(os.path.join(output_dir, "unique_to_takin.csv"), index=False, header=["Gene_Product"])
-    pd.Series(list(unique_buffalo)).to_csv(os.path.join(output_dir, "unique_to_waterbuffalo.csv"), index=False, header=["Gene_Product"])
-    pd.Series(list(only_yak)).to_csv(os.path.join(output_dir, "only_yak_not_buffalo.csv"), index=False, header=["Gene_Product"])
-    pd.Series(list(only_buffalo)).to_csv(os.path.join(output_dir, "only_buffalo_not_yak.csv"), index=False, header=["Gene_Product"])
-    pd.Series(list(only_takin)).to_csv(os.path.join(output_dir, "only_takin_not_buffalo.csv"), index=False, header=["Gene_Product"])
+    pd.Series(shared_all).to_csv(os.path.join(output_dir, "shared_all_species.csv"), index=False, header=["Gene_Product"])
+    pd.Series(unique_yak).to_csv(os.path.join(output_dir, "unique_to_wildyak.csv"), index=False, header=["Gene_Product"])
+    pd.Series(unique_takin).to_csv(os.path.join(output_dir, "unique_to_takin.csv"), index=False, header=["Gene_Product"])
+    pd.Series(unique_buffalo).to_csv(os.path.join(output_dir, "unique_to_waterbuffalo.csv"), index=False, header=["Gene_Product"])
+    pd.Series(only_yak).to_csv(os.path.join(output_dir, "only_yak_not_buffalo.csv"), index=False, header=["Gene_Product"])
+    pd.Series(only_buffalo).to_csv(os.path.join(output_dir, "only_buffalo_not_yak.csv"), index=False, header=["Gene_Product"])
+    pd.Series(only_takin).to_csv(os.path.join(output_dir, "only_takin_not_buffalo.csv"), index=False, header=["Gene_Product"])
 
     # Summary table
     summary = {
@@ -47,28 +56,21 @@ def analyze_gene_product_overlap(wildyak_csv, takin_csv, buffalo_csv, output_dir
     }
 
     # ---  combined gene product presence matrix ---
-    all_products = list(wildyak_set | takin_set | buffalo_set)
-    matrix = pd.DataFrame({
-        'Gene_Product': all_products,
-        'In_WildYak': [p in wildyak_set for p in all_products],
-        'In_Takin': [p in takin_set for p in all_products],
-        'In_WaterBuffalo': [p in buffalo_set for p in all_products],
-    })
+    matrix = pd.DataFrame({'Gene_Product': all_products})
+    for sp in species:
+        matrix[f"In_{sp}"] = select(masks, species, [sp])
     matrix.to_csv(os.path.join(output_dir, "gene_product_species_matrix.csv"), index=False)
 
     # --- Save shared gene products ---
-    shared_genes_df = matrix[
-        (matrix["In_WildYak"]) & (matrix["In_Takin"]) & (matrix["In_WaterBuffalo"])
-    ]
+    shared_genes_df = matrix[select(masks, species, species)]
     shared_genes_df.to_csv(os.path.join(output_dir, "gene_product_shared_all_species.csv"), index=False)
 
     # --- Venn Diagram ---
-    plt.figure(figsize=(8, 6))
-    venn3([wildyak_set, takin_set, buffalo_set], set_labels=('Wild Yak', 'Takin', 'Water Buffalo'))
-    plt.title("Gene Product Overlap Across Species")
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, "gene_product_venn.png"))
-    plt.close()
+    labels = {"WildYak": "Wild Yak", "Takin": "Takin", "WaterBuffalo": "Water Buffalo"}
+    plot_venn_patterns(patterns, species, os.path.join(output_dir, "gene_product_venn.png"),
+                       labels=labels, title="Gene Product Overlap Across Species")
+    plot_upset(patterns, species, os.path.join(output_dir, "gene_product_upset.png"),
+               labels=labels, title="Gene Product Intersections")
 
     # --- Bar Chart ---
     summary_df = pd.DataFrame(list(summary.items()), columns=["Category", "Count"])
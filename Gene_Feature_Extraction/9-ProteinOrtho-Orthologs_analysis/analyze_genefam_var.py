@@ -3,6 +3,10 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from density_plot import plot_density
 
 def analyze_gene_family_variation(input_file, output_dir, species_order=["wild_yak", "takin", "water_buffalo"], cv_threshold=0.5):
  
@@ -38,9 +42,10 @@ def analyze_gene_family_variation(input_file, output_dir, species_order=["wild_y
     plt.close()
     print(f":D CV Histogram saved to: {hist_cv_path}")
     
-    #  scatter plot: wild_yak vs takin counts
-    plt.figure(figsize=(8, 6))
-    sns.scatterplot(data=df, x="wild_yak", y="takin", alpha=0.6, color="darkorange")
+    #  scatter plot: wild_yak vs takin counts, binned so each occupied cell is drawn once
+    fig, ax = plt.subplots(figsize=(8, 6))
+    points = plot_density(ax, df["wild_yak"], df["takin"], bins=200, mode="points", cmap="Oranges")
+    fig.colorbar(points, ax=ax, label="Gene families")
     plt.xlabel("Wild Yak Gene Count")
     plt.ylabel("Takin Gene Count")
     plt.title("Wild Yak vs. Takin Gene Family Counts")
@@ -1,18 +1,22 @@
-import pandas as pd
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from orthogroups import load_orthogroups
 
 def extract_core_orthologs_from_proteinortho(input_tsv, output_dir):
 
     os.makedirs(output_dir, exist_ok=True)
 
-    # Define headers manually
-    headers = ["Orthogroup_ID", "Connectivity", "Species_Count",
-               "Water_Buffalo", "Wild_Yak", "Takin"]
-
-    df = pd.read_csv(input_tsv, sep='\t', header=None, names=headers, comment="#")
+    # Species columns come from the ProteinOrtho header; "*" marks a species without members
+    og = load_orthogroups(input_tsv)
 
-    # Filter for rows where all 3 species have hits 
-    core_df = df.dropna(subset=["Water_Buffalo", "Wild_Yak", "Takin"])
+    # Filter for rows where all species have hits
+    core_rows = (og.counts > 0).all(axis=1).nonzero()[0]
+    core_df = og.id_frame(rows=core_rows).rename(columns={"GroupID": "Orthogroup_ID"})
+    core_df.insert(1, "Species_Count", og.meta["Species"].to_numpy()[core_rows])
+    core_df.insert(2, "Genes", og.meta["Genes"].to_numpy()[core_rows])
+    core_df.insert(3, "Connectivity", og.meta["Alg.-Conn."].to_numpy()[core_rows])
 
     output_path = os.path.join(output_dir, "core_orthologs_all_species.csv")
     core_df.to_csv(output_path, index=False)
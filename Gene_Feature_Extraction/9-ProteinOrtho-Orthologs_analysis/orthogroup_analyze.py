@@ -1,84 +1,50 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-from matplotlib_venn import venn3
-from sklearn.decomposition import PCA
-from sklearn.preprocessing import StandardScaler
 import os
+import sys
 
-def load_and_prepare_proteinortho(tsv_path):
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from orthogroups import load_orthogroups
+from intersections import presence_bitmask, pattern_counts, summarize_patterns, plot_venn_patterns, plot_upset
+from pattern_pca import pattern_pca
+from density_plot import plot_density
 
-    # Read TSV with comment #
-    df = pd.read_csv(tsv_path, sep="\t", header=None, comment="#")
-    
-    headers = ["FamilyID", "water_buffalo", "wild_yak", "takin"]
-    df = df.iloc[:, :4]
-    df.columns = headers
-    return df
+SPECIES = ["water_buffalo", "wild_yak", "takin"]
+SPECIES_LABELS = {"water_buffalo": "Water Buffalo", "wild_yak": "Wild Yak", "takin": "Takin"}
+
+def load_and_prepare_proteinortho(tsv_path, species=SPECIES):
 
-def create_presence_matrix(df):
+    # Species columns are taken from the ProteinOrtho header ("*" = absent); parsed table is cached
+    og = load_orthogroups(tsv_path)
+    df = og.count_frame(species)
+    return df.rename(columns={"GroupID": "FamilyID"})
+
+def create_presence_matrix(df, species=SPECIES):
 
     presence_df = df.copy()
-    for col in ["water_buffalo", "wild_yak", "takin"]:
+    for col in species:
         # 1 or 0
-        presence_df[col] = presence_df[col].notna() & (presence_df[col] != "")
-        presence_df[col] = presence_df[col].astype(int)
+        presence_df[col] = (presence_df[col] > 0).astype(int)
     return presence_df
 
-def summarize_orthogroups(presence_df):
+def orthogroup_patterns(presence_df, species=SPECIES):
+    """
+    Size of every presence pattern, counted with one bincount over per-group bitmasks.
+    """
+    return pattern_counts(presence_bitmask(presence_df[species]), species)
 
-    total = len(presence_df)
-    core = len(presence_df[(presence_df["water_buffalo"]==1) & 
-                            (presence_df["wild_yak"]==1) & 
-                            (presence_df["takin"]==1)])
-    unique_buffalo = len(presence_df[(presence_df["water_buffalo"]==1) & 
-                                     (presence_df["wild_yak"]==0) & 
-                                     (presence_df["takin"]==0)])
-    unique_yak = len(presence_df[(presence_df["water_buffalo"]==0) & 
-                                 (presence_df["wild_yak"]==1) & 
-                                 (presence_df["takin"]==0)])
-    unique_takin = len(presence_df[(presence_df["water_buffalo"]==0) & 
-                                   (presence_df["wild_yak"]==0) & 
-                                   (presence_df["takin"]==1)])
-    
-    # Shared by 2 species:
-    shared_buffalo_yak = len(presence_df[(presence_df["water_buffalo"]==1) & 
-                                         (presence_df["wild_yak"]==1) & 
-                                         (presence_df["takin"]==0)])
-    shared_buffalo_takin = len(presence_df[(presence_df["water_buffalo"]==1) & 
-                                           (presence_df["wild_yak"]==0) & 
-                                           (presence_df["takin"]==1)])
-    shared_yak_takin = len(presence_df[(presence_df["water_buffalo"]==0) & 
-                                       (presence_df["wild_yak"]==1) & 
-                                       (presence_df["takin"]==1)])
-    
-    summary = {
-        "Total orthogroups": total,
-        "Core (all 3 present)": core,
-        "Unique to Water Buffalo": unique_buffalo,
-        "Unique to Wild Yak": unique_yak,
-        "Unique to Takin": unique_takin,
-        "Shared by WaterBuffalo & WildYak": shared_buffalo_yak,
-        "Shared by WaterBuffalo & Takin": shared_buffalo_takin,
-        "Shared by WildYak & Takin": shared_yak_takin,
-    }
-    
-    return summary
+def summarize_orthogroups(presence_df, species=SPECIES):
 
-def plot_venn(presence_df, output_path):
+    # Core, unique and exactly-two-species counts for any number of species
+    return summarize_patterns(orthogroup_patterns(presence_df, species), species, SPECIES_LABELS)
+
+def plot_venn(presence_df, output_path, species=SPECIES):
     """
-    Plots a Venn diagram of orthogroup sharing among the three species.
+    Plots a Venn diagram of orthogroup sharing among the species (two or three).
     """
-    buffalo_set = set(presence_df.loc[presence_df["water_buffalo"]==1, "FamilyID"])
-    yak_set = set(presence_df.loc[presence_df["wild_yak"]==1, "FamilyID"])
-    takin_set = set(presence_df.loc[presence_df["takin"]==1, "FamilyID"])
-    
-    plt.figure(figsize=(8,6))
-    venn3([buffalo_set, yak_set, takin_set], set_labels=("Water Buffalo", "Wild Yak", "Takin"))
-    plt.title("Orthogroup Sharing Among Species")
-    plt.tight_layout()
-    plt.savefig(output_path)
-    plt.close()
+    plot_venn_patterns(orthogroup_patterns(presence_df, species), species, output_path,
+                       labels=SPECIES_LABELS, title="Orthogroup Sharing Among Species")
     print(f":D Venn diagram saved to: {output_path}")
 
 def plot_bar_summary(summary_dict, output_path):
@@ -108,19 +74,20 @@ def plot_pca(presence_df, output_path):
     """
     Performs PCA on the presence/absence matrix and plots a 2D scatter plot.
     Each row is an orthogroup; though this matrix is binary, PCA helps visualize variance.
+    Rows are collapsed to their (at most 2^k) presence patterns before the decomposition,
+    which gives the same scores as StandardScaler + PCA on the full matrix.
     """
-    X = presence_df[["water_buffalo", "wild_yak", "takin"]].values
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
-    
-    pca = PCA(n_components=2)
-    principalComponents = pca.fit_transform(X_scaled)
+    X = presence_df[SPECIES].values
+    principalComponents, fit = pattern_pca(X, n_components=2, standardize=True)
     
     pca_df = pd.DataFrame(data=principalComponents, columns=["PC1", "PC2"])
     pca_df["FamilyID"] = presence_df["FamilyID"]
     
-    plt.figure(figsize=(8,6))
-    sns.scatterplot(data=pca_df, x="PC1", y="PC2", s=10, color="darkblue")
+    # One marker per occupied bin (sized by orthogroup count) instead of one per orthogroup
+    fig, ax = plt.subplots(figsize=(8,6))
+    plot_density(ax, pca_df["PC1"], pca_df["PC2"], mode="points", color="darkblue")
+    plt.xlabel("PC1")
+    plt.ylabel("PC2")
     plt.title("PCA of Orthogroup Presence/Absence")
     plt.tight_layout()
     plt.savefig(output_path)
@@ -149,6 +116,14 @@ if __name__ == "__main__":
     presence_df.to_csv(presence_matrix_path, index=False)
     print(f"[✓] Presence matrix saved to: {presence_matrix_path}")
     
+    # Every intersection pattern (UpSet table)
+    patterns = orthogroup_patterns(presence_df)
+    patterns_path = os.path.join(output_folder, "orthogroup_intersections.csv")
+    patterns.to_csv(patterns_path, index=False)
+    plot_upset(patterns, SPECIES, os.path.join(output_folder, "upset_orthogroups.png"),
+               labels=SPECIES_LABELS, title="Orthogroup Intersections")
+    print(f"[✓] Intersection table saved to: {patterns_path}")
+
     # VENN DIAgram
     venn_output = os.path.join(output_folder, "venn_orthogroups.png")
     plot_venn(presence_df, venn_output)
@@ -1,47 +1,53 @@
 import pandas as pd
 import matplotlib.pyplot as plt
-from matplotlib_venn import venn3
 import seaborn as sns
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from orthogroups import load_orthogroups
+from intersections import pattern_counts, pattern_lookup, plot_venn_patterns, plot_upset
+from density_plot import aggregate_rows
+
+SPECIES_LABELS = {"water_buffalo": "Buffalo", "wild_yak": "Yak", "takin": "Takin"}
+VENN_LABELS = {"water_buffalo": "Water Buffalo", "wild_yak": "Wild Yak", "takin": "Takin"}
+HEATMAP_ROWS = 100
 
 def visualize_orthogroup_distributions(proteinortho_path, output_dir):
     # Setup
     os.makedirs(output_dir, exist_ok=True)
-    headers = ["Orthogroup_ID", "Connectivity", "Species_Count", "Water_Buffalo", "Wild_Yak", "Takin"]
-    df = pd.read_csv(proteinortho_path, sep="\t", header=None, names=headers, comment="#")
+    og = load_orthogroups(proteinortho_path)
+    species = og.species
+    labels = {sp: SPECIES_LABELS.get(sp, sp) for sp in species}
 
-    # Convert to presence/absence matrix
-    df['In_Buffalo'] = df['Water_Buffalo'].notna()
-    df['In_Yak'] = df['Wild_Yak'].notna()
-    df['In_Takin'] = df['Takin'].notna()
+    # Presence/absence matrix ("*" cells already count as absent)
+    presence_df = pd.DataFrame({"Orthogroup_ID": og.group_ids})
+    for i, sp in enumerate(species):
+        presence_df[f"In_{labels[sp]}"] = og.counts[:, i] > 0
 
     # Save full presence/absence matrix
-    presence_df = df[['Orthogroup_ID', 'In_Buffalo', 'In_Yak', 'In_Takin']]
     presence_df.to_csv(os.path.join(output_dir, "orthogroup_presence_matrix.csv"), index=False)
 
-    # === 1. VENN DIAGRAM ===
-    buffalo_set = set(df[df['In_Buffalo']]['Orthogroup_ID'])
-    yak_set = set(df[df['In_Yak']]['Orthogroup_ID'])
-    takin_set = set(df[df['In_Takin']]['Orthogroup_ID'])
+    # Every intersection pattern counted from the per-group bitmasks in one pass
+    patterns = pattern_counts(og.mask, species)
+    patterns.to_csv(os.path.join(output_dir, "orthogroup_intersections.csv"), index=False)
+    lookup = pattern_lookup(patterns)
 
-    plt.figure(figsize=(8, 6))
-    venn3([buffalo_set, yak_set, takin_set], set_labels=('Water Buffalo', 'Wild Yak', 'Takin'))
-    plt.title("Orthogroup Venn Diagram")
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, "venn_orthogroups.png"))
-    plt.close()
+    # === 1. VENN DIAGRAM (UpSet plot for any number of species) ===
+    plot_venn_patterns(patterns, species, os.path.join(output_dir, "venn_orthogroups.png"),
+                       labels=VENN_LABELS, title="Orthogroup Venn Diagram")
+    plot_upset(patterns, species, os.path.join(output_dir, "upset_orthogroups.png"),
+               labels=labels, title="Orthogroup Intersections")
 
     # === 2. CORE vs ACCESSORY BARPLOT ===
-    total = len(df)
-    core = len(df[df['In_Buffalo'] & df['In_Yak'] & df['In_Takin']])
-    buffalo_only = len(buffalo_set - (yak_set | takin_set))
-    yak_only = len(yak_set - (buffalo_set | takin_set))
-    takin_only = len(takin_set - (buffalo_set | yak_set))
-    shared_some = total - core - buffalo_only - yak_only - takin_only
+    total = len(og)
+    core = lookup.get((1 << len(species)) - 1, 0)
+    unique = [lookup.get(1 << i, 0) for i in range(len(species))]
+    shared_some = total - core - sum(unique)
 
     bar_data = pd.DataFrame({
-        'Category': ['Core', 'Shared (not all)', 'Unique to Buffalo', 'Unique to Yak', 'Unique to Takin'],
-        'Count': [core, shared_some, buffalo_only, yak_only, takin_only]
+        'Category': ['Core', 'Shared (not all)'] + [f"Unique to {labels[sp]}" for sp in species],
+        'Count': [core, shared_some] + unique
     })
 
     plt.figure(figsize=(10, 6))
@@ -54,10 +60,11 @@ def visualize_orthogroup_distributions(proteinortho_path, output_dir):
     plt.close()
 
     # === 3. HEATMAP ===
-    heat_df = presence_df.set_index("Orthogroup_ID").astype(int)
+    # All orthogroups, aggregated to at most HEATMAP_ROWS rows (identical rows collapsed, then averaged)
+    heat_df = aggregate_rows(presence_df.set_index("Orthogroup_ID").astype(int), max_rows=HEATMAP_ROWS)
     plt.figure(figsize=(12, 6))
-    sns.heatmap(heat_df.head(100), cmap="coolwarm", cbar=True)  # Show top 100 for clarity
-    plt.title("Orthogroup Presence/Absence (First 100)")
+    sns.heatmap(heat_df, cmap="coolwarm", cbar=True, vmin=0, vmax=1)
+    plt.title(f"Orthogroup Presence/Absence (all {len(presence_df):,} groups, {len(heat_df)} aggregated rows)")
     plt.tight_layout()
     plt.savefig(os.path.join(output_dir, "orthogroup_heatmap.png"))
     plt.close()
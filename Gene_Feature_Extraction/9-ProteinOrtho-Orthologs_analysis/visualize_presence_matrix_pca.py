@@ -1,8 +1,13 @@
 import pandas as pd
 import matplotlib.pyplot as plt
-from sklearn.decomposition import PCA
 import seaborn as sns
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from keyword_engine import any_keyword
+from pattern_pca import pattern_pca
+from density_plot import plot_density
 
 def load_presence_matrix(matrix_csv):
     try:
@@ -40,21 +45,21 @@ def visualize_presence_matrix_pca_and_bar(matrix_csv, output_pca, output_bar, ad
         df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
     
     # ---------- PCA Visualization ----------
+    # Computed on the unique count patterns (weighted by how many families share each), same result as PCA on all rows
     X = df[expected_cols].values
-    pca = PCA(n_components=2)
-    pcs = pca.fit_transform(X)
+    pcs, fit = pattern_pca(X, n_components=2)
     df['pc1'] = pcs[:, 0]
     df['pc2'] = pcs[:, 1]
     
-    plt.figure(figsize=(10, 8))
-    plt.scatter(df['pc1'], df['pc2'], color='gray', alpha=0.5, label='Gene Families')
-    
+    # Points are binned on a shared grid; marker size shows how many families fall in each bin
+    fig, ax = plt.subplots(figsize=(10, 8))
+    extent = (df['pc1'].min(), df['pc1'].max(), df['pc2'].min(), df['pc2'].max())
+    plot_density(ax, df['pc1'], df['pc2'], extent=extent, mode='points', color='gray', label='Gene Families')
 
     if adaptive_keywords:
-        mask = df[id_col].astype(str).str.lower().apply(
-            lambda x: any(keyword.lower() in x for keyword in adaptive_keywords)
-        )
-        plt.scatter(df.loc[mask, 'pc1'], df.loc[mask, 'pc2'], color='red', alpha=0.8, label='Adaptive Genes')
+        mask = any_keyword(df[id_col].astype(str), adaptive_keywords)
+        plot_density(ax, df.loc[mask, 'pc1'], df.loc[mask, 'pc2'], extent=extent, mode='points',
+                     color='red', max_size=150, label='Adaptive Genes')
     
     plt.xlabel('PC1')
     plt.ylabel('PC2')
@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+
+from pattern_pca import collapse_patterns, weighted_pca
+
+# Rendering helpers for plots with many points or rows.
+# Points are binned onto a fixed grid with one bincount before matplotlib sees them, so
+# drawing cost depends on the grid size, not on the number of gene families / orthogroups.
+# Heatmaps are reduced to a fixed number of rows by collapsing identical rows and averaging
+# neighbouring ones, instead of showing only the first N rows.
+
+
+def bin_points(x, y, bins=256, extent=None, weights=None):
+    """
+    2-D histogram of points on a regular grid.
+
+    Parameters:
+        x, y (array-like): Coordinates
+        bins (int or tuple): Grid size (nx, ny)
+        extent (tuple, optional): (xmin, xmax, ymin, ymax); default is the data range
+        weights (array-like, optional): Weight per point
+
+    Returns:
+        tuple: (counts of shape (ny, nx), extent)
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    nx, ny = (bins, bins) if np.isscalar(bins) else bins
+    ok = np.isfinite(x) & np.isfinite(y)
+    x, y = x[ok], y[ok]
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)[ok]
+    if extent is None:
+        if len(x) == 0:
+            extent = (0.0, 1.0, 0.0, 1.0)
+        else:
+            extent = (x.min(), x.max(), y.min(), y.max())
+    xmin, xmax, ymin, ymax = extent
+    # Pad degenerate ranges so single-valued axes still get one column of bins
+    if xmax <= xmin:
+        xmin, xmax = xmin - 0.5, xmax + 0.5
+    if ymax <= ymin:
+        ymin, ymax = ymin - 0.5, ymax + 0.5
+
+    ix = np.clip(((x - xmin) / (xmax - xmin) * nx).astype(np.int64), 0, nx - 1)
+    iy = np.clip(((y - ymin) / (ymax - ymin) * ny).astype(np.int64), 0, ny - 1)
+    inside = (x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax)
+    counts = np.bincount(iy[inside] * nx + ix[inside],
+                         weights=None if weights is None else weights[inside],
+                         minlength=nx * ny).reshape(ny, nx)
+    return counts, (xmin, xmax, ymin, ymax)
+
+
+def plot_density(ax, x, y, bins=256, extent=None, mode="raster", cmap="viridis", color=None,
+                 max_size=300, label=None, log=True):
+    """
+    Draw points as an aggregated density instead of one marker per point.
+
+    Modes:
+        raster - image of the binned counts (datashader-style), empty bins transparent
+        points - one marker per non-empty bin, sized/coloured by its count; suits discrete data
+                 such as gene counts or presence-pattern PCA scores, where many points coincide
+
+    Parameters:
+        ax: Matplotlib axes
+        x, y (array-like): Coordinates
+        bins (int): Grid resolution per axis
+        extent (tuple, optional): (xmin, xmax, ymin, ymax)
+        mode (str): 'raster' or 'points'
+        cmap (str): Colormap for counts
+        color (str, optional): Fixed marker colour in 'points' mode (size still scales with count)
+        max_size (float): Marker area of the fullest bin in 'points' mode
+        label (str, optional): Legend label
+        log (bool): Log-scale the count colouring
+
+    Returns:
+        Matplotlib artist (use for a colorbar)
+    """
+    from matplotlib.colors import LogNorm, Normalize
+
+    counts, extent = bin_points(x, y, bins=bins, extent=extent)
+    vmax = max(counts.max(), 1)
+    norm = LogNorm(vmin=1, vmax=vmax) if log and vmax > 1 else Normalize(vmin=0, vmax=vmax)
+
+    if mode == "raster":
+        artist = ax.imshow(np.ma.masked_equal(counts, 0), origin="lower", extent=extent, aspect="auto",
+                           cmap=cmap, norm=norm, interpolation="nearest")
+        if label:
+            ax.plot([], [], "s", color=artist.cmap(0.7), label=label)
+        return artist
+    if mode != "points":
+        raise ValueError(f"Unknown density mode: {mode}")
+
+    iy, ix = np.nonzero(counts)
+    c = counts[iy, ix]
+    xmin, xmax, ymin, ymax = extent
+    nx, ny = counts.shape[1], counts.shape[0]
+    cx = xmin + (ix + 0.5) * (xmax - xmin) / nx
+    cy = ymin + (iy + 0.5) * (ymax - ymin) / ny
+    sizes = 10 + (max_size - 10) * np.sqrt(c / vmax)
+    if color is not None:
+        return ax.scatter(cx, cy, s=sizes, color=color, alpha=0.7, label=label, edgecolors="none")
+    return ax.scatter(cx, cy, s=sizes, c=c, cmap=cmap, norm=norm, alpha=0.8, label=label, edgecolors="none")
+
+
+def aggregate_rows(df, max_rows=200):
+    """
+    Reduce a (rows x columns) numeric table to at most `max_rows` display rows.
+
+    Identical rows are collapsed first; if that is still too many, the distinct rows are
+    ordered along their first principal component and averaged in `max_rows` bands of equal
+    total size, so similar rows end up next to each other (a cheap row clustering).
+
+    Parameters:
+        df (pd.DataFrame): Numeric table, e.g. an orthogroup presence matrix
+        max_rows (int): Rows to keep
+
+    Returns:
+        pd.DataFrame: Aggregated rows (index labels give how many input rows each represents)
+    """
+    values = df.to_numpy(dtype=float)
+    patterns, _, weights = collapse_patterns(values)
+    patterns = np.asarray(patterns, dtype=float)
+
+    if len(patterns) <= max_rows:
+        order = np.argsort(-weights, kind="stable")
+        out = pd.DataFrame(patterns[order], columns=df.columns)
+        out.index = [f"{w:,} rows" for w in weights[order]]
+        return out
+
+    pc1 = weighted_pca(patterns, weights, n_components=1)["scores"][:, 0]
+    order = np.argsort(pc1, kind="stable")
+    patterns, weights = patterns[order], weights[order]
+    cum = np.cumsum(weights)
+    band = np.minimum(((cum - weights / 2) / cum[-1] * max_rows).astype(np.int64), max_rows - 1)
+    band_weight = np.bincount(band, weights=weights, minlength=max_rows)
+    used = band_weight > 0
+    sums = np.stack([np.bincount(band, weights=weights * patterns[:, j], minlength=max_rows)
+                     for j in range(patterns.shape[1])], axis=1)
+    out = pd.DataFrame(sums[used] / band_weight[used, None], columns=df.columns)
+    out.index = [f"{int(w):,} rows" for w in band_weight[used]]
+    return out
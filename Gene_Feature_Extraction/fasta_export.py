@@ -0,0 +1,129 @@
+import os
+import heapq
+import hashlib
+import numpy as np
+import pandas as pd
+
+
+def write_fasta(ids, seqs, fasta_path, block_size=50000, buffer_size=1 << 20):
+    """
+    Write (id, sequence) pairs as FASTA with bulk formatting and buffered writes.
+
+    Records are formatted a block at a time with vectorised string concatenation and
+    written as one string per block, so the export is bound by disk speed rather than
+    per-row Python overhead.
+
+    Returns:
+        int: Number of records written
+    """
+    ids = pd.Series(ids, dtype=object).reset_index(drop=True).astype(str)
+    seqs = pd.Series(seqs, dtype=object).reset_index(drop=True).astype(str)
+    with open(fasta_path, "w", buffering=buffer_size) as f:
+        for start in range(0, len(ids), block_size):
+            block = ">" + ids.iloc[start:start + block_size] + "\n" + seqs.iloc[start:start + block_size] + "\n"
+            f.write("".join(block.tolist()))
+    return len(ids)
+
+
+def collapse_identical(records, id_col="protein_id", seq_col="translation"):
+    """
+    Keep one representative per distinct sequence.
+
+    Identical sequences are grouped exactly (hash-based factorisation of the full string);
+    the first ID of each group in input order becomes the representative and the group is
+    labelled with the MD5 of its sequence, the same key InterProScan uses for lookups.
+
+    Returns:
+        tuple: (representative records DataFrame, mapping DataFrame with one row per input ID:
+                Protein_ID, Representative, MD5)
+    """
+    codes, uniques = pd.factorize(records[seq_col], sort=False)
+    _, first = np.unique(codes, return_index=True)  # earliest row of each distinct sequence
+
+    md5 = np.array([hashlib.md5(seq.encode()).hexdigest() for seq in uniques], dtype=object)
+    ids = records[id_col].to_numpy(dtype=object)
+    mapping = pd.DataFrame({
+        "Protein_ID": ids,
+        "Representative": ids[first[codes]],
+        "MD5": md5[codes],
+    })
+    return records.iloc[np.sort(first)].reset_index(drop=True), mapping
+
+
+def subset_records(records, n, seed=None):
+    """First `n` records, or a reproducible random `n` (kept in input order) when a seed is given."""
+    if n is None or n >= len(records):
+        return records
+    if seed is None:
+        return records.iloc[:n]
+    picked = np.sort(np.random.default_rng(seed).choice(len(records), size=n, replace=False))
+    return records.iloc[picked]
+
+
+def balanced_shards(lengths, n_shards):
+    """
+    Assign records to `n_shards` chunks with near-equal total residues.
+
+    Longest-first greedy (LPT): each record goes to the currently lightest shard, which
+    keeps InterProScan/BLAST run time per shard close because it scales with sequence length.
+
+    Returns:
+        ndarray: Shard index per record
+    """
+    lengths = np.asarray(lengths)
+    shard = np.empty(len(lengths), dtype=np.int64)
+    heap = [(0, k) for k in range(n_shards)]
+    for idx in np.argsort(-lengths, kind="stable"):
+        load, k = heapq.heappop(heap)
+        shard[idx] = k
+        heapq.heappush(heap, (load + int(lengths[idx]), k))
+    return shard
+
+
+def export_proteins(df, fasta_path, id_col="protein_id", seq_col="translation", dedupe=False,
+                    n=None, seed=None, n_shards=1, mapping_path=None):
+    """
+    Export a protein table to FASTA: filter, optionally collapse identical sequences, subset, shard.
+
+    Parameters:
+        df (pd.DataFrame): Table with an ID and a sequence column
+        fasta_path (str): Output FASTA; shards are written as <name>.part01.fasta, ...
+        id_col (str): Column used as the FASTA header
+        seq_col (str): Column holding the protein sequence
+        dedupe (bool): Write one representative per identical sequence
+        n (int, optional): Keep only this many records (after collapsing)
+        seed (int, optional): Random but reproducible subset instead of the first `n`
+        n_shards (int): Number of length-balanced output chunks
+        mapping_path (str, optional): ID -> representative TSV (default <fasta>.map.tsv when dedupe)
+
+    Returns:
+        dict: {"n_input", "n_written", "fasta_paths", "mapping_path"}
+    """
+    records = df[[id_col, seq_col]]
+    records = records[records[id_col].notna() & records[seq_col].notna()]
+    records = records[records[seq_col].astype(str).str.len() > 0].reset_index(drop=True)
+    n_input = len(records)
+
+    if dedupe:
+        records, mapping = collapse_identical(records, id_col, seq_col)
+        mapping_path = mapping_path or os.path.splitext(fasta_path)[0] + ".map.tsv"
+        mapping.to_csv(mapping_path, sep="\t", index=False)
+    else:
+        mapping_path = None
+
+    records = subset_records(records, n, seed)
+
+    if n_shards <= 1:
+        fasta_paths = [fasta_path]
+        write_fasta(records[id_col], records[seq_col], fasta_path)
+    else:
+        shard = balanced_shards(records[seq_col].str.len().to_numpy(), n_shards)
+        base, ext = os.path.splitext(fasta_path)
+        fasta_paths = []
+        for k in range(n_shards):
+            part = records[shard == k]
+            part_path = f"{base}.part{k + 1:02d}{ext}"
+            write_fasta(part[id_col], part[seq_col], part_path)
+            fasta_paths.append(part_path)
+
+    return {"n_input": n_input, "n_written": len(records), "fasta_paths": fasta_paths, "mapping_path": mapping_path}
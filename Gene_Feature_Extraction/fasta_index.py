@@ -0,0 +1,142 @@
+import os
+import mmap
+
+
+def build_fai(fasta_path, fai_path=None):
+    """
+    Write a samtools-faidx compatible index (.fai) for a FASTA file.
+
+    One line per record: NAME, LENGTH, OFFSET, LINEBASES, LINEWIDTH, where OFFSET is the
+    byte position of the first residue and LINEBASES/LINEWIDTH describe the line wrapping
+    (single-line sequences simply have LINEBASES == LENGTH). The key is the first word of
+    the header, as in load_fasta_to_dict.
+
+    Parameters:
+        fasta_path (str): FASTA file to index
+        fai_path (str, optional): Output index (default: <fasta_path>.fai)
+
+    Returns:
+        str: Path of the index
+    """
+    fai_path = fai_path or fasta_path + ".fai"
+    entries = []
+    name = None
+    with open(fasta_path, "rb") as f:
+        offset = 0
+        for line in f:
+            line_len = len(line)
+            if line.startswith(b">"):
+                if name is not None:
+                    entries.append((name, length, seq_offset, line_bases, line_width))
+                name = line[1:].split(None, 1)[0].decode() if line[1:].strip() else ""
+                seq_offset, length, line_bases, line_width, short_seen = offset + line_len, 0, 0, 0, False
+            elif name is not None:
+                bases = len(line.rstrip(b"\r\n"))
+                if bases:
+                    if short_seen:
+                        raise ValueError(f"{fasta_path}: inconsistent line length in record '{name}'")
+                    if line_bases == 0:
+                        line_bases, line_width = bases, line_len
+                    elif bases != line_bases or line_len != line_width:
+                        if bases > line_bases:
+                            raise ValueError(f"{fasta_path}: inconsistent line length in record '{name}'")
+                        short_seen = True  # only the last line of a record may be shorter
+                    length += bases
+            offset += line_len
+        if name is not None:
+            entries.append((name, length, seq_offset, line_bases, line_width))
+
+    with open(fai_path, "w") as out:
+        for entry in entries:
+            out.write("\t".join(map(str, entry)) + "\n")
+    return fai_path
+
+
+class FastaReader:
+    """
+    Random access to FASTA records by ID through a persisted .fai index and mmap.
+
+    The index is built once next to the FASTA (and rebuilt if the FASTA is newer); after
+    that, opening a proteome only reads the index, and each lookup copies just the bytes
+    of the requested sequence out of the memory-mapped file, so start-up time and memory
+    do not grow with the size of the proteome.
+
+    Usage:
+        with FastaReader("takin_proteins.fasta") as takin:
+            seq = takin.get("XP_012345.1")
+    """
+
+    def __init__(self, fasta_path, fai_path=None):
+        self.fasta_path = fasta_path
+        self.fai_path = fai_path or fasta_path + ".fai"
+        if not os.path.exists(self.fai_path) or os.path.getmtime(self.fai_path) < os.path.getmtime(fasta_path):
+            build_fai(fasta_path, self.fai_path)
+
+        self.index = {}
+        with open(self.fai_path) as f:
+            for line in f:
+                name, length, offset, line_bases, line_width = line.rstrip("\n").split("\t")[:5]
+                self.index[name] = (int(length), int(offset), int(line_bases), int(line_width))
+
+        self._file = open(fasta_path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(fasta_path) else b""
+
+    def fetch(self, name):
+        """Sequence of record `name`; raises KeyError if it is not in the index."""
+        length, offset, line_bases, line_width = self.index[name]
+        if length == 0:
+            return ""
+        n_lines = (length - 1) // line_bases
+        raw = self._mm[offset:offset + n_lines * line_width + (length - n_lines * line_bases)]
+        if n_lines:
+            raw = raw.replace(b"\r", b"").replace(b"\n", b"")
+        return raw.decode()
+
+    def get(self, name, default=None):
+        return self.fetch(name) if name in self.index else default
+
+    def __getitem__(self, name):
+        return self.fetch(name)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def keys(self):
+        return self.index.keys()
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_fasta(fasta_path, full_header=False):
+    """
+    Stream (id, sequence) pairs from a small FASTA such as one alignment.
+
+    Parameters:
+        fasta_path (str): FASTA file
+        full_header (bool): Use the whole header line as ID instead of its first word
+    """
+    seq_id, seq_lines = None, []
+    with open(fasta_path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith(">"):
+                if seq_id and seq_lines:
+                    yield seq_id, "".join(seq_lines)
+                seq_id = line[1:] if full_header else line[1:].split()[0]
+                seq_lines = []
+            elif line:
+                seq_lines.append(line)
+    if seq_id and seq_lines:
+        yield seq_id, "".join(seq_lines)
@@ -0,0 +1,159 @@
+import os
+import re
+import csv
+import shutil
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Shared columnar store for the *_genomic_features tables, laid out as
+#   feature_store/species=<key>/Feature_Type=<type>/part-*.parquet
+FEATURE_STORE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "1_genomic_feature_extraction", "feature_store")
+
+# Typed schema of one feature row (same columns as the CSV export)
+FEATURE_SCHEMA = pa.schema([
+    ("Contig", pa.dictionary(pa.int32(), pa.string())),
+    ("Feature_Type", pa.dictionary(pa.int32(), pa.string())),
+    ("Start", pa.int32()),
+    ("End", pa.int32()),
+    ("Strand", pa.int8()),
+    ("Locus_Tag", pa.string()),
+    ("Gene", pa.string()),
+    ("Product", pa.string()),
+    ("Protein_ID", pa.string()),
+    ("Translation", pa.string()),
+    ("Note", pa.string()),
+])
+STRING_COLUMNS = ["Locus_Tag", "Gene", "Product", "Protein_ID", "Translation", "Note"]
+PARTITIONING = ds.partitioning(pa.schema([("species", pa.string()), ("Feature_Type", pa.string())]), flavor="hive")
+
+
+def species_key(species):
+    """Partition key for a species label: 'Wild Yak', 'WildYak' and 'wildyak' all map to 'wildyak'."""
+    return re.sub(r"[^a-z0-9]", "", species.lower())
+
+
+def _store_batch(batch, key):
+    """Cast one batch to the store layout: typed columns, empty strings as nulls, plus the partition columns."""
+    arrays, names = [], []
+    for field in FEATURE_SCHEMA:
+        col = batch.column(field.name)
+        if field.name == "Feature_Type":
+            col, field = col.cast(pa.string()), pa.field("Feature_Type", pa.string())
+        elif field.name in STRING_COLUMNS:
+            col = col.cast(pa.string())
+            col = pc.if_else(pc.equal(col, ""), pa.scalar(None, pa.string()), col)
+        else:
+            col = col.cast(field.type)
+        arrays.append(col)
+        names.append(field.name)
+    arrays.append(pa.array([key] * batch.num_rows, pa.string()))
+    names.append("species")
+    return pa.RecordBatch.from_arrays(arrays, names=names)
+
+
+def _csv_batches(csv_path):
+    """Stream a feature CSV (comma or tab separated) as Arrow record batches."""
+    with open(csv_path, "r", encoding="utf-8") as f:
+        try:
+            sep = csv.Sniffer().sniff(f.read(1024), delimiters=[",", "\t"]).delimiter
+        except csv.Error:
+            sep = ","
+    column_types = {"Start": pa.int32(), "End": pa.int32(), "Strand": pa.float64()}
+    column_types.update({name: pa.string() for name in ["Contig", "Feature_Type"] + STRING_COLUMNS})
+    reader = pv.open_csv(
+        csv_path,
+        read_options=pv.ReadOptions(block_size=64 * 1024 * 1024),
+        parse_options=pv.ParseOptions(delimiter=sep, newlines_in_values=True),
+        convert_options=pv.ConvertOptions(column_types=column_types),
+    )
+    for batch in reader:
+        yield batch
+
+
+def build_feature_store(sources, store_dir=FEATURE_STORE):
+    """
+    Write feature tables into the partitioned store, one species at a time.
+
+    Sources can be the per-species Parquet folders written by extract_features_to_parquet
+    or the older *_genomic_features.csv files; both are streamed batch by batch, so the
+    conversion never holds a whole genome in memory.
+
+    Parameters:
+        sources (dict): {species: Parquet dataset folder or CSV path}
+        store_dir (str): Root folder of the store
+
+    Returns:
+        str: store_dir
+    """
+    out_schema = pa.schema([pa.field("Feature_Type", pa.string()) if f.name == "Feature_Type" else f
+                            for f in FEATURE_SCHEMA] + [pa.field("species", pa.string())])
+    for species, source in sources.items():
+        key = species_key(species)
+        if os.path.isdir(source):
+            batches = ds.dataset(source, format="parquet").to_batches()
+        else:
+            batches = _csv_batches(source)
+
+        shutil.rmtree(os.path.join(store_dir, f"species={key}"), ignore_errors=True)
+        ds.write_dataset(
+            (_store_batch(batch, key) for batch in batches),
+            store_dir,
+            schema=out_schema,
+            format="parquet",
+            partitioning=PARTITIONING,
+            basename_template="part-{i}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            file_options=ds.ParquetFileFormat().make_write_options(compression="zstd"),
+        )
+        print(f"[✓] {species} added to feature store: {store_dir}")
+    return store_dir
+
+
+def load_features(species, columns=None, feature_types=None, filters=None,
+                  store_dir=FEATURE_STORE, csv_path=None):
+    """
+    Read one species' features from the store with column projection and predicate pushdown.
+
+    Only the requested columns are decoded, and only the Feature_Type partitions that
+    match are opened, so e.g. CDS products never touch the Translation column. If the
+    species is not in the store yet (or its CSV is newer than the store), ``csv_path`` is
+    converted first.
+
+    Parameters:
+        species (str): Species label, e.g. 'Takin' or 'Wild Yak'
+        columns (list, optional): Columns to read (default: all feature columns)
+        feature_types (list, optional): Keep only these Feature_Type values, e.g. ["CDS"]
+        filters (pyarrow.compute.Expression, optional): Extra row filter,
+            e.g. pc.field("Product").is_valid()
+        store_dir (str): Root folder of the store
+        csv_path (str, optional): Fallback *_genomic_features.csv for this species
+
+    Returns:
+        pd.DataFrame: Contig/Feature_Type/Strand as categoricals and int32 Start/End
+    """
+    key = species_key(species)
+    species_dir = os.path.join(store_dir, f"species={key}")
+    stale = (csv_path is not None and os.path.isdir(species_dir) and os.path.exists(csv_path)
+             and os.path.getmtime(csv_path) > os.path.getmtime(species_dir))
+    if not os.path.isdir(species_dir) or stale:
+        if csv_path is None or not os.path.exists(csv_path):
+            raise FileNotFoundError(f"{species} is not in the feature store ({store_dir}) and no CSV was found")
+        build_feature_store({species: csv_path}, store_dir)
+
+    expr = pc.field("species") == key
+    if feature_types is not None:
+        expr = expr & pc.field("Feature_Type").isin(list(feature_types))
+    if filters is not None:
+        expr = expr & filters
+
+    table = pq.read_table(store_dir, columns=list(columns or FEATURE_SCHEMA.names),
+                          filters=expr, partitioning=PARTITIONING)
+    df = table.to_pandas()
+    if "Feature_Type" in df.columns:
+        df["Feature_Type"] = df["Feature_Type"].astype("category")
+    if "Strand" in df.columns:
+        df["Strand"] = df["Strand"].astype("Int8").astype("category")
+    return df
@@ -0,0 +1,251 @@
+import csv
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.special import gammaln
+
+from interpro_matrix import INTERPRO_COLUMNS
+
+# Over-representation analysis of GO terms for many gene clusters at once.
+# Annotations become one sparse (genes x terms) incidence matrix, optionally propagated to
+# all ancestor terms with the ontology's closure. Overlaps of every cluster with every term
+# are one sparse product (clusters x genes) @ (genes x terms); all non-zero overlaps are
+# tested with a single vectorised hypergeometric call (= one-sided Fisher's exact test) and
+# BH-adjusted per cluster. Defaults and output columns follow clusterProfiler's
+# compareCluster(fun = "enricher") as used in run_go_enrichment_from_interpro.R.
+COMPARE_CLUSTER_COLUMNS = ["Cluster", "ID", "Description", "GeneRatio", "BgRatio",
+                           "pvalue", "p.adjust", "geneID", "Count"]
+
+
+def interpro_go_pairs(tsv_path, chunksize=1_000_000):
+    """
+    (Protein_ID, GO ID) pairs from an InterProScan TSV run with -goterms.
+
+    Source tags are dropped ("GO:0005515(InterPro)" -> "GO:0005515") so the same term
+    reported by several member databases counts once.
+
+    Returns:
+        pd.DataFrame: Protein_ID, GO (unique pairs)
+    """
+    pieces = []
+    reader = pd.read_csv(tsv_path, sep="\t", header=None, names=INTERPRO_COLUMNS, usecols=["Protein_ID", "GO"],
+                         dtype=str, na_values=["-", ""], keep_default_na=False, quoting=csv.QUOTE_NONE,
+                         chunksize=chunksize)
+    for chunk in reader:
+        chunk = chunk.dropna(subset=["GO"]).drop_duplicates()
+        go = chunk["GO"].str.split("|").explode().str.split("(").str[0].str.strip()
+        pieces.append(pd.DataFrame({"Protein_ID": chunk["Protein_ID"].reindex(go.index).to_numpy(),
+                                    "GO": go.to_numpy()}))
+    if not pieces:
+        return pd.DataFrame(columns=["Protein_ID", "GO"])
+    pairs = pd.concat(pieces, ignore_index=True)
+    return pairs[pairs["GO"] != ""].drop_duplicates(ignore_index=True)
+
+
+def incidence_matrix(genes, terms, ontology=None):
+    """
+    Sparse gene x term matrix from annotation pairs.
+
+    Parameters:
+        genes, terms (array-like): One (gene, GO ID) pair per position
+        ontology (GeneOntology, optional): If given, every gene also gets all ancestors
+                                           (is_a / part_of) of its terms; unknown IDs are kept as is
+
+    Returns:
+        tuple: (bool CSR matrix, gene index, term index)
+    """
+    gene_codes, gene_index = pd.factorize(pd.Series(genes, dtype=object))
+    terms = pd.Series(terms, dtype=object)
+
+    if ontology is None:
+        term_codes, term_index = pd.factorize(terms)
+        A = sp.csr_matrix((np.ones(len(gene_codes), dtype=bool), (gene_codes, term_codes)),
+                          shape=(len(gene_index), len(term_index)))
+        A.sum_duplicates()
+        return A, pd.Index(gene_index, name="Gene"), pd.Index(term_index, name="ID")
+
+    # Known terms go through the closure (term x ancestor-or-self); unknown ones map to themselves
+    known = ontology.indices(terms)
+    unknown_codes, unknown_ids = pd.factorize(terms[known < 0])
+    n_go = len(ontology)
+    cols = known.copy()
+    cols[known < 0] = n_go + unknown_codes
+    n_cols = n_go + len(unknown_ids)
+
+    direct = sp.csr_matrix((np.ones(len(gene_codes), dtype=np.int32), (gene_codes, cols)),
+                           shape=(len(gene_index), n_cols))
+    closure = sp.block_diag([ontology.ancestor_matrix(include_self=True).astype(np.int32),
+                             sp.identity(len(unknown_ids), dtype=np.int32)], format="csr")
+    A = (direct @ closure).tocsc()
+    used = np.flatnonzero(np.diff(A.indptr) > 0)
+    A = (A[:, used] > 0).tocsr()
+    all_ids = np.concatenate([ontology.ids.astype(object), np.asarray(unknown_ids, dtype=object)])
+    return A, pd.Index(gene_index, name="Gene"), pd.Index(all_ids[used], name="ID")
+
+
+def _log_choose(n, k):
+    return gammaln(n + 1) - gammaln(k + 1) - gammaln(n - k + 1)
+
+
+def hypergeom_sf(x, N, M, n, rtol=1e-15):
+    """
+    P(X >= x) for X ~ Hypergeometric(N, M, n), vectorised over all arguments.
+
+    Each p-value is a sum of pmf terms walked away from the distribution's mode with the
+    ratio pmf(i+1)/pmf(i), so only the terms that matter are visited: the upper tail is
+    summed directly when x lies above the mode, otherwise 1 - P(X < x) is summed downwards.
+    All tests advance together and drop out once their next term is below rtol of their sum.
+
+    Parameters:
+        x (array-like): Observed overlaps
+        N (int or array-like): Universe size
+        M (array-like): Term sizes
+        n (array-like): Cluster sizes
+    """
+    x, N, M, n = (np.asarray(a, dtype=np.int64) for a in np.broadcast_arrays(x, N, M, n))
+    x, N, M, n = x.ravel(), N.ravel(), M.ravel(), n.ravel()
+    lo, hi = np.maximum(0, n - (N - M)), np.minimum(M, n)
+    mode = (n + 1) * (M + 1) // (N + 2)
+    out = np.where(x <= lo, 1.0, 0.0)
+
+    inside = (x > lo) & (x <= hi)
+    upward = inside & (x > mode)
+    for sel, start, stop, step in ((np.flatnonzero(upward), x, hi, 1),
+                                   (np.flatnonzero(inside & ~upward), x - 1, lo, -1)):
+        if not len(sel):
+            continue
+        i, stop_i = start[sel].astype(float), stop[sel]
+        Ns, Ms, ns = N[sel].astype(float), M[sel].astype(float), n[sel].astype(float)
+        term = np.exp(_log_choose(Ms, i) + _log_choose(Ns - Ms, ns - i) - _log_choose(Ns, ns))
+        total = term.copy()
+        active = np.flatnonzero((i != stop_i) & (term > 0))
+        while len(active):
+            ia = i[active]
+            Na, Ma, na = Ns[active], Ms[active], ns[active]
+            if step > 0:
+                ratio = (Ma - ia) * (na - ia) / ((ia + 1) * (Na - Ma - na + ia + 1))
+            else:
+                ratio = ia * (Na - Ma - na + ia) / ((Ma - ia + 1) * (na - ia + 1))
+            term[active] *= ratio
+            i[active] = ia + step
+            total[active] += term[active]
+            keep = (i[active] != stop_i[active]) & (term[active] > rtol * total[active])
+            active = active[keep]
+        out[sel] = total if step > 0 else 1.0 - total
+    return np.clip(out, 0.0, 1.0)
+
+
+def bh_adjust(pvalues, groups=None):
+    """
+    Benjamini-Hochberg adjusted p-values, computed separately within each group.
+
+    Parameters:
+        pvalues (array-like): Raw p-values
+        groups (array-like, optional): Integer group per p-value (e.g. cluster index)
+    """
+    p = np.asarray(pvalues, dtype=float)
+    g = np.zeros(len(p), dtype=np.int64) if groups is None else np.asarray(groups, dtype=np.int64)
+    if len(p) == 0:
+        return p.copy()
+    order = np.lexsort((p, g))
+    gs = g[order]
+    starts = np.flatnonzero(np.r_[True, gs[1:] != gs[:-1]])
+    ends = np.r_[starts[1:], len(p)]
+    seg = np.repeat(np.arange(len(starts)), ends - starts)
+    rank = np.arange(len(p)) - starts[seg] + 1
+    adj = p[order] * (ends - starts)[seg] / rank
+
+    # Running minimum from the largest p-value down, per group
+    for a, b in zip(starts, ends):
+        adj[a:b] = np.minimum.accumulate(adj[a:b][::-1])[::-1]
+    out = np.empty(len(p))
+    out[order] = np.minimum(adj, 1.0)
+    return out
+
+
+def enrich_clusters(clusters, A, genes, terms, universe=None, min_size=10, max_size=500,
+                    pvalue_cutoff=0.05, p_adjust_cutoff=None, descriptions=None):
+    """
+    Hypergeometric enrichment of every term in every cluster in one batch.
+
+    Parameters:
+        clusters (dict): {cluster name: iterable of gene IDs}
+        A (sparse matrix): genes x terms incidence (from incidence_matrix)
+        genes, terms (pd.Index): Row / column labels of A
+        universe (iterable, optional): Background genes (default: all annotated genes, as enricher)
+        min_size, max_size (int): Term size limits within the universe (clusterProfiler minGSSize / maxGSSize)
+        pvalue_cutoff (float): Keep results with pvalue and p.adjust below this
+        p_adjust_cutoff (float, optional): Separate p.adjust cutoff (default: pvalue_cutoff)
+        descriptions (dict or callable, optional): GO ID -> description
+
+    Returns:
+        pd.DataFrame: compareCluster-style table (COMPARE_CLUSTER_COLUMNS), sorted by cluster and p-value
+    """
+    A = sp.csr_matrix(A, dtype=bool)
+    in_universe = np.ones(len(genes), dtype=bool)
+    if universe is not None:
+        in_universe = genes.isin(pd.Index(universe))
+    annotated = in_universe & (np.diff(A.indptr) > 0)
+    A = (sp.diags(annotated.astype(np.int32), dtype=np.int32) @ A.astype(np.int32)).tocsr()
+    N = int(annotated.sum())
+
+    term_size = np.asarray(A.sum(axis=0)).ravel()
+    keep_terms = np.flatnonzero((term_size >= min_size) & (term_size <= max_size))
+    A = A.tocsc()[:, keep_terms].tocsr()
+    term_size = term_size[keep_terms]
+
+    # clusters x genes membership, restricted to annotated universe genes
+    names = list(clusters)
+    rows, cols = [], []
+    for c, members in enumerate(clusters.values()):
+        idx = genes.get_indexer(pd.Index(pd.unique(pd.Series(list(members), dtype=object))))
+        idx = idx[idx >= 0]
+        idx = idx[annotated[idx]]
+        rows.append(np.full(len(idx), c))
+        cols.append(idx)
+    rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+    cols = np.concatenate(cols) if cols else np.zeros(0, dtype=np.int64)
+    C = sp.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=(len(names), len(genes)))
+    k = np.diff(C.indptr)
+
+    X = (C @ A).tocoo()
+    ci, ti, x = X.row, X.col, X.data.astype(np.int64)
+    pvalue = hypergeom_sf(x, N, term_size[ti], k[ci])
+    p_adjust = bh_adjust(pvalue, ci)
+
+    p_adjust_cutoff = pvalue_cutoff if p_adjust_cutoff is None else p_adjust_cutoff
+    hit = (pvalue < pvalue_cutoff) & (p_adjust < p_adjust_cutoff)
+    ci, ti, x, pvalue, p_adjust = ci[hit], ti[hit], x[hit], pvalue[hit], p_adjust[hit]
+    order = np.lexsort((ti, pvalue, ci))
+    ci, ti, x, pvalue, p_adjust = ci[order], ti[order], x[order], pvalue[order], p_adjust[order]
+
+    # Overlapping gene IDs, one cluster at a time (only for reported terms)
+    gene_names = np.asarray(genes, dtype=object)
+    gene_ids = np.empty(len(ci), dtype=object)
+    A_csc = A.tocsc()
+    for c in np.unique(ci):
+        sel = np.flatnonzero(ci == c)
+        members = C.indices[C.indptr[c]:C.indptr[c + 1]]
+        sub = A_csc[:, ti[sel]][members].tocsc()
+        hits = gene_names[members[sub.indices]]
+        gene_ids[sel] = ["/".join(hits[a:b]) for a, b in zip(sub.indptr[:-1], sub.indptr[1:])]
+
+    # Descriptions are looked up once per distinct term
+    term_codes, term_ids = pd.factorize(np.asarray(terms, dtype=object)[keep_terms[ti]])
+    if descriptions is None:
+        desc = np.asarray(term_ids, dtype=object)
+    elif callable(descriptions):
+        desc = np.array([descriptions(i) for i in term_ids], dtype=object)
+    else:
+        desc = np.array([descriptions.get(i, i) for i in term_ids], dtype=object)
+    return pd.DataFrame({
+        "Cluster": np.asarray(names, dtype=object)[ci],
+        "ID": np.asarray(term_ids, dtype=object)[term_codes],
+        "Description": desc[term_codes],
+        "GeneRatio": [f"{a}/{b}" for a, b in zip(x.tolist(), k[ci].tolist())],
+        "BgRatio": [f"{a}/{N}" for a in term_size[ti].tolist()],
+        "pvalue": pvalue,
+        "p.adjust": p_adjust,
+        "geneID": gene_ids,
+        "Count": x,
+    }, columns=COMPARE_CLUSTER_COLUMNS)
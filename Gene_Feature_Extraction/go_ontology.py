@@ -0,0 +1,263 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from packed_text import pack_text, unpack_text
+
+# Local Gene Ontology from go-basic.obo.
+# Terms are numbered 0..n-1 and everything lives in flat arrays: metadata per term, direct
+# parents (is_a + part_of) and the precomputed transitive closure as CSR offsets into
+# sorted ancestor indices. Term lookups are one dict access, ancestor lists are an array
+# slice and "is A an ancestor of B" is a binary search - no network involved. The parsed
+# arrays are cached next to the OBO (<obo>.npz; text as UTF-8 buffers plus offsets) and
+# rebuilt when the file changes.
+CACHE_VERSION = 2
+RELATIONS = ("is_a", "part_of")
+
+_QUOTED = re.compile(r'^"((?:[^"\\]|\\.)*)"')
+
+
+def _unquote(value):
+    """Text of an OBO quoted value ('"text" [refs]' -> 'text')."""
+    m = _QUOTED.match(value)
+    return re.sub(r"\\(.)", r"\1", m.group(1)) if m else value
+
+
+def parse_obo(obo_path, relations=RELATIONS):
+    """
+    Read the [Term] stanzas of an OBO file.
+
+    Parameters:
+        obo_path (str): go-basic.obo
+        relations (tuple): Edge types followed for ancestors ("is_a" and relationship types)
+
+    Returns:
+        list: One dict per term (id, name, namespace, definition, synonyms, alt_ids, obsolete, parents)
+    """
+    terms, term, in_term = [], None, False
+    with open(obo_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("["):
+                in_term = line == "[Term]"
+                term = {"id": None, "name": "", "namespace": "", "definition": "", "synonyms": [],
+                        "alt_ids": [], "obsolete": False, "parents": []} if in_term else None
+                if in_term:
+                    terms.append(term)
+                continue
+            if not in_term or not line or line.startswith("!"):
+                continue
+            tag, _, value = line.partition(": ")
+            if tag == "id":
+                term["id"] = value
+            elif tag == "name":
+                term["name"] = value
+            elif tag == "namespace":
+                term["namespace"] = value
+            elif tag == "def":
+                term["definition"] = _unquote(value)
+            elif tag == "synonym":
+                term["synonyms"].append(_unquote(value))
+            elif tag == "alt_id":
+                term["alt_ids"].append(value)
+            elif tag == "is_obsolete":
+                term["obsolete"] = value == "true"
+            elif tag == "is_a" and "is_a" in relations:
+                term["parents"].append(value.split()[0])
+            elif tag == "relationship":
+                rel, target = value.split()[:2]
+                if rel in relations:
+                    term["parents"].append(target)
+    return [t for t in terms if t["id"]]
+
+
+def _closure(n_terms, parent_ptr, parent_idx):
+    """Ancestor CSR of a DAG given as parent CSR, visiting terms parents-first."""
+    children = sp.csr_matrix((np.ones(len(parent_idx), dtype=bool),
+                              (parent_idx, np.repeat(np.arange(n_terms), np.diff(parent_ptr)))),
+                             shape=(n_terms, n_terms))
+    n_parents = np.diff(parent_ptr).copy()
+    queue = list(np.flatnonzero(n_parents == 0))
+    ancestors = [None] * n_terms
+    empty = np.zeros(0, dtype=np.int32)
+    while queue:
+        t = queue.pop()
+        parents = parent_idx[parent_ptr[t]:parent_ptr[t + 1]]
+        if len(parents):
+            ancestors[t] = np.unique(np.concatenate([parents] + [ancestors[p] for p in parents])).astype(np.int32)
+        else:
+            ancestors[t] = empty
+        for c in children.indices[children.indptr[t]:children.indptr[t + 1]]:
+            n_parents[c] -= 1
+            if n_parents[c] == 0:
+                queue.append(c)
+    if any(a is None for a in ancestors):
+        raise ValueError("Ontology has a cycle in the followed relations")
+    indptr = np.zeros(n_terms + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(a) for a in ancestors])
+    return indptr, np.concatenate(ancestors) if n_terms else empty
+
+
+class GeneOntology:
+    """
+    Indexed GO terms with a precomputed ancestor closure.
+
+    Attributes:
+        ids (np.ndarray): GO IDs (object array); position = term index
+        names, namespaces, definitions, synonyms (np.ndarray): Term metadata as object arrays (synonyms "; "-joined)
+        obsolete (np.ndarray): bool per term
+        parent_ptr, parent_idx: Direct parents (CSR)
+        anc_ptr, anc_idx: All ancestors, sorted, without the term itself (CSR)
+    """
+
+    def __init__(self, ids, names, namespaces, definitions, synonyms, obsolete, alt_ids, alt_targets,
+                 parent_ptr, parent_idx, anc_ptr, anc_idx):
+        # Text fields are object arrays: fixed-width strings would pad every term to the longest definition
+        self.ids = np.asarray(ids, dtype=object)
+        self.names = np.asarray(names, dtype=object)
+        self.namespaces = np.asarray(namespaces, dtype=object)
+        self.definitions = np.asarray(definitions, dtype=object)
+        self.synonyms = np.asarray(synonyms, dtype=object)
+        self.obsolete = np.asarray(obsolete, dtype=bool)
+        self.alt_ids = np.asarray(alt_ids, dtype=object)
+        self.alt_targets = np.asarray(alt_targets, dtype=np.int64)
+        self.parent_ptr, self.parent_idx = parent_ptr, parent_idx
+        self.anc_ptr, self.anc_idx = anc_ptr, anc_idx
+        self._index = dict(zip(self.alt_ids.tolist(), self.alt_targets.tolist()))
+        self._index.update(zip(self.ids.tolist(), range(len(self.ids))))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, go_id):
+        return go_id in self._index
+
+    def index(self, go_id):
+        """Term index of a GO ID (alternative IDs resolve to their primary term)."""
+        return self._index[go_id]
+
+    def indices(self, go_ids):
+        """Term index per GO ID, -1 for IDs not in the ontology."""
+        return np.array([self._index.get(g, -1) for g in go_ids], dtype=np.int64)
+
+    def term(self, go_id):
+        """Metadata of one term as a dict."""
+        i = self._index[go_id]
+        return {"id": str(self.ids[i]), "name": str(self.names[i]), "namespace": str(self.namespaces[i]),
+                "definition": str(self.definitions[i]), "synonyms": str(self.synonyms[i]),
+                "obsolete": bool(self.obsolete[i])}
+
+    def parents(self, go_id):
+        """Direct is_a / part_of parents."""
+        i = self._index[go_id]
+        return self.ids[self.parent_idx[self.parent_ptr[i]:self.parent_ptr[i + 1]]]
+
+    def ancestor_indices(self, i, include_self=False):
+        anc = self.anc_idx[self.anc_ptr[i]:self.anc_ptr[i + 1]]
+        return np.union1d(anc, [i]) if include_self else anc
+
+    def ancestors(self, go_id, include_self=False):
+        """All ancestors over is_a / part_of."""
+        return self.ids[self.ancestor_indices(self._index[go_id], include_self)]
+
+    def is_ancestor(self, ancestor_id, go_id):
+        """True if `ancestor_id` is a strict ancestor of `go_id`."""
+        a, i = self._index[ancestor_id], self._index[go_id]
+        anc = self.anc_idx[self.anc_ptr[i]:self.anc_ptr[i + 1]]
+        k = np.searchsorted(anc, a)
+        return bool(k < len(anc) and anc[k] == a)
+
+    def ancestor_matrix(self, include_self=True):
+        """Sparse (terms x terms) bool matrix, row i marking the ancestors of term i."""
+        n = len(self.ids)
+        m = sp.csr_matrix((np.ones(len(self.anc_idx), dtype=bool), self.anc_idx, self.anc_ptr), shape=(n, n))
+        return (m + sp.identity(n, dtype=bool, format="csr")).tocsr() if include_self else m
+
+    def term_table(self, go_ids):
+        """
+        GO_Name / GO_Definition / GO_Synonyms per GO ID, the columns the enrichment merge adds.
+
+        IDs missing from the ontology are left out.
+        """
+        go_ids = list(dict.fromkeys(go_ids))
+        idx = self.indices(go_ids)
+        keep = idx >= 0
+        idx = idx[keep]
+        return pd.DataFrame({"GO_Name": self.names[idx], "GO_Definition": self.definitions[idx],
+                             "GO_Synonyms": self.synonyms[idx]},
+                            index=pd.Index(np.asarray(go_ids, dtype=object)[keep], name="GO_ID"))
+
+
+def build_ontology(obo_path, relations=RELATIONS):
+    """Parse an OBO file into a GeneOntology."""
+    terms = parse_obo(obo_path, relations)
+    ids = [t["id"] for t in terms]
+    index = {go_id: i for i, go_id in enumerate(ids)}
+    alt_ids, alt_targets = [], []
+    for i, t in enumerate(terms):
+        for alt in t["alt_ids"]:
+            alt_ids.append(alt)
+            alt_targets.append(i)
+
+    parent_lists = [sorted({index[p] for p in t["parents"] if p in index}) for t in terms]
+    parent_ptr = np.zeros(len(terms) + 1, dtype=np.int64)
+    parent_ptr[1:] = np.cumsum([len(p) for p in parent_lists])
+    parent_idx = np.array([p for ps in parent_lists for p in ps], dtype=np.int32)
+    anc_ptr, anc_idx = _closure(len(terms), parent_ptr, parent_idx)
+
+    return GeneOntology(ids, [t["name"] for t in terms], [t["namespace"] for t in terms],
+                        [t["definition"] for t in terms], ["; ".join(t["synonyms"]) for t in terms],
+                        [t["obsolete"] for t in terms], alt_ids, alt_targets,
+                        parent_ptr, parent_idx, anc_ptr, anc_idx)
+
+
+_FIELDS = ("ids", "names", "namespaces", "definitions", "synonyms", "obsolete", "alt_ids", "alt_targets",
+           "parent_ptr", "parent_idx", "anc_ptr", "anc_idx")
+_TEXT_FIELDS = ("ids", "names", "namespaces", "definitions", "synonyms", "alt_ids")
+
+
+def _cache_stamp(obo_path):
+    st = os.stat(obo_path)
+    return np.array([CACHE_VERSION, st.st_size, st.st_mtime_ns], dtype=np.int64)
+
+
+def load_ontology(obo_path, cache_path=None, refresh=False):
+    """
+    Load go-basic.obo, using the parsed on-disk copy when it is up to date.
+
+    Parameters:
+        obo_path (str): go-basic.obo
+        cache_path (str, optional): Cache file (default: <obo>.npz)
+        refresh (bool): Re-parse even if the cache is current
+
+    Returns:
+        GeneOntology
+    """
+    cache_path = cache_path or obo_path + ".npz"
+    stamp = _cache_stamp(obo_path)
+    if not refresh and os.path.exists(cache_path):
+        try:
+            with np.load(cache_path, allow_pickle=False) as z:
+                if np.array_equal(z["stamp"], stamp):
+                    return GeneOntology(*(unpack_text(z[f"{name}_buffer"], z[f"{name}_offsets"])
+                                          if name in _TEXT_FIELDS else z[name] for name in _FIELDS))
+        except (OSError, KeyError, ValueError):
+            pass
+
+    go = build_ontology(obo_path)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        arrays = {name: getattr(go, name) for name in _FIELDS if name not in _TEXT_FIELDS}
+        for name in _TEXT_FIELDS:
+            arrays[f"{name}_buffer"], arrays[f"{name}_offsets"] = pack_text(getattr(go, name))
+        with open(tmp_path, "wb") as f:
+            np.savez(f, stamp=stamp, **arrays)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"[INFO] Could not write ontology cache {cache_path}: {e}")
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return go
@@ -0,0 +1,140 @@
+import os
+import csv
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from concurrent.futures import ProcessPoolExecutor
+
+# InterProScan TSV output (no header). Rows without an InterPro entry carry "-" in the
+# InterPro columns and are not counted.
+INTERPRO_COLUMNS = [
+    "Protein_ID", "MD5", "Length", "Analysis", "Signature_Acc",
+    "Signature_Desc", "Start", "End", "Score", "Status", "Date",
+    "InterPro_Acc", "InterPro_Desc", "GO", "Pathways"
+]
+
+# Files written by build_interpro_matrix / read by load_interpro_matrix
+DOMAIN_MATRIX = "interpro_domain_matrix.csv"           # InterPro_Acc, InterPro_Desc, one count column per species
+PROTEIN_MATRIX = "interpro_protein_domain.npz"         # sparse (proteins x domains) match counts
+PROTEIN_INDEX = "interpro_protein_index.tsv"           # Species, Protein_ID per sparse row
+
+
+def _count_species(args):
+    """Stream one InterProScan TSV and count matches per (protein, InterPro entry)."""
+    species, path, chunksize = args
+    pieces, descriptions = [], {}
+    reader = pd.read_csv(path, sep="\t", header=None, names=INTERPRO_COLUMNS,
+                         usecols=["Protein_ID", "InterPro_Acc", "InterPro_Desc"],
+                         dtype="category", na_values=["-", ""], keep_default_na=False,
+                         quoting=csv.QUOTE_NONE, chunksize=chunksize)
+    for chunk in reader:
+        chunk = chunk.dropna(subset=["InterPro_Acc"])
+        if chunk.empty:
+            continue
+        pieces.append(chunk.groupby(["Protein_ID", "InterPro_Acc"], observed=True).size().reset_index(name="n"))
+        desc = chunk[["InterPro_Acc", "InterPro_Desc"]].drop_duplicates("InterPro_Acc")
+        descriptions.update(zip(desc["InterPro_Acc"].astype(str), desc["InterPro_Desc"].astype(str)))
+
+    if pieces:
+        # Chunk categories differ, so merge the per-chunk counts on plain strings
+        pairs = pd.concat(pieces, ignore_index=True).astype({"Protein_ID": str, "InterPro_Acc": str})
+        pairs = pairs.groupby(["Protein_ID", "InterPro_Acc"], sort=False)["n"].sum()
+    else:
+        pairs = pd.Series([], dtype=np.int64,
+                          index=pd.MultiIndex.from_arrays([[], []], names=["Protein_ID", "InterPro_Acc"]))
+    return species, pairs, descriptions
+
+
+def build_interpro_matrix(tsv_files, output_dir="interpro_output", max_workers=None, chunksize=1_000_000):
+    """
+    Count InterPro entries per species and per protein from InterProScan TSVs in one pass.
+
+    Each TSV is streamed in chunks with only Protein_ID / InterPro_Acc / InterPro_Desc read
+    (as categoricals), species are processed in parallel, and every (protein, entry) match
+    count is kept, so nothing is thrown away before clustering or enrichment.
+
+    Parameters:
+        tsv_files (dict): {species: InterProScan TSV path}
+        output_dir (str): Where the matrix files are written
+        max_workers (int, optional): Parallel species (default: one per species, up to CPU count)
+        chunksize (int): Rows per chunk
+
+    Returns:
+        tuple: (domain x species DataFrame, sparse protein x domain matrix, protein index DataFrame)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    max_workers = max_workers or min(len(tsv_files), os.cpu_count() or 1) or 1
+    jobs = [(species, path, chunksize) for species, path in tsv_files.items()]
+
+    results = {}
+    descriptions = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        for species, pairs, desc in pool.map(_count_species, jobs):
+            print(f"DATA Processed: {species} ({len(pairs):,} protein-domain pairs)")
+            results[species] = pairs
+            descriptions.update(desc)
+
+    # Shared domain axis
+    species_names = list(tsv_files)
+    domains = pd.Index(sorted(set().union(*[p.index.get_level_values(1) for p in results.values()])),
+                       name="InterPro_Acc")
+
+    domain_df = pd.DataFrame(index=domains)
+    rows, cols, vals, protein_index = [], [], [], []
+    offset = 0
+    for species in species_names:
+        pairs = results[species]
+        domain_df[species] = pairs.groupby(level=1).sum().reindex(domains, fill_value=0).astype(np.int64)
+
+        protein_codes, proteins = pd.factorize(pairs.index.get_level_values(0))
+        rows.append(protein_codes + offset)
+        cols.append(domains.get_indexer(pairs.index.get_level_values(1)))
+        vals.append(pairs.to_numpy())
+        protein_index.append(pd.DataFrame({"Species": species, "Protein_ID": proteins}))
+        offset += len(proteins)
+
+    domain_df.insert(0, "InterPro_Desc", [descriptions.get(acc, "") for acc in domains])
+    domain_df = domain_df.reset_index()
+    protein_index = pd.concat(protein_index, ignore_index=True) if protein_index else \
+        pd.DataFrame(columns=["Species", "Protein_ID"])
+    protein_matrix = sp.csr_matrix(
+        (np.concatenate(vals) if vals else [], (np.concatenate(rows) if rows else [], np.concatenate(cols) if cols else [])),
+        shape=(offset, len(domains)), dtype=np.int32)
+
+    domain_df.to_csv(os.path.join(output_dir, DOMAIN_MATRIX), index=False)
+    sp.save_npz(os.path.join(output_dir, PROTEIN_MATRIX), protein_matrix)
+    protein_index.to_csv(os.path.join(output_dir, PROTEIN_INDEX), sep="\t", index=False)
+    print(f":D Saved {len(domains):,} InterPro entries x {len(species_names)} species to {DOMAIN_MATRIX}")
+    print(f":D Saved sparse protein x domain matrix {protein_matrix.shape} to {PROTEIN_MATRIX}")
+    return domain_df, protein_matrix, protein_index
+
+
+def load_interpro_matrix(output_dir="interpro_output"):
+    """
+    Read the files written by build_interpro_matrix.
+
+    Returns:
+        tuple: (domain x species DataFrame, sparse protein x domain matrix, protein index DataFrame);
+               sparse columns follow the row order of the domain DataFrame
+    """
+    domain_df = pd.read_csv(os.path.join(output_dir, DOMAIN_MATRIX), keep_default_na=False)
+    protein_matrix = sp.load_npz(os.path.join(output_dir, PROTEIN_MATRIX)).tocsr()
+    protein_index = pd.read_csv(os.path.join(output_dir, PROTEIN_INDEX), sep="\t", dtype=str)
+    return domain_df, protein_matrix, protein_index
+
+
+def top_domains(domain_df, top_n=20, label="InterPro_Desc"):
+    """
+    Union of each species' top_n entries, with their full counts in every species.
+
+    Returns:
+        pd.DataFrame: Indexed by `label`, one column per species
+    """
+    species = domain_df.select_dtypes("number").columns
+    keep = set()
+    for sp_name in species:
+        top = domain_df[sp_name].nlargest(top_n)
+        keep.update(top.index[top > 0])
+    view = domain_df.loc[sorted(keep)]
+    view = view.groupby(label)[list(species)].sum()
+    return view.loc[view.max(axis=1).sort_values(ascending=False).index]
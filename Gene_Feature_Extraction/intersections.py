@@ -0,0 +1,198 @@
+import numpy as np
+import pandas as pd
+
+# Set intersections over species encoded as integer bitmasks.
+# Bit i of an item's mask is set when the item (orthogroup, gene product, ...) is present in
+# species[i], so every intersection pattern is a single integer and all pattern sizes come
+# from one bincount. Masks are uint64, i.e. up to 64 species.
+MAX_SPECIES = 64
+DENSE_PATTERN_LIMIT = 20  # up to 2**20 patterns are counted with a dense bincount
+
+
+def _bits(n_species):
+    if n_species > MAX_SPECIES:
+        raise ValueError(f"Bitmasks hold at most {MAX_SPECIES} species, got {n_species}")
+    return np.left_shift(np.uint64(1), np.arange(n_species, dtype=np.uint64))
+
+
+def presence_bitmask(presence):
+    """
+    Bitmask per row of an (items x species) presence matrix.
+
+    Parameters:
+        presence (array-like): Boolean / 0-1 / count matrix, one column per species
+
+    Returns:
+        np.ndarray: uint64 mask per item
+    """
+    presence = np.asarray(presence) > 0
+    n_items, n_species = presence.shape
+    masks = np.zeros(n_items, dtype=np.uint64)
+    for i, bit in enumerate(_bits(n_species)):
+        masks[presence[:, i]] |= bit
+    return masks
+
+
+def membership_bitmask(items_by_species):
+    """
+    Bitmasks for items listed per species, e.g. the gene products found in each genome.
+
+    Parameters:
+        items_by_species (dict): {species: iterable of items}; missing values are ignored
+
+    Returns:
+        tuple: (unique items, uint64 mask per item)
+    """
+    series = [pd.Series(list(items), dtype=object).dropna() for items in items_by_species.values()]
+    codes, items = pd.factorize(pd.concat(series, ignore_index=True) if series else pd.Series([], dtype=object))
+    masks = np.zeros(len(items), dtype=np.uint64)
+    start = 0
+    for s, bit in zip(series, _bits(len(series))):
+        masks[codes[start:start + len(s)]] |= bit
+        start += len(s)
+    return np.asarray(items, dtype=object), masks
+
+
+def pattern_counts(masks, species):
+    """
+    Size of every observed intersection pattern (UpSet table).
+
+    Small species sets are counted with one dense bincount over all 2**n patterns; larger
+    ones compress the observed masks first and bincount their codes.
+
+    Returns:
+        pd.DataFrame: Pattern, one bool column per species, Species_Count and Count,
+                      sorted by Count (largest first)
+    """
+    masks = np.asarray(masks, dtype=np.uint64)
+    n_species = len(species)
+    if n_species <= DENSE_PATTERN_LIMIT:
+        counts = np.bincount(masks.astype(np.int64), minlength=1 << n_species)
+        patterns = np.flatnonzero(counts).astype(np.uint64)
+        counts = counts[patterns.astype(np.int64)]
+    else:
+        patterns, inverse = np.unique(masks, return_inverse=True)
+        counts = np.bincount(inverse.ravel(), minlength=len(patterns))
+
+    df = pd.DataFrame({"Pattern": patterns})
+    for sp, bit in zip(species, _bits(n_species)):
+        df[sp] = (patterns & bit) != 0
+    df["Species_Count"] = df[list(species)].sum(axis=1)
+    df["Count"] = counts
+    return df.sort_values(["Count", "Pattern"], ascending=[False, True], ignore_index=True)
+
+
+def pattern_lookup(patterns):
+    """{pattern mask: count} from a pattern_counts table."""
+    return dict(zip(patterns["Pattern"].astype(int), patterns["Count"].astype(int)))
+
+
+def select(masks, species, include=(), exclude=()):
+    """Boolean mask of items present in all of `include` and absent from all of `exclude`."""
+    bits = dict(zip(species, _bits(len(species))))
+    want = np.uint64(sum(int(bits[s]) for s in include))
+    avoid = np.uint64(sum(int(bits[s]) for s in exclude))
+    masks = np.asarray(masks, dtype=np.uint64)
+    return ((masks & want) == want) & ((masks & avoid) == 0)
+
+
+def summarize_patterns(patterns, species, labels=None, item="orthogroups", pairs=True):
+    """
+    Core / unique / pairwise-shared counts for any number of species.
+
+    "Shared by A & B" counts items found in exactly those two species, as in a Venn diagram.
+
+    Parameters:
+        patterns (pd.DataFrame): Output of pattern_counts
+        species (list): Species in bit order
+        labels (dict, optional): Display name per species
+        item (str): Noun used in the "Total ..." entry
+        pairs (bool): Include exact two-species intersections
+
+    Returns:
+        dict: {category: count}
+    """
+    labels = labels or {}
+    name = [labels.get(sp, sp) for sp in species]
+    lookup = pattern_lookup(patterns)
+    n = len(species)
+    summary = {
+        f"Total {item}": int(patterns["Count"].sum()),
+        f"Core (all {n} present)": lookup.get((1 << n) - 1, 0),
+    }
+    for i in range(n):
+        summary[f"Unique to {name[i]}"] = lookup.get(1 << i, 0)
+    if pairs and n > 2:
+        for i in range(n):
+            for j in range(i + 1, n):
+                summary[f"Shared by {name[i]} & {name[j]}"] = lookup.get((1 << i) | (1 << j), 0)
+    return summary
+
+
+def venn_subsets(patterns, n_species):
+    """Region sizes in matplotlib_venn order (venn2: 10, 01, 11; venn3: 100, 010, 110, 001, ...)."""
+    lookup = pattern_lookup(patterns)
+    return tuple(lookup.get(p, 0) for p in range(1, 1 << n_species))
+
+
+def plot_venn_patterns(patterns, species, output_path, labels=None, title="Orthogroup Sharing Among Species"):
+    """Venn diagram from pattern counts (two or three species only)."""
+    import matplotlib.pyplot as plt
+    from matplotlib_venn import venn2, venn3
+
+    if len(species) not in (2, 3):
+        print(f"[INFO] Venn diagram skipped: {len(species)} species (use plot_upset instead).")
+        return None
+    labels = labels or {}
+    plt.figure(figsize=(8, 6))
+    venn = venn3 if len(species) == 3 else venn2
+    venn(subsets=venn_subsets(patterns, len(species)), set_labels=tuple(labels.get(sp, sp) for sp in species))
+    plt.title(title)
+    plt.tight_layout()
+    plt.savefig(output_path)
+    plt.close()
+    return output_path
+
+
+def plot_upset(patterns, species, output_path, labels=None, top=30, title="Intersection Sizes"):
+    """
+    UpSet-style plot: bar per intersection pattern above a species dot matrix.
+
+    Parameters:
+        patterns (pd.DataFrame): Output of pattern_counts
+        species (list): Species in bit order
+        output_path (str): Image path
+        labels (dict, optional): Display name per species
+        top (int): Largest patterns to show
+    """
+    import matplotlib.pyplot as plt
+
+    labels = labels or {}
+    shown = patterns.head(top)
+    n_pat, n_sp = len(shown), len(species)
+    x = np.arange(n_pat)
+
+    fig, (ax_bar, ax_dot) = plt.subplots(2, 1, figsize=(max(6, 0.35 * n_pat + 2), 4 + 0.3 * n_sp),
+                                         sharex=True, gridspec_kw={"height_ratios": [3, max(1, 0.25 * n_sp)]})
+    ax_bar.bar(x, shown["Count"], color="steelblue")
+    for xi, c in zip(x, shown["Count"]):
+        ax_bar.text(xi, c, f"{c:,}", ha="center", va="bottom", fontsize=7, rotation=90)
+    ax_bar.set_ylabel("Intersection size")
+    ax_bar.set_title(title)
+
+    member = shown[list(species)].to_numpy().T
+    yy, xx = np.meshgrid(np.arange(n_sp), x, indexing="ij")
+    ax_dot.scatter(xx[~member], yy[~member], color="lightgray", s=30)
+    ax_dot.scatter(xx[member], yy[member], color="black", s=30)
+    for xi, col in zip(x, member.T):
+        rows = np.flatnonzero(col)
+        if len(rows) > 1:
+            ax_dot.plot([xi, xi], [rows.min(), rows.max()], color="black", linewidth=1.5)
+    ax_dot.set_yticks(range(n_sp))
+    ax_dot.set_yticklabels([labels.get(sp, sp) for sp in species])
+    ax_dot.set_xticks([])
+    ax_dot.invert_yaxis()
+    plt.tight_layout()
+    plt.savefig(output_path)
+    plt.close()
+    return output_path
@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+from collections import deque
+
+try:
+    import ahocorasick  # pyahocorasick, optional C implementation
+except ImportError:
+    ahocorasick = None
+
+
+class KeywordMatcher:
+    """
+    Case-insensitive multi-keyword substring matcher (Aho-Corasick).
+
+    The keyword list is compiled once into a single automaton, so one pass over a string
+    reports every keyword it contains, overlapping ones included - the same answer as
+    calling ``str.contains(kw, case=False, regex=False)`` for each keyword separately.
+    Uses pyahocorasick when it is installed and a pure-Python automaton otherwise.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+        patterns = {}
+        for idx, kw in enumerate(self.keywords):
+            if kw:
+                patterns.setdefault(kw.lower(), []).append(idx)
+
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for pattern, ids in patterns.items():
+                self._automaton.add_word(pattern, tuple(ids))
+            if patterns:
+                self._automaton.make_automaton()
+            return
+
+        # goto / fail / output tables of the pure-Python automaton
+        self._goto, self._fail, self._out = [{}], [0], [()]
+        for pattern, ids in patterns.items():
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = nxt
+            self._out[state] += tuple(ids)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def find(self, text):
+        """Sorted tuple of the keyword indices contained in `text`."""
+        text = text.lower()
+        found = set()
+        if ahocorasick is not None:
+            if len(self._automaton):
+                for _, ids in self._automaton.iter(text):
+                    found.update(ids)
+            return tuple(sorted(found))
+
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return tuple(sorted(found))
+
+
+def keyword_incidence(texts, matcher):
+    """
+    Every (row, keyword) hit for a column of strings.
+
+    Each distinct string is scanned once; the hits are then broadcast back to all rows
+    that share it, so repeated products such as "uncharacterized protein" cost one scan.
+
+    Returns:
+        tuple: (row index array, keyword index array), one entry per hit
+    """
+    codes, uniques = pd.factorize(pd.Series(texts).fillna("").astype(str), sort=False)
+    unique_hits = [matcher.find(text) for text in uniques]
+
+    n_hits = np.fromiter((len(h) for h in unique_hits), dtype=np.int64, count=len(unique_hits))
+    flat = np.fromiter((k for h in unique_hits for k in h), dtype=np.int64, count=int(n_hits.sum()))
+    starts = np.concatenate([[0], np.cumsum(n_hits)[:-1]]) if len(n_hits) else n_hits
+
+    lengths = n_hits[codes] if len(codes) else np.zeros(0, dtype=np.int64)
+    row_idx = np.repeat(np.arange(len(codes)), lengths)
+    offsets = np.arange(len(row_idx)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    kw_idx = flat[np.repeat(starts[codes] if len(codes) else starts, lengths) + offsets]
+    return row_idx, kw_idx
+
+
+def any_keyword(texts, keywords):
+    """Boolean mask of the strings that contain at least one of the keywords (case-insensitive)."""
+    texts = pd.Series(texts)
+    row_idx, _ = keyword_incidence(texts, KeywordMatcher(keywords))
+    mask = np.zeros(len(texts), dtype=bool)
+    mask[row_idx] = True
+    return mask
+
+
+def count_keywords(products_by_species, keyword_list, keyword_groups=None):
+    """
+    Keyword x species counts, per-gene hits and grouped function counts from one scan.
+
+    Parameters:
+        products_by_species (dict): {species: DataFrame with a 'product' column}; any other
+            columns (gene, protein_id, ...) are carried into the per-gene hit table.
+        keyword_list (list): Keywords for the count matrix.
+        keyword_groups (dict, optional): {group name: [keywords]}; a gene counts once per group
+            if its product contains any of the group's keywords.
+
+    Returns:
+        tuple: (counts DataFrame keywords x species,
+                per-gene hits DataFrame (one row per species/gene/keyword),
+                grouped counts DataFrame groups x species or None)
+    """
+    all_keywords = list(dict.fromkeys(list(keyword_list) + [kw for kws in (keyword_groups or {}).values() for kw in kws]))
+    matcher = KeywordMatcher(all_keywords)
+    kw_pos = {kw: i for i, kw in enumerate(all_keywords)}
+
+    counts, grouped, hit_frames = {}, {}, []
+    for species, df in products_by_species.items():
+        row_idx, kw_idx = keyword_incidence(df["product"], matcher)
+        per_kw = np.bincount(kw_idx, minlength=len(all_keywords))
+        counts[species] = {kw: int(per_kw[kw_pos[kw]]) for kw in keyword_list}
+
+        if keyword_groups:
+            grouped[species] = {}
+            for group_name, kws in keyword_groups.items():
+                in_group = np.isin(kw_idx, [kw_pos[kw] for kw in kws])
+                grouped[species][group_name] = len(np.unique(row_idx[in_group]))
+
+        hits = df.iloc[row_idx].reset_index(drop=True)
+        hits.insert(0, "species", species)
+        hits["keyword"] = np.asarray(all_keywords, dtype=object)[kw_idx]
+        hit_frames.append(hits)
+
+    counts_df = pd.DataFrame(counts).reindex(list(keyword_list)).fillna(0).astype(int)
+    hits_df = pd.concat(hit_frames, ignore_index=True) if hit_frames else pd.DataFrame()
+    grouped_df = pd.DataFrame(grouped).reindex(list(keyword_groups)).fillna(0).astype(int) if keyword_groups else None
+    return counts_df, hits_df, grouped_df
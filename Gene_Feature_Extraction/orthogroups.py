@@ -0,0 +1,188 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+
+from intersections import presence_bitmask
+from packed_text import pack_text, unpack_text
+
+# ProteinOrtho output (myproject.proteinortho.tsv):
+#   # Species <TAB> Genes <TAB> Alg.-Conn. <TAB> <proteome 1> <TAB> <proteome 2> ...
+# One row per orthogroup, one column per input proteome; a cell holds comma-separated
+# protein IDs, or "*" when the species has no member. Groups carry no ID, so the
+# 1-based row number is used as GroupID everywhere in the pipeline.
+META_COLUMNS = ["Species", "Genes", "Alg.-Conn."]
+ABSENT = "*"
+CACHE_VERSION = 2
+
+
+def species_label(column):
+    """Species label of a proteome column: 'wild_yak_proteins.fasta' -> 'wild_yak'."""
+    label = re.sub(r"\.(fasta|fas|faa|fa|pep)(\.gz)?$", "", os.path.basename(column), flags=re.I)
+    return re.sub(r"_prot(eins?)?$", "", label, flags=re.I)
+
+
+class OrthogroupTable:
+    """
+    Compact, read-only view of a ProteinOrtho table.
+
+    Attributes:
+        columns (list): Proteome column names from the header, e.g. 'takin_proteins.fasta'
+        species (list): Species labels derived from them, e.g. 'takin'
+        group_ids (np.ndarray): 1-based GroupID per orthogroup
+        meta (pd.DataFrame): Species / Genes / Alg.-Conn. summary columns
+        counts (np.ndarray): (n_groups, n_species) int32 member counts, 0 = absent
+        mask (np.ndarray): uint64 presence bitmask per group, bit i = species[i]
+        indptr (np.ndarray): CSR offsets into protein_ids for cell (group g, species s) at g * n_species + s
+        protein_ids (np.ndarray): All member IDs (object array), group-major then species
+
+    Usage:
+        og = load_orthogroups("myproject.proteinortho.tsv")
+        og.members(0, "takin")            # protein IDs of the first group in takin
+        og.count_frame()                  # GroupID + one count column per species
+    """
+
+    def __init__(self, columns, group_ids, meta, counts, indptr, protein_ids):
+        self.columns = list(columns)
+        self.species = [species_label(c) for c in self.columns]
+        self.group_ids = group_ids
+        self.meta = meta
+        self.counts = counts
+        self.indptr = indptr
+        self.protein_ids = protein_ids
+        self.mask = presence_bitmask(counts)
+
+    def __len__(self):
+        return len(self.group_ids)
+
+    def species_index(self, species):
+        """Position of a species given as label ('wild_yak'), column name or its index."""
+        if isinstance(species, (int, np.integer)):
+            return int(species)
+        if species in self.species:
+            return self.species.index(species)
+        if species in self.columns:
+            return self.columns.index(species)
+        raise KeyError(f"Unknown species '{species}'. Available: {self.species}")
+
+    def members(self, group, species):
+        """Protein IDs of one group (row position) in one species."""
+        cell = group * len(self.species) + self.species_index(species)
+        return self.protein_ids[self.indptr[cell]:self.indptr[cell + 1]]
+
+    def count_frame(self, species=None):
+        """GroupID plus one member-count column per species (CAFE-style gene counts)."""
+        idx = [self.species_index(s) for s in (species or self.species)]
+        df = pd.DataFrame(self.counts[:, idx], columns=[self.species[i] for i in idx])
+        df.insert(0, "GroupID", self.group_ids)
+        return df
+
+    def presence_frame(self, species=None):
+        """GroupID plus one 0/1 presence column per species."""
+        df = self.count_frame(species)
+        df.iloc[:, 1:] = (df.iloc[:, 1:] > 0).astype(np.int8)
+        return df
+
+    def id_frame(self, species=None, rows=None):
+        """GroupID plus comma-joined protein IDs per species (None where absent)."""
+        idx = [self.species_index(s) for s in (species or self.species)]
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows)
+        df = pd.DataFrame({"GroupID": self.group_ids[rows]})
+        n_species = len(self.species)
+        for i in idx:
+            cells = rows * n_species + i
+            starts, ends = self.indptr[cells], self.indptr[cells + 1]
+            df[self.species[i]] = [",".join(self.protein_ids[a:b]) if b > a else None
+                                   for a, b in zip(starts, ends)]
+        return df
+
+    def single_copy(self, species=None):
+        """Row positions of groups with exactly one member in every given species."""
+        idx = [self.species_index(s) for s in (species or self.species)]
+        return np.flatnonzero((self.counts[:, idx] == 1).all(axis=1))
+
+
+def read_proteinortho(tsv_path):
+    """
+    Parse a ProteinOrtho TSV into an OrthogroupTable.
+
+    Species columns come from the header line, "*" cells are treated as absence, and
+    every cell is split with a single pass over the joined ID strings.
+    """
+    with open(tsv_path, "r") as f:
+        header = f.readline().lstrip("#").strip().split("\t")
+    if len(header) <= 3:
+        raise ValueError(f"{tsv_path}: not a ProteinOrtho table (header: {header})")
+    columns = header[3:]
+
+    df = pd.read_csv(tsv_path, sep="\t", engine="c", header=None, skiprows=1, comment="#",
+                     names=META_COLUMNS + columns, dtype=str, na_filter=False)
+    meta = pd.DataFrame({
+        "Species": pd.to_numeric(df["Species"], errors="coerce").fillna(0).astype(np.int32),
+        "Genes": pd.to_numeric(df["Genes"], errors="coerce").fillna(0).astype(np.int32),
+        "Alg.-Conn.": pd.to_numeric(df["Alg.-Conn."], errors="coerce").astype(np.float32),
+    })
+
+    # Cells in row-major (group, species) order -> counts and CSR offsets
+    # (object strings throughout: fixed-width text arrays would pad every cell to the largest family)
+    cells = pd.Series(df[columns].to_numpy(dtype=object).ravel(), dtype=object).str.strip()
+    present = ((cells != ABSENT) & (cells != "")).to_numpy()
+    counts = np.zeros(len(cells), dtype=np.int32)
+    counts[present] = cells[present].str.count(",").to_numpy() + 1
+    indptr = np.zeros(len(cells) + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    protein_ids = np.array(",".join(cells[present]).split(",") if present.any() else [], dtype=object)
+
+    return OrthogroupTable(columns, np.arange(1, len(df) + 1, dtype=np.int64), meta,
+                           counts.reshape(len(df), len(columns)), indptr, protein_ids)
+
+
+def _cache_stamp(tsv_path):
+    st = os.stat(tsv_path)
+    return np.array([CACHE_VERSION, st.st_size, st.st_mtime_ns], dtype=np.int64)
+
+
+def load_orthogroups(tsv_path, cache_path=None, refresh=False):
+    """
+    Load a ProteinOrtho table, using a parsed on-disk copy when it is up to date.
+
+    The cache (<tsv>.npz by default) holds the count matrix, CSR offsets and the IDs
+    (one UTF-8 buffer plus offsets) as plain arrays, so later analyses skip text parsing; it is rebuilt when the TSV's
+    size or modification time changes.
+
+    Parameters:
+        tsv_path (str): myproject.proteinortho.tsv
+        cache_path (str, optional): Cache file (default: next to the TSV)
+        refresh (bool): Re-parse even if the cache is current
+
+    Returns:
+        OrthogroupTable
+    """
+    cache_path = cache_path or tsv_path + ".npz"
+    stamp = _cache_stamp(tsv_path)
+    if not refresh and os.path.exists(cache_path):
+        try:
+            with np.load(cache_path, allow_pickle=False) as z:
+                if np.array_equal(z["stamp"], stamp):
+                    meta = pd.DataFrame({"Species": z["n_species"], "Genes": z["n_genes"], "Alg.-Conn.": z["conn"]})
+                    return OrthogroupTable(z["columns"].tolist(), z["group_ids"], meta, z["counts"],
+                                           z["indptr"], unpack_text(z["id_buffer"], z["id_offsets"]))
+        except (OSError, KeyError, ValueError):
+            pass
+
+    og = read_proteinortho(tsv_path)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        id_buffer, id_offsets = pack_text(og.protein_ids)
+        with open(tmp_path, "wb") as f:
+            np.savez(f, stamp=stamp, columns=np.array(og.columns, dtype=str), group_ids=og.group_ids,
+                     n_species=og.meta["Species"].to_numpy(), n_genes=og.meta["Genes"].to_numpy(),
+                     conn=og.meta["Alg.-Conn."].to_numpy(), counts=og.counts, indptr=og.indptr,
+                     id_buffer=id_buffer, id_offsets=id_offsets)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"[INFO] Could not write orthogroup cache {cache_path}: {e}")
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return og
@@ -0,0 +1,20 @@
+import numpy as np
+
+# Variable-length strings for .npz caches read with allow_pickle=False.
+# Fixed-width numpy text arrays pad every entry to the longest one, so a single long
+# definition or protein family blows up the whole array; instead the strings are stored
+# as one UTF-8 byte buffer with int64 offsets and come back as an object array.
+
+
+def pack_text(values):
+    """Strings as one UTF-8 byte buffer plus int64 offsets (for allow_pickle=False caches)."""
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def unpack_text(buffer, offsets):
+    """Object array of strings from pack_text output."""
+    data = buffer.tobytes()
+    return np.array([data[a:b].decode("utf-8") for a, b in zip(offsets[:-1], offsets[1:])], dtype=object)
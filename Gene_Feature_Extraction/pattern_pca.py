@@ -0,0 +1,99 @@
+import numpy as np
+
+# PCA for presence/absence or small count matrices (one row per orthogroup / gene family).
+# With k species such rows take at most 2**k distinct values, so the matrix is collapsed to
+# its unique row patterns with a multiplicity weight each; the weighted mean, scaling and
+# covariance of that tiny matrix are exactly those of the full one, and every row's scores
+# are looked up from its pattern. Results follow sklearn's StandardScaler + PCA conventions
+# (population std for scaling, n - 1 covariance, largest loading of each component positive).
+
+
+def collapse_patterns(X):
+    """
+    Unique rows of an integer matrix with their multiplicities.
+
+    Rows are packed into one int64 code (mixed radix over each column's value range) when
+    that fits, so the collapse is a 1-D unique instead of a row-wise sort.
+
+    Parameters:
+        X (array-like): (rows x species) presence or count matrix
+
+    Returns:
+        tuple: (patterns, inverse row -> pattern index, weights)
+    """
+    X = np.asarray(X)
+    if X.ndim != 2:
+        raise ValueError("Expected a 2-D matrix")
+    if X.shape[0] == 0:
+        return X[:0], np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    is_integer = np.issubdtype(X.dtype, np.integer) or X.dtype == bool or np.array_equal(X, np.round(X))
+    if is_integer:
+        Xi = X.astype(np.int64)
+        lo = Xi.min(axis=0)
+        radix = Xi.max(axis=0) - lo + 1
+        if np.all(radix > 0) and np.sum(np.log2(radix.astype(float))) < 62:
+            codes = np.ravel_multi_index((Xi - lo).T, tuple(radix))
+            _, first, inverse, weights = np.unique(codes, return_index=True, return_inverse=True,
+                                                      return_counts=True)
+            return X[first], inverse.ravel(), weights
+
+    patterns, inverse, weights = np.unique(X, axis=0, return_inverse=True, return_counts=True)
+    return patterns, inverse.ravel(), weights
+
+
+def weighted_pca(patterns, weights, n_components=2, standardize=False):
+    """
+    PCA of a weighted set of rows, identical to PCA on the rows repeated `weights` times.
+
+    Returns:
+        dict: scores (per pattern), components, explained_variance, explained_variance_ratio,
+              mean, scale
+    """
+    P = np.asarray(patterns, dtype=float)
+    w = np.asarray(weights, dtype=float)
+    n = w.sum()
+    mean = w @ P / n
+    centered = P - mean
+    scale = np.ones(P.shape[1])
+    if standardize:
+        std = np.sqrt(w @ centered ** 2 / n)
+        scale = np.where(std > np.finfo(float).eps * np.maximum(1.0, np.abs(mean)), std, 1.0)
+        centered = centered / scale
+
+    cov = (centered * w[:, None]).T @ centered / max(n - 1, 1)
+    eigvals, eigvecs = np.linalg.eigh(cov)
+    order = np.argsort(eigvals)[::-1]
+    eigvals, components = np.clip(eigvals[order], 0, None), eigvecs[:, order].T
+
+    # sklearn's svd_flip(u_based_decision=False): largest absolute loading is positive
+    signs = np.sign(components[np.arange(len(components)), np.abs(components).argmax(axis=1)])
+    components *= np.where(signs == 0, 1, signs)[:, None]
+
+    total = eigvals.sum()
+    return {
+        "scores": centered @ components[:n_components].T,
+        "components": components[:n_components],
+        "explained_variance": eigvals[:n_components],
+        "explained_variance_ratio": eigvals[:n_components] / total if total > 0 else np.zeros(n_components),
+        "mean": mean,
+        "scale": scale,
+    }
+
+
+def pattern_pca(X, n_components=2, standardize=False):
+    """
+    PCA of a presence/count matrix computed on its unique row patterns.
+
+    Parameters:
+        X (array-like): (rows x species) matrix
+        n_components (int): Components to keep
+        standardize (bool): Scale columns to unit variance first (StandardScaler)
+
+    Returns:
+        tuple: (scores per row, fit dict from weighted_pca plus patterns, weights, inverse)
+    """
+    patterns, inverse, weights = collapse_patterns(X)
+    fit = weighted_pca(patterns, weights, n_components=n_components, standardize=standardize)
+    fit.update(patterns=patterns, weights=weights, inverse=inverse)
+    return fit["scores"][inverse], fit
@@ -0,0 +1,199 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+# ========== CONFIGURATION ==========
+climate_root = r"C:\Users\FENIL\Downloads\climate_data"
+variable_dirs = {
+    "ppt": os.path.join(climate_root, "ppt_1990_2020"),
+    "tmin": os.path.join(climate_root, "tmin_1990_2020"),
+    "tmax": os.path.join(climate_root, "tmax_1990_2020"),
+}
+ASIA_BBOX = (-10, 60, 25, 150)  # lat_min, lat_max, lon_min, lon_max (same window as the elevation crop)
+
+
+def _bbox_slices(lats, lons, bbox):
+    if bbox is None:
+        return slice(0, len(lats)), slice(0, len(lons))
+    lat_min, lat_max, lon_min, lon_max = bbox
+    rows = np.where((lats >= lat_min) & (lats <= lat_max))[0]
+    cols = np.where((lons >= lon_min) & (lons <= lon_max))[0]
+    return slice(rows[0], rows[-1] + 1), slice(cols[0], cols[-1] + 1)
+
+
+def build_climate_store(store_dir, years, variables=("ppt", "tmin", "tmax"), bbox=ASIA_BBOX, chunk=32):
+    """
+    Rechunk the one-file-per-variable-year TerraClimate NetCDFs into a time-contiguous store.
+
+    Each variable becomes one memory-mapped float32 array '<var>.npy' with shape
+    (n_chunk_rows, n_chunk_cols, n_months, chunk, chunk): a small spatial tile followed by
+    its entire monthly series, so a point query reads one contiguous block instead of
+    opening and decoding every yearly file. The build streams one monthly grid at a time,
+    so memory stays at a single (cropped) grid regardless of how many years are added.
+    Every year takes 12 month slots; months a year file does not contain (e.g. the current,
+    partial year) are left as NaN.
+
+    Parameters:
+        store_dir (str): Output folder for the rechunked arrays and store.json.
+        years (list): Years to include, in order.
+        variables (tuple): TerraClimate variable names with an entry in variable_dirs.
+        bbox (tuple, optional): (lat_min, lat_max, lon_min, lon_max) crop; None keeps the globe.
+        chunk (int): Spatial tile edge in pixels.
+
+    Returns:
+        str: Path of the store metadata file.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    first = xr.open_dataset(os.path.join(variable_dirs[variables[0]], f"TerraClimate_{variables[0]}_{years[0]}.nc"))
+    lat_slice, lon_slice = _bbox_slices(first.lat.values, first.lon.values, bbox)
+    lats, lons = first.lat.values[lat_slice], first.lon.values[lon_slice]
+    first.close()
+
+    ny, nx = len(lats), len(lons)
+    n_ty, n_tx = -(-ny // chunk), -(-nx // chunk)
+    n_months = 12 * len(years)
+
+    for var in variables:
+        print(f"Rechunking {var}...")
+        store = np.lib.format.open_memmap(os.path.join(store_dir, f"{var}.npy"), mode="w+", dtype=np.float32,
+                                          shape=(n_ty, n_tx, n_months, chunk, chunk))
+        store[...] = np.nan  # months missing from a (partial) year file stay NaN, not zero
+        padded = np.full((n_ty * chunk, n_tx * chunk), np.nan, dtype=np.float32)
+        for year_index, year in enumerate(years):
+            path = os.path.join(variable_dirs[var], f"TerraClimate_{var}_{year}.nc")
+            with xr.open_dataset(path) as ds:
+                da = ds[var].isel(lat=lat_slice, lon=lon_slice)
+                months = da["time"].dt.month.values
+                if len(months) > 12 or len(np.unique(months)) != len(months):
+                    raise ValueError(f"{path}: expected at most one time step per month, got months {months.tolist()}")
+                for step, month in enumerate(months):
+                    # Slot by calendar month so a partial year never shifts the years after it
+                    padded[:ny, :nx] = da.isel(time=step).values
+                    t = year_index * 12 + int(month) - 1
+                    store[:, :, t] = padded.reshape(n_ty, chunk, n_tx, chunk).transpose(0, 2, 1, 3)
+        store.flush()
+        del store
+
+    meta = {
+        "variables": list(variables),
+        "years": [int(y) for y in years],
+        "chunk": chunk,
+        "lat": lats.tolist(),
+        "lon": lons.tolist(),
+    }
+    meta_path = os.path.join(store_dir, "store.json")
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+    print(f"Climate store written to: {store_dir}")
+    return meta_path
+
+
+class ClimateStore:
+    """Point x month queries against a store written by build_climate_store."""
+
+    def __init__(self, store_dir):
+        with open(os.path.join(store_dir, "store.json")) as f:
+            meta = json.load(f)
+        self.years = meta["years"]
+        self.chunk = meta["chunk"]
+        self.lat = np.asarray(meta["lat"])
+        self.lon = np.asarray(meta["lon"])
+        self.arrays = {var: np.load(os.path.join(store_dir, f"{var}.npy"), mmap_mode="r")
+                       for var in meta["variables"]}
+        self._year_index = {year: i for i, year in enumerate(self.years)}
+        self.months = pd.PeriodIndex([pd.Period(year=y, month=m, freq="M") for y in self.years for m in range(1, 13)])
+
+    def _nearest(self, coords, values):
+        """
+        Nearest grid index per value, and a mask of values that fall on the grid.
+
+        Values more than half a cell beyond the outermost centres are outside the store's
+        extent; their index is still a valid (edge) position but must not be used.
+        Works for ascending or descending coordinate vectors.
+        """
+        order = np.argsort(coords)
+        pos = np.clip(np.searchsorted(coords[order], values), 1, len(coords) - 1)
+        left, right = order[pos - 1], order[pos]
+        nearest = np.where(np.abs(coords[left] - values) <= np.abs(coords[right] - values), left, right)
+        half_res = np.median(np.abs(np.diff(coords))) / 2 if len(coords) > 1 else 0.0
+        inside = (values >= coords.min() - half_res) & (values <= coords.max() + half_res)
+        return nearest, inside
+
+    def series(self, var, lats, lons):
+        """
+        Monthly series for many points.
+
+        Points are grouped by spatial tile and each tile's contiguous block is read once.
+
+        Returns:
+            ndarray: float32 array of shape (n_points, n_months); NaN over ocean and for
+            points outside the store's extent.
+        """
+        rows, lat_inside = self._nearest(self.lat, np.asarray(lats, dtype=float))
+        cols, lon_inside = self._nearest(self.lon, np.asarray(lons, dtype=float))
+        arr = self.arrays[var]
+        out = np.full((len(rows), arr.shape[2]), np.nan, dtype=np.float32)
+
+        inside = lat_inside & lon_inside
+        tile_ids = (rows // self.chunk) * arr.shape[1] + cols // self.chunk
+        for tile in np.unique(tile_ids[inside]):
+            idx = np.where((tile_ids == tile) & inside)[0]
+            ty, tx = divmod(int(tile), arr.shape[1])
+            block = np.asarray(arr[ty, tx])  # (n_months, chunk, chunk)
+            out[idx] = block[:, rows[idx] % self.chunk, cols[idx] % self.chunk].T
+        return out
+
+    def year_months(self, var, lats, lons, point_years):
+        """12 monthly values of `var` for each point in its own observation year: (n_points, 12); NaN for missing months."""
+        point_years = np.asarray(point_years, dtype=int)
+        unknown = sorted(set(point_years.tolist()) - set(self._year_index))
+        if unknown:
+            raise ValueError(f"Years not in the climate store: {unknown}")
+        full = self.series(var, lats, lons).reshape(len(lats), len(self.years), 12)
+        year_idx = np.array([self._year_index[y] for y in point_years.tolist()], dtype=np.int64)
+        return full[np.arange(len(lats)), year_idx]
+
+
+def occurrence_seasonal_features(store, occurrences):
+    """
+    Seasonal/phenology descriptors at each occurrence for the year it was recorded.
+
+    Parameters:
+        store (ClimateStore): Opened climate store.
+        occurrences (pd.DataFrame): latitude, longitude and year columns; years must be in the store.
+
+    Returns:
+        pd.DataFrame: occurrences with bioclim-style seasonal columns appended.
+    """
+    lats, lons, yrs = occurrences["latitude"].values, occurrences["longitude"].values, occurrences["year"].values
+    ppt = store.year_months("ppt", lats, lons, yrs)
+    tmin = store.year_months("tmin", lats, lons, yrs)
+    tmax = store.year_months("tmax", lats, lons, yrs)
+    tmean = (tmin + tmax) / 2
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        features = pd.DataFrame({
+            "ppt_annual": ppt.sum(axis=1),
+            "ppt_wettest_month": ppt.max(axis=1),
+            "ppt_driest_month": ppt.min(axis=1),
+            "ppt_seasonality_cv": ppt.std(axis=1) / ppt.mean(axis=1),
+            "tmean_seasonality_sd": tmean.std(axis=1),
+            "tmax_warmest_month": tmax.max(axis=1),
+            "tmin_coldest_month": tmin.min(axis=1),
+            "temp_annual_range": tmax.max(axis=1) - tmin.min(axis=1),
+            "frost_months": (tmin < 0).sum(axis=1),
+            "growing_months": (tmean > 5).sum(axis=1),
+            "warmest_month": tmean.argmax(axis=1) + 1,
+            "wettest_month": ppt.argmax(axis=1) + 1,
+        }, index=occurrences.index)
+    return pd.concat([occurrences, features], axis=1)
+
+
+if __name__ == "__main__":
+    build_climate_store("climate_store", list(range(2009, 2025)))
+    store = ClimateStore("climate_store")
+    occ = pd.read_csv("wild_yak_Final_cleaned.csv")[["latitude", "longitude", "year"]].dropna()
+    occ = occ[occ["year"].isin(store.years)]
+    print(occurrence_seasonal_features(store, occ).head())
@@ -0,0 +1,167 @@
+import os
+import pickle
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.metrics import roc_auc_score
+
+from sdm_incremental import FEATURE_COLUMNS, STORE_NAME
+
+FEATURE_LABELS = {
+    "ppt": "Precipitation",
+    "tmin": "Min Temp",
+    "tmax": "Max Temp",
+    "elevation": "Elevation",
+}
+
+# Worker globals: each process unpickles the model once instead of once per task.
+_model = None
+
+
+def _init_worker(model_path):
+    global _model
+    with open(model_path, 'rb') as f:
+        _model = pickle.load(f)
+    if hasattr(_model, "n_jobs"):
+        _model.n_jobs = 1  # parallelism comes from the pool, not from the forest
+
+
+def _permutation_task(args):
+    """Score all repeats of one feature as a single stacked predict_proba call."""
+    X, y, col, n_repeats, seed = args
+    rng = np.random.default_rng(seed)
+    n = len(X)
+    stacked = np.tile(X, (n_repeats, 1))
+    for r in range(n_repeats):
+        stacked[r * n:(r + 1) * n, col] = X[rng.permutation(n), col]
+    proba = _model.predict_proba(stacked)[:, 1].reshape(n_repeats, n)
+    return col, np.array([roc_auc_score(y, p) for p in proba])
+
+
+def _dependence_task(args):
+    """Average prediction with one feature pinned at each grid value, as one batch."""
+    X, col, grid = args
+    n = len(X)
+    stacked = np.tile(X, (len(grid), 1))
+    stacked[:, col] = np.repeat(grid, n)
+    proba = _model.predict_proba(stacked)[:, 1].reshape(len(grid), n)
+    return col, grid, proba.mean(axis=1), proba.std(axis=1)
+
+
+def load_test_features(output_dir, max_samples=None, seed=42):
+    """
+    Load the held-out rows cached in the feature store, optionally subsampled.
+
+    Parameters:
+        output_dir (str): Species output folder containing feature_store.csv.
+        max_samples (int, optional): Cap on test rows; a stratified random subset is drawn.
+        seed (int): Seed for the subsample.
+
+    Returns:
+        tuple: (X_test, y_test)
+    """
+    store = pd.read_csv(os.path.join(output_dir, STORE_NAME))
+    test = store[store["split"] == "test"]
+    if max_samples and len(test) > max_samples:
+        frac = max_samples / len(test)
+        test = test.groupby("label", group_keys=False).sample(frac=frac, random_state=seed)
+    return test[FEATURE_COLUMNS].values.astype(float), test["label"].values.astype(int)
+
+
+def compute_diagnostics(output_dir, model_name, n_repeats=10, grid_points=25,
+                        max_samples=5000, max_workers=None, seed=42):
+    """
+    Permutation importance (AUC drop) and partial-dependence curves for a saved SDM.
+
+    Every (feature, task) pair is one job in a process pool, and each job evaluates all its
+    permuted copies or grid values in a single batched ``predict_proba`` call. The results
+    are written next to the model as '<model>_permutation_importance.csv' and
+    '<model>_partial_dependence.csv'.
+
+    Parameters:
+        output_dir (str): Species output folder (holds the model and the feature store).
+        model_name (str): Pickle file name of the trained model.
+        n_repeats (int): Permutations per feature.
+        grid_points (int): Quantile grid size for each response curve.
+        max_samples (int): Subsample the test set to this many rows (None keeps all).
+        max_workers (int, optional): Pool size; defaults to the CPU count.
+        seed (int): Base seed for permutations and subsampling.
+
+    Returns:
+        tuple: (importance DataFrame, partial dependence DataFrame)
+    """
+    model_path = os.path.join(output_dir, model_name)
+    X, y = load_test_features(output_dir, max_samples=max_samples, seed=seed)
+
+    with open(model_path, 'rb') as f:
+        baseline = roc_auc_score(y, pickle.load(f).predict_proba(X)[:, 1])
+
+    grids = [np.unique(np.quantile(X[:, col], np.linspace(0.02, 0.98, grid_points)))
+             for col in range(X.shape[1])]
+    perm_jobs = [(X, y, col, n_repeats, seed + col) for col in range(X.shape[1])]
+    pd_jobs = [(X, col, grids[col]) for col in range(X.shape[1])]
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(model_path,)) as pool:
+        perm_results = list(pool.map(_permutation_task, perm_jobs))
+        pd_results = list(pool.map(_dependence_task, pd_jobs))
+
+    importance_rows = []
+    for col, scores in perm_results:
+        drops = baseline - scores
+        importance_rows.append({
+            "Feature": FEATURE_COLUMNS[col],
+            "Label": FEATURE_LABELS.get(FEATURE_COLUMNS[col], FEATURE_COLUMNS[col]),
+            "Baseline_AUC": baseline,
+            "Importance_Mean": drops.mean(),
+            "Importance_Std": drops.std(),
+        })
+    importance_df = pd.DataFrame(importance_rows).sort_values("Importance_Mean", ascending=False)
+
+    dependence_df = pd.concat([
+        pd.DataFrame({"Feature": FEATURE_COLUMNS[col], "Value": grid,
+                      "Mean_Suitability": mean, "Std_Suitability": std})
+        for col, grid, mean, std in pd_results
+    ], ignore_index=True)
+
+    base = os.path.splitext(model_path)[0]
+    importance_df.to_csv(f"{base}_permutation_importance.csv", index=False)
+    dependence_df.to_csv(f"{base}_partial_dependence.csv", index=False)
+    print(f"Diagnostics saved next to {model_path} (baseline AUC {baseline:.3f}, {len(y)} test rows)")
+    return importance_df, dependence_df
+
+
+def plot_diagnostics(importance_df, dependence_df, title_prefix="Wild Yak", save_path=None):
+    """Bar chart of permutation importance plus one response curve per feature."""
+    n_feat = dependence_df["Feature"].nunique()
+    fig, axes = plt.subplots(1, n_feat + 1, figsize=(4 * (n_feat + 1), 4))
+
+    ax = axes[0]
+    ax.barh(importance_df["Label"], importance_df["Importance_Mean"],
+            xerr=importance_df["Importance_Std"], color='orange')
+    ax.invert_yaxis()
+    ax.set_xlabel("AUC drop when permuted")
+    ax.set_title(f"{title_prefix} Permutation Importance")
+    ax.grid(True)
+
+    for ax, (feature, curve) in zip(axes[1:], dependence_df.groupby("Feature", sort=False)):
+        ax.plot(curve["Value"], curve["Mean_Suitability"], color='seagreen')
+        ax.fill_between(curve["Value"],
+                        curve["Mean_Suitability"] - curve["Std_Suitability"],
+                        curve["Mean_Suitability"] + curve["Std_Suitability"],
+                        color='seagreen', alpha=0.2)
+        ax.set_xlabel(FEATURE_LABELS.get(feature, feature))
+        ax.set_ylabel("Predicted suitability")
+        ax.set_ylim(0, 1)
+        ax.grid(True, linestyle='--', alpha=0.5)
+
+    plt.tight_layout()
+    if save_path:
+        plt.savefig(save_path, dpi=300, bbox_inches='tight')
+    plt.show()
+
+
+if __name__ == "__main__":
+    imp, dep = compute_diagnostics("sdm_final", "random_forest_model.pkl")
+    plot_diagnostics(imp, dep, "Wild Yak", os.path.join("sdm_final", "model_diagnostics.png"))
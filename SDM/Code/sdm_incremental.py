@@ -0,0 +1,451 @@
+import os
+import json
+import pickle
+import warnings
+import hashlib
+import numpy as np
+import pandas as pd
+import xarray as xr
+import rasterio
+from rasterio.transform import rowcol
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import roc_auc_score
+
+# ========== CONFIGURATION ==========
+# Same layout as the modelling cells of SDM_Final.ipynb.
+climate_root = r"C:\Users\FENIL\Downloads\climate_data"
+ppt_dir = os.path.join(climate_root, "ppt_1990_2020")
+tmin_dir = os.path.join(climate_root, "tmin_1990_2020")
+tmax_dir = os.path.join(climate_root, "tmax_1990_2020")
+elevation_path = "elevation_resampled_to_climate.tif"
+landmask_path = "landmask_asia.tif"
+
+FEATURE_COLUMNS = ["ppt", "tmin", "tmax", "elevation"]
+STORE_NAME = "feature_store.csv"
+MANIFEST_NAME = "sdm_manifest.json"
+future_scenarios = {2050: {"SSP585": "2050585", "SSP245": "2050245"}}
+
+
+# ========== CLIMATE INPUTS ==========
+def climate_paths(suffix):
+    """Return the ppt/tmin/tmax NetCDF paths for a year (or a future suffix such as '2050585')."""
+    return [
+        os.path.join(ppt_dir, f"TerraClimate_ppt_{suffix}.nc"),
+        os.path.join(tmin_dir, f"TerraClimate_tmin_{suffix}.nc"),
+        os.path.join(tmax_dir, f"TerraClimate_tmax_{suffix}.nc"),
+    ]
+
+
+def fingerprint_files(paths, extra=""):
+    """
+    Cheap change detector for input files: size and modification time of each path.
+
+    Parameters:
+        paths (list): Files that feed one feature year or one prediction map.
+        extra (str): Additional content to fold into the fingerprint (e.g. occurrence rows).
+
+    Returns:
+        str: Hex digest that changes whenever any of the inputs change.
+    """
+    h = hashlib.sha1()
+    for path in paths:
+        st = os.stat(path)
+        h.update(f"{os.path.basename(path)}:{st.st_size}:{int(st.st_mtime)}".encode())
+    h.update(extra.encode())
+    return h.hexdigest()
+
+
+def load_bands(path, reduce='sum'):
+    # WorldClim future layers are stored as Band1..Band12 with the latitude axis flipped.
+    ds = xr.open_dataset(path)
+    bands = [ds[f'Band{i}'] for i in range(1, 13)]
+    return sum(bands) if reduce == 'sum' else sum(bands) / 12
+
+
+def load_annual_climate(suffix):
+    """
+    Load annual precipitation (sum) and mean tmin/tmax for an observed year or a future scenario.
+
+    Returns:
+        tuple: (ppt, tmin, tmax) xarray DataArrays on the TerraClimate grid.
+    """
+    ppt_path, tmin_path, tmax_path = climate_paths(suffix)
+    if isinstance(suffix, str) and suffix.startswith("2050"):
+        ppt = load_bands(ppt_path, 'sum')[::-1, :]
+        tmin = load_bands(tmin_path, 'mean')[::-1, :]
+        tmax = load_bands(tmax_path, 'mean')[::-1, :]
+    else:
+        ppt = xr.open_dataset(ppt_path)['ppt'].sum(dim='time')
+        tmin = xr.open_dataset(tmin_path)['tmin'].mean(dim='time')
+        tmax = xr.open_dataset(tmax_path)['tmax'].mean(dim='time')
+    return ppt, tmin, tmax
+
+
+def load_static_layers():
+    """Read the elevation raster (with its transform) and the boolean landmask."""
+    with rasterio.open(elevation_path) as elev_src:
+        elev = elev_src.read(1)
+        transform = elev_src.transform
+    with rasterio.open(landmask_path) as lm_src:
+        landmask = lm_src.read(1).astype(bool)
+    return elev, transform, landmask
+
+
+# ========== FEATURE EXTRACTION (ONE YEAR) ==========
+def _sample_points(lats, lons, ppt, tmin, tmax, elev, transform, landmask):
+    # Vectorised version of the per-row .sel(method='nearest') lookups in the notebook.
+    if len(lats) == 0:
+        return np.empty((0, len(FEATURE_COLUMNS)))
+    rows, cols = rowcol(transform, lons, lats)
+    rows, cols = np.asarray(rows), np.asarray(cols)
+    inside = (rows >= 0) & (rows < landmask.shape[0]) & (cols >= 0) & (cols < landmask.shape[1])
+    on_land = np.zeros(len(rows), dtype=bool)
+    on_land[inside] = landmask[rows[inside], cols[inside]]
+
+    lat_sel = xr.DataArray(lats[on_land], dims="points")
+    lon_sel = xr.DataArray(lons[on_land], dims="points")
+    feats = np.column_stack([
+        ppt.sel(lat=lat_sel, lon=lon_sel, method='nearest').values,
+        tmin.sel(lat=lat_sel, lon=lon_sel, method='nearest').values,
+        tmax.sel(lat=lat_sel, lon=lon_sel, method='nearest').values,
+        elev[rows[on_land], cols[on_land]],
+    ]).astype(float)
+    return feats[~np.isnan(feats).any(axis=1)]
+
+
+def extract_year_features(year, occurrences, elev, transform, landmask,
+                          absence_ratio=2, test_size=0.3, seed=42, max_absence_batches=50):
+    """
+    Build presence and pseudo-absence features for a single year.
+
+    Each year draws its pseudo-absences and its train/test split from its own seeded
+    generator, so adding a new year never reshuffles the rows already in the store.
+
+    Parameters:
+        year (int): Year to process.
+        occurrences (pd.DataFrame): Occurrence records with latitude, longitude and year.
+        elev (ndarray): Elevation aligned with the climate grid.
+        transform (Affine): Raster transform of the elevation grid.
+        landmask (ndarray): Boolean land mask.
+        absence_ratio (int): Pseudo-absences drawn per presence (notebook default is 2).
+        test_size (float): Fraction of rows held out for evaluation.
+        seed (int): Base random seed; the year is added to it.
+        max_absence_batches (int): Sampling rounds before giving up on reaching the
+            absence target (a warning reports the shortfall).
+
+    Returns:
+        pd.DataFrame: Rows with year, label, split and FEATURE_COLUMNS.
+    """
+    rng = np.random.default_rng(seed + int(year))
+    ppt, tmin, tmax = load_annual_climate(year)
+
+    presences = occurrences[occurrences['year'] == year]
+    pres = _sample_points(presences['latitude'].values.astype(float),
+                          presences['longitude'].values.astype(float),
+                          ppt, tmin, tmax, elev, transform, landmask)
+
+    # Draw candidate absences in batches rather than one point per loop iteration.
+    n_absent = len(presences) * absence_ratio
+    lats, lons = ppt.lat.values, ppt.lon.values
+    absent_blocks, found = [], 0
+    for _ in range(max_absence_batches):
+        if found >= n_absent:
+            break
+        batch = max(4 * (n_absent - found), 64)
+        feats = _sample_points(rng.choice(lats, batch), rng.choice(lons, batch),
+                               ppt, tmin, tmax, elev, transform, landmask)
+        feats = feats[:n_absent - found]
+        absent_blocks.append(feats)
+        found += len(feats)
+    if found < n_absent:
+        warnings.warn(f"{year}: only {found} of {n_absent} pseudo-absences found on land "
+                      f"after {max_absence_batches} sampling batches")
+    absent = np.vstack(absent_blocks) if absent_blocks else np.empty((0, len(FEATURE_COLUMNS)))
+
+    df = pd.DataFrame(np.vstack([pres, absent]), columns=FEATURE_COLUMNS)
+    df.insert(0, "label", np.r_[np.ones(len(pres), dtype=int), np.zeros(len(absent), dtype=int)])
+    df.insert(0, "year", int(year))
+    df.insert(2, "split", np.where(rng.random(len(df)) < test_size, "test", "train"))
+    return df
+
+
+# ========== FEATURE STORE + MANIFEST ==========
+def load_feature_store(output_dir):
+    path = os.path.join(output_dir, STORE_NAME)
+    if os.path.exists(path):
+        return pd.read_csv(path)
+    return pd.DataFrame(columns=["year", "label", "split"] + FEATURE_COLUMNS)
+
+
+def load_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {"inputs": {}, "model": {}, "maps": {}}
+
+
+def save_manifest(output_dir, manifest):
+    with open(os.path.join(output_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def update_feature_store(occurrence_csv, output_dir, years, force=False):
+    """
+    Extract features only for years that are missing from the store or whose inputs changed.
+
+    Parameters:
+        occurrence_csv (str): Cleaned occurrence CSV (latitude, longitude, year).
+        output_dir (str): Species output folder holding the store and manifest.
+        years (list): Every year the model should cover, including any new one.
+        force (bool): Re-extract all years regardless of the manifest.
+
+    Returns:
+        tuple: (feature store DataFrame, list of years that were (re)extracted)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    occurrences = pd.read_csv(occurrence_csv)[['latitude', 'longitude', 'year']].dropna()
+    occurrences = occurrences[occurrences['year'].isin(years)]
+
+    store = load_feature_store(output_dir)
+    manifest = load_manifest(output_dir)
+    elev, transform, landmask = load_static_layers()
+
+    changed = []
+    for year in years:
+        rows = occurrences[occurrences['year'] == year].round(6).to_csv(index=False)
+        fp = fingerprint_files(climate_paths(year), extra=rows)
+        if not force and manifest["inputs"].get(str(year)) == fp:
+            continue
+        print(f"Extracting features for {year}...")
+        year_df = extract_year_features(year, occurrences, elev, transform, landmask)
+        store = pd.concat([store[store["year"] != year], year_df], ignore_index=True)
+        manifest["inputs"][str(year)] = fp
+        changed.append(year)
+
+    if changed:
+        store.sort_values(["year", "label"], ascending=[True, False], inplace=True)
+        store.to_csv(os.path.join(output_dir, STORE_NAME), index=False)
+        save_manifest(output_dir, manifest)
+    print(f"Feature store: {len(store)} rows, updated years: {changed or 'none'}")
+    return store, changed
+
+
+# ========== RETRAINING ==========
+def training_fingerprint(store, years=None):
+    """
+    Order-independent hash of the training rows of the feature store.
+
+    Parameters:
+        store (pd.DataFrame): Feature store.
+        years (list, optional): Only hash the training rows of these years.
+
+    Returns:
+        str: Hex digest of the (year, label, features) training rows.
+    """
+    train = store[store["split"] == "train"]
+    if years is not None:
+        train = train[train["year"].isin(years)]
+    rows = train[["year", "label"] + FEATURE_COLUMNS].astype(
+        {"year": np.int64, "label": np.int64, **{c: np.float64 for c in FEATURE_COLUMNS}})
+    row_hashes = np.sort(pd.util.hash_pandas_object(rows, index=False).to_numpy())
+    return hashlib.sha1(row_hashes.tobytes()).hexdigest()
+
+
+def can_warm_start(store, changed, previous_inputs, model_state):
+    """
+    True when the saved model can keep its trees and just absorb the changed years.
+
+    That holds only if every changed year is new (never extracted before, not part of the
+    model's training years) and the training rows the model was fitted on are still in
+    the store unchanged. Re-extracted past years, or a model without a recorded training
+    set (e.g. the notebook's pickle), need a full refit: the old trees would otherwise
+    keep superseded rows, or rows that are now in the test split.
+
+    Parameters:
+        store (pd.DataFrame): Feature store after this update.
+        changed (list): Years (re)extracted in this update.
+        previous_inputs (dict): manifest["inputs"] before this update.
+        model_state (dict): manifest["model"] as written by the last training run.
+    """
+    train_years = model_state.get("train_years")
+    if train_years is None or "train_rows" not in model_state:
+        return False
+    if any(str(year) in previous_inputs or int(year) in train_years for year in changed):
+        return False
+    return training_fingerprint(store, train_years) == model_state["train_rows"]
+
+
+def retrain_model(store, model_path, trees_per_update=50, n_estimators=200, warm_start=True, max_trees=500):
+    """
+    Retrain the SDM from the feature store, adding trees when the backend supports warm starts.
+
+    With a RandomForest (or any estimator exposing ``warm_start``) and ``warm_start=True``
+    the existing trees are kept and ``trees_per_update`` new trees are fitted on the full
+    training set, so the model absorbs the new year without refitting from scratch.
+    Otherwise - no saved model, ``warm_start=False``, an estimator lacking warm starts, or
+    a forest that would grow past ``max_trees`` - the model is refitted from scratch with
+    ``n_estimators`` trees.
+
+    Returns:
+        tuple: (model, number of trees kept from the previous model; 0 after a full refit)
+    """
+    train = store[store["split"] == "train"]
+    test = store[store["split"] == "test"]
+    X_train, y_train = train[FEATURE_COLUMNS].values, train["label"].values.astype(int)
+
+    if os.path.exists(model_path):
+        with open(model_path, 'rb') as f:
+            model = pickle.load(f)
+    else:
+        model = RandomForestClassifier(n_estimators=n_estimators, random_state=42, n_jobs=-1)
+
+    n_before = len(getattr(model, "estimators_", []))
+    if warm_start and n_before and hasattr(model, "warm_start") and n_before + trees_per_update <= max_trees:
+        model.set_params(warm_start=True, n_estimators=n_before + trees_per_update)
+    else:
+        if warm_start and n_before + trees_per_update > max_trees:
+            print(f"[INFO] Forest would exceed {max_trees} trees; refitting from scratch.")
+        # Full refit: drop the old trees and start again at the base size
+        params = model.get_params()
+        model.set_params(**{k: v for k, v in (("warm_start", False), ("n_estimators", n_estimators)) if k in params})
+        n_before = 0  # every map needs a full prediction
+    model.fit(X_train, y_train)
+
+    if len(test) and len(np.unique(test["label"])) > 1:
+        auc = roc_auc_score(test["label"].astype(int), model.predict_proba(test[FEATURE_COLUMNS].values)[:, 1])
+        print(f"Model retrained ({n_before} -> {len(model.estimators_)} trees). AUC: {auc:.3f}")
+
+    with open(model_path, 'wb') as f:
+        pickle.dump(model, f)
+    return model, n_before
+
+
+# ========== PREDICTION ==========
+def grid_features(suffix, elev, landmask):
+    """Flatten the climate + elevation grid for one map and return (features, valid mask, shape)."""
+    ppt, tmin, tmax = load_annual_climate(suffix)
+    flat = np.stack([ppt.values.ravel(), tmin.values.ravel(), tmax.values.ravel(), elev.ravel()], axis=1)
+    valid = (~np.isnan(flat).any(axis=1)) & landmask.ravel()
+    return flat[valid], valid, ppt.values.shape
+
+
+def model_fingerprint(model, n_trees=None):
+    """
+    Identify a fitted model by its hyper-parameters and its first ``n_trees`` trees.
+
+    ``n_estimators`` and ``warm_start`` are left out because warm starts change them, so
+    the fingerprint of the first n trees of a grown forest equals the fingerprint of the
+    forest before it grew. A refitted or swapped model gets a different fingerprint even
+    when its tree count is the same.
+
+    Returns:
+        str: Hex digest of the model state.
+    """
+    params = {k: v for k, v in model.get_params().items() if k not in ("n_estimators", "warm_start")}
+    h = hashlib.sha1(repr(sorted(params.items())).encode())
+    if not hasattr(model, "estimators_"):
+        # Not a forest: fall back to the pickled model (at worst a needless full prediction)
+        h.update(pickle.dumps(model))
+        return h.hexdigest()
+    for tree in model.estimators_[:n_trees]:
+        # The node arrays define what a tree predicts; pickled bytes are not stable across reloads
+        t = tree.tree_
+        for arr in (t.feature, t.threshold, t.children_left, t.children_right, t.value):
+            h.update(np.ascontiguousarray(arr).tobytes())
+    return h.hexdigest()
+
+
+def tree_proba_sum(estimators, X):
+    """Sum of per-tree presence probabilities; RandomForest.predict_proba is this sum / n_trees."""
+    total = np.zeros(len(X))
+    for tree in estimators:
+        total += tree.predict_proba(X)[:, 1]
+    return total
+
+
+def refresh_maps(model, n_before, output_dir, years, scenarios=future_scenarios):
+    """
+    Bring every suitability map up to date with the current model and inputs.
+
+    A map is recomputed in full when it is missing, its climate inputs changed or it was
+    made by a model other than this one (compared by model_fingerprint, not tree count).
+    Maps made by exactly the first ``n_before`` trees of this forest are updated in place
+    by evaluating just the new trees and blending them with the stored probabilities.
+    """
+    manifest = load_manifest(output_dir)
+    elev, _, landmask = load_static_layers()
+    n_total = len(getattr(model, "estimators_", []))
+    model_fp = model_fingerprint(model)
+    base_fp = model_fingerprint(model, n_before) if n_before else None
+
+    targets = [(year, year, str(year)) for year in years]
+    targets += [(fy, suffix, label) for fy, labels in scenarios.items() for label, suffix in labels.items()]
+
+    for year, suffix, label in targets:
+        npy_path = os.path.join(output_dir, f"suitability_map_{year}_{label}.npy")
+        input_fp = fingerprint_files(climate_paths(suffix))
+        state = manifest["maps"].get(label, {})
+        same_inputs = state.get("inputs") == input_fp and os.path.exists(npy_path)
+
+        if same_inputs and state.get("model") == model_fp:
+            continue
+
+        X, valid, shape = grid_features(suffix, elev, landmask)
+        if same_inputs and base_fp and state.get("model") == base_fp:
+            print(f"Updating {label} with {n_total - n_before} new trees")
+            flat = np.load(npy_path).ravel()
+            new_sum = tree_proba_sum(model.estimators_[n_before:], X)
+            flat[valid] = (flat[valid] * n_before + new_sum) / n_total
+        else:
+            print(f"Predicting {label} from scratch")
+            flat = np.full(valid.size, np.nan)
+            flat[valid] = model.predict_proba(X)[:, 1]
+        suitability_map = flat.reshape(shape)
+        suitability_map[~landmask] = np.nan
+        np.save(npy_path, suitability_map)
+
+        manifest["maps"][label] = {"inputs": input_fp, "model": model_fp, "trees": n_total}
+        save_manifest(output_dir, manifest)
+
+
+def run_incremental_update(occurrence_csv, output_dir, model_name, years, trees_per_update=50, max_trees=500):
+    """
+    Yearly refresh: extract features for new/changed years, grow the model and refresh the maps.
+
+    Parameters:
+        occurrence_csv (str): Cleaned occurrence CSV for the species.
+        output_dir (str): Species output folder (e.g. 'sdm_final' or 'sdm_takin').
+        model_name (str): Pickle file name inside output_dir.
+        years (list): All observed years, including the newly arrived one.
+        trees_per_update (int): Trees added per refresh when warm starting.
+        max_trees (int): Forest size at which the next update refits from scratch instead.
+    """
+    previous_inputs = dict(load_manifest(output_dir)["inputs"])
+    store, changed = update_feature_store(occurrence_csv, output_dir, years)
+    model_path = os.path.join(output_dir, model_name)
+    manifest = load_manifest(output_dir)
+    model_state = manifest.get("model", {})
+
+    if changed or not os.path.exists(model_path):
+        warm = can_warm_start(store, changed, previous_inputs, model_state)
+        if not warm and os.path.exists(model_path):
+            print("[INFO] Past years or the model's training rows changed; refitting from scratch.")
+        model, n_before = retrain_model(store, model_path, trees_per_update, warm_start=warm, max_trees=max_trees)
+        train_years = sorted(int(y) for y in store.loc[store["split"] == "train", "year"].unique())
+        model_state = {"train_years": train_years, "train_rows": training_fingerprint(store, train_years)}
+    else:
+        with open(model_path, 'rb') as f:
+            model = pickle.load(f)
+        n_before = len(getattr(model, "estimators_", []))
+
+    manifest["model"] = {**model_state, "path": model_name, "trees": len(getattr(model, "estimators_", [])),
+                         "fingerprint": model_fingerprint(model)}
+    save_manifest(output_dir, manifest)
+    refresh_maps(model, n_before, output_dir, years)
+    return model
+
+
+if __name__ == "__main__":
+    run_incremental_update("wild_yak_Final_cleaned.csv", "sdm_final", "random_forest_model.pkl",
+                           years=list(range(2009, 2026)))
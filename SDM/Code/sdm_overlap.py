@@ -0,0 +1,146 @@
+import os
+import numpy as np
+import pandas as pd
+
+from sdm_zonal import load_grid, row_pixel_area_km2
+
+
+def species_map_paths(output_dir, species, years, future_labels=("SSP245", "SSP585")):
+    """{'<species>_<label>': path} for the notebook's observed-year and 2050 scenario map names."""
+    paths = {f"{species}_{year}": os.path.join(output_dir, f"suitability_map_{year}_{year}.npy") for year in years}
+    for label in future_labels:
+        paths[f"{species}_2050_{label}"] = os.path.join(output_dir, f"suitability_map_2050_{label}.npy")
+    return paths
+
+
+def matching_pairs(species_a, species_b, labels):
+    """Same year/scenario pairs between two species, e.g. yak_2015 vs takin_2015 for every label."""
+    return [(f"{species_a}_{label}", f"{species_b}_{label}") for label in labels]
+
+
+def _row_tiles(n_rows, tile_rows):
+    for start in range(0, n_rows, tile_rows):
+        yield start, min(start + tile_rows, n_rows)
+
+
+def niche_overlap(map_paths, pairs, threshold=0.5, tile_rows=256, zone_layer=None,
+                  output_csv=None, zones_csv=None):
+    """
+    Schoener's D, Warren's I and range-overlap areas for any number of map pairs.
+
+    Maps are memory-mapped and streamed in blocks of ``tile_rows`` rows, so memory stays
+    at one tile per map however large the grid is. Every pair is evaluated in the same
+    sweep: the first pass accumulates the normalising sums, Warren's I and the areas, and
+    the second pass accumulates the |pA - pB| term needed for D.
+
+    Both metrics use suitability normalised to sum to one over cells valid in both maps:
+        D = 1 - 0.5 * sum(|pA - pB|)
+        I = 1 - 0.5 * sum((sqrt(pA) - sqrt(pB))^2) = sum(sqrt(pA * pB))
+
+    Parameters:
+        map_paths (dict): {key: suitability_map .npy path} for every map used in `pairs`.
+        pairs (list): (key_a, key_b) tuples to compare.
+        threshold (float): Suitability above which a cell is counted in a range.
+        tile_rows (int): Rows per streamed block.
+        zone_layer (dict, optional): Layer from sdm_zonal.build_zone_layer; adds the jointly
+            suitable area per zone.
+        output_csv (str, optional): Where to write the pair metrics.
+        zones_csv (str, optional): Where to write the per-zone joint area table.
+
+    Returns:
+        tuple: (pair metrics DataFrame, per-zone DataFrame or None)
+    """
+    keys = sorted({k for pair in pairs for k in pair})
+    missing = [k for k in keys if not os.path.exists(map_paths[k])]
+    if missing:
+        print(f"Missing maps skipped: {missing}")
+        pairs = [(a, b) for a, b in pairs if a not in missing and b not in missing]
+        keys = [k for k in keys if k not in missing]
+    if not keys or not pairs:
+        raise ValueError("No pair has both suitability maps; missing files: "
+                         + ", ".join(map_paths[k] for k in missing))
+    maps = {k: np.load(map_paths[k], mmap_mode='r') for k in keys}
+
+    shape = maps[keys[0]].shape
+    transform, grid_shape, _ = load_grid()
+    if grid_shape != shape:
+        raise ValueError(f"Map shape {shape} does not match reference grid {grid_shape}")
+    row_area = row_pixel_area_km2(transform, shape[0])
+
+    zones = zone_names = None
+    if zone_layer is not None:
+        zones, zone_names = zone_layer["zones"], zone_layer["names"]
+    n_zone_bins = len(zone_names) + 1 if zone_names else 0
+
+    n = len(pairs)
+    sum_a, sum_b, sum_sqrt = np.zeros(n), np.zeros(n), np.zeros(n)
+    area_a, area_b, area_both = np.zeros(n), np.zeros(n), np.zeros(n)
+    zone_area = np.zeros((n, n_zone_bins))
+
+    # --- Pass 1: normalising sums, Warren's I numerator, range areas ---
+    for r0, r1 in _row_tiles(shape[0], tile_rows):
+        tiles = {k: np.asarray(m[r0:r1], dtype=float) for k, m in maps.items()}
+        area = np.broadcast_to(row_area[r0:r1, None], tiles[keys[0]].shape)
+        z_tile = np.asarray(zones[r0:r1]).astype(np.int64) + 1 if zones is not None else None
+        for idx, (ka, kb) in enumerate(pairs):
+            a, b = tiles[ka], tiles[kb]
+            valid = ~(np.isnan(a) | np.isnan(b))
+            av, bv = a[valid], b[valid]
+            sum_a[idx] += av.sum()
+            sum_b[idx] += bv.sum()
+            sum_sqrt[idx] += np.sqrt(av * bv).sum()
+
+            suit_a = valid & (a > threshold)
+            suit_b = valid & (b > threshold)
+            both = suit_a & suit_b
+            area_a[idx] += area[suit_a].sum()
+            area_b[idx] += area[suit_b].sum()
+            area_both[idx] += area[both].sum()
+            if z_tile is not None:
+                zone_area[idx] += np.bincount(z_tile[both], weights=area[both], minlength=n_zone_bins)
+
+    # --- Pass 2: Schoener's D needs the totals from pass 1 ---
+    abs_diff = np.zeros(n)
+    for r0, r1 in _row_tiles(shape[0], tile_rows):
+        tiles = {k: np.asarray(m[r0:r1], dtype=float) for k, m in maps.items()}
+        for idx, (ka, kb) in enumerate(pairs):
+            a, b = tiles[ka], tiles[kb]
+            valid = ~(np.isnan(a) | np.isnan(b))
+            abs_diff[idx] += np.abs(a[valid] / sum_a[idx] - b[valid] / sum_b[idx]).sum()
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        union = area_a + area_b - area_both
+        result = pd.DataFrame({
+            "Map_A": [a for a, _ in pairs],
+            "Map_B": [b for _, b in pairs],
+            "Schoeners_D": 1 - 0.5 * abs_diff,
+            "Warrens_I": sum_sqrt / np.sqrt(sum_a * sum_b),
+            "Suitable_Area_A_km2": area_a,
+            "Suitable_Area_B_km2": area_b,
+            "Overlap_Area_km2": area_both,
+            "Overlap_Share_of_A": area_both / area_a,
+            "Overlap_Share_of_B": area_both / area_b,
+            "Range_Jaccard": area_both / union,
+        })
+    if output_csv:
+        result.to_csv(output_csv, index=False)
+        print(f"Niche overlap table saved to: {output_csv}")
+
+    zone_df = None
+    if zone_names:
+        zone_df = pd.DataFrame(zone_area[:, 1:], columns=zone_names)
+        zone_df.insert(0, "Map_B", result["Map_B"])
+        zone_df.insert(0, "Map_A", result["Map_A"])
+        if zones_csv:
+            zone_df.to_csv(zones_csv, index=False)
+            print(f"Jointly suitable area per zone saved to: {zones_csv}")
+    return result, zone_df
+
+
+if __name__ == "__main__":
+    years = list(range(2009, 2025))
+    labels = [str(y) for y in years] + ["2050_SSP245", "2050_SSP585"]
+    paths = {**species_map_paths("sdm_final", "yak", years), **species_map_paths("sdm_takin", "takin", years)}
+    overlap_df, _ = niche_overlap(paths, matching_pairs("yak", "takin", labels),
+                                  output_csv="niche_overlap_yak_takin.csv")
+    print(overlap_df)
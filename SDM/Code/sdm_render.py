@@ -0,0 +1,197 @@
+import os
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import cartopy.crs as ccrs
+import cartopy.feature as cfeature
+from scipy.ndimage import zoom, gaussian_filter
+from concurrent.futures import ProcessPoolExecutor
+
+# ========== CONFIGURATION ==========
+MAP_EXTENT = [40, 140, -5, 60]  # lon_min, lon_max, lat_min, lat_max shown on every map
+COUNTRY_LABELS = {
+    'India': ((78, 22), 9), 'China': ((104, 35), 10), 'Nepal': ((84, 28.5), 8),
+    'Mongolia': ((103, 47), 9), 'Bangladesh': ((90, 24), 8), 'Pakistan': ((70, 30), 8),
+    'Afghanistan': ((66, 34), 8), 'Bhutan': ((91.5, 27.5), 7),
+    'Myanmar': ((96, 21), 8), 'Kazakhstan': ((70, 48), 9)
+}
+
+
+def grid_coords(shape):
+    """Cell-centre latitude/longitude vectors for a global grid (north-up, lon -180..180)."""
+    n_lat, n_lon = shape
+    dlat, dlon = 180.0 / n_lat, 360.0 / n_lon
+    lats = 90 - dlat * (np.arange(n_lat) + 0.5)
+    lons = -180 + dlon * (np.arange(n_lon) + 0.5)
+    return lats, lons
+
+
+def clip_and_smooth(suitability_map, lats, lons, extent=MAP_EXTENT, threshold=0.5,
+                    upscale=3, sigma=1.2, margin=4):
+    """
+    Threshold, upsample and smooth only the part of the map that is actually drawn.
+
+    The notebook zooms and filters the full global grid before Cartopy throws most of it
+    away; here the grid is cut to the display extent (plus a few pixels so the Gaussian
+    kernel sees the same neighbourhood at the edges) first.
+
+    Parameters:
+        suitability_map (ndarray): Suitability grid (NaN outside land).
+        lats, lons (ndarray): Cell-centre coordinates of the grid rows and columns.
+        extent (list): [lon_min, lon_max, lat_min, lat_max] of the displayed region.
+        threshold (float): Values at or below this are hidden, as in predict_and_plot.
+        upscale (int): Zoom factor for display.
+        sigma (float): Gaussian smoothing on the upsampled grid.
+        margin (int): Extra source pixels kept around the extent.
+
+    Returns:
+        tuple: (smoothed display array, imshow extent of that array)
+    """
+    lon_min, lon_max, lat_min, lat_max = extent
+    rows = np.where((lats >= lat_min) & (lats <= lat_max))[0]
+    cols = np.where((lons >= lon_min) & (lons <= lon_max))[0]
+    r0, r1 = max(rows[0] - margin, 0), min(rows[-1] + margin + 1, len(lats))
+    c0, c1 = max(cols[0] - margin, 0), min(cols[-1] + margin + 1, len(lons))
+
+    display_map = np.array(suitability_map[r0:r1, c0:c1], dtype=float)
+    display_map[display_map <= threshold] = np.nan
+    smooth_map = gaussian_filter(zoom(display_map, upscale, order=1), sigma=sigma)
+
+    sub_lats, sub_lons = lats[r0:r1], lons[c0:c1]
+    img_extent = [float(sub_lons.min()), float(sub_lons.max()), float(sub_lats.min()), float(sub_lats.max())]
+    return smooth_map, img_extent
+
+
+class SuitabilityRenderer:
+    """
+    One Cartopy figure whose basemap, labels and colorbar are drawn once.
+
+    Each call to ``render`` only swaps the suitability image data, title and colorbar
+    label before saving, so per-frame cost is the PNG encode rather than rebuilding
+    stock_img, LAND, BORDERS and COASTLINE.
+    """
+
+    def __init__(self, species_name="Wild Yak", extent=MAP_EXTENT, dpi=300):
+        self.species_name = species_name
+        self.dpi = dpi
+        # Figure + Agg canvas directly, so importing this module leaves the pyplot backend alone
+        self.fig = Figure(figsize=(12, 8))
+        FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot(projection=ccrs.PlateCarree())
+        self.ax.set_extent(extent, crs=ccrs.PlateCarree())
+        self.ax.stock_img()
+        self.ax.add_feature(cfeature.LAND, facecolor='lightgray')
+        self.ax.add_feature(cfeature.BORDERS, linewidth=0.4)
+        self.ax.add_feature(cfeature.COASTLINE, linewidth=0.4)
+
+        self.img = self.ax.imshow(np.full((2, 2), np.nan), cmap='YlOrRd', alpha=0.4,
+                                  extent=extent, transform=ccrs.PlateCarree(), vmin=0.5, vmax=1)
+        self.cbar = self.fig.colorbar(self.img, ax=self.ax, orientation='horizontal', pad=0.05, shrink=0.75)
+        self.title = self.ax.set_title("", fontsize=14)
+
+        self.ax.annotate('', xy=(0.94, 0.88), xytext=(0.94, 0.82),
+                         xycoords='axes fraction', arrowprops=dict(facecolor='black', arrowstyle='-|>', lw=1.5))
+        self.ax.text(0.94, 0.89, 'N', transform=self.ax.transAxes,
+                     horizontalalignment='center', verticalalignment='bottom',
+                     fontsize=12, fontweight='bold', color='black')
+        for name, ((lon, lat), fontsize) in COUNTRY_LABELS.items():
+            self.ax.text(lon, lat, name, transform=ccrs.PlateCarree(),
+                         fontsize=fontsize, fontweight='bold', ha='center', color='black',
+                         bbox=dict(facecolor='white', alpha=0.6, boxstyle='round,pad=0.2'))
+
+    def render(self, smooth_map, img_extent, year, label, save_path):
+        self.img.set_data(smooth_map)
+        self.img.set_extent(img_extent)
+        self.cbar.set_label(f"{self.species_name} Suitability ({label})")
+        self.title.set_text(f"{self.species_name} Habitat Suitability - {year}")
+        self.fig.savefig(save_path, dpi=self.dpi, bbox_inches='tight')
+        return save_path
+
+
+# Per-process renderer built once by the pool initializer.
+_renderer = None
+
+
+def _init_worker(species_name, dpi):
+    global _renderer
+    _renderer = SuitabilityRenderer(species_name, dpi=dpi)
+
+
+def _render_frame(job):
+    npy_path, year, label, save_path = job
+    suitability_map = np.load(npy_path, mmap_mode='r')
+    lats, lons = grid_coords(suitability_map.shape)
+    smooth_map, img_extent = clip_and_smooth(suitability_map, lats, lons)
+    return _renderer.render(smooth_map, img_extent, year, label, save_path)
+
+
+def map_jobs(output_dir, file_prefix, years, future_scenarios=None):
+    """List (npy, year, label, png) jobs for saved maps, using the notebook's file names."""
+    targets = [(year, str(year)) for year in years]
+    for future_year, scenarios in (future_scenarios or {}).items():
+        targets += [(future_year, label) for label in scenarios]
+    jobs = []
+    for year, label in targets:
+        npy_path = os.path.join(output_dir, f"suitability_map_{year}_{label}.npy")
+        if not os.path.exists(npy_path):
+            print(f"Missing file: {npy_path}")
+            continue
+        png_path = os.path.join(output_dir, f"{file_prefix}_suitability_{year}_{label}.png")
+        jobs.append((npy_path, year, label, png_path))
+    return jobs
+
+
+def render_maps(output_dir, species_name, file_prefix, years, future_scenarios=None,
+                max_workers=None, dpi=300):
+    """
+    Render all saved suitability maps for a species in parallel worker processes.
+
+    Parameters:
+        output_dir (str): Folder with suitability_map_*.npy files; PNGs are written here.
+        species_name (str): Used in titles and colorbar labels (e.g. 'Wild Yak').
+        file_prefix (str): PNG prefix, e.g. 'yak' -> yak_suitability_2015_2015.png.
+        years (list): Observed years to render.
+        future_scenarios (dict, optional): {2050: {"SSP585": ..., "SSP245": ...}}.
+        max_workers (int, optional): Number of rendering processes.
+        dpi (int): Output resolution.
+
+    Returns:
+        list: Paths of the written PNG frames, in year order.
+    """
+    jobs = map_jobs(output_dir, file_prefix, years, future_scenarios)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(species_name, dpi)) as pool:
+        frames = list(pool.map(_render_frame, jobs))
+    print(f"Rendered {len(frames)} maps to {output_dir}")
+    return frames
+
+
+def save_animation(frames, gif_path, duration_ms=800, width=1200):
+    """Stitch rendered PNG frames into an animated GIF (downscaled to `width` pixels)."""
+    from PIL import Image
+
+    images = []
+    for path in frames:
+        with Image.open(path) as im:
+            im = im.convert("RGB")
+            height = int(im.height * width / im.width)
+            images.append(im.resize((width, height), Image.LANCZOS))
+    # bbox_inches='tight' can vary the frame size by a few pixels; pad to the largest frame.
+    max_h = max(im.height for im in images)
+    images = [im if im.height == max_h else _pad(im, max_h) for im in images]
+    images[0].save(gif_path, save_all=True, append_images=images[1:], duration=duration_ms, loop=0)
+    print(f"Animation saved: {gif_path}")
+    return gif_path
+
+
+def _pad(im, height):
+    from PIL import Image
+    canvas = Image.new("RGB", (im.width, height), "white")
+    canvas.paste(im, (0, 0))
+    return canvas
+
+
+if __name__ == "__main__":
+    frames = render_maps("sdm_final", "Wild Yak", "yak", list(range(2009, 2025)),
+                         {2050: {"SSP245": "2050245", "SSP585": "2050585"}})
+    save_animation(frames, os.path.join("sdm_final", "yak_suitability_animation.gif"))
@@ -0,0 +1,219 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+import rasterio
+from rasterio.features import rasterize
+
+# ========== CONFIGURATION ==========
+elevation_path = "elevation_resampled_to_climate.tif"
+EARTH_RADIUS_KM = 6371.0072  # authalic radius, keeps cell areas summing to the true sphere area
+NO_ZONE = -1
+
+
+# ========== GRID GEOMETRY ==========
+def load_grid(reference_path=None):
+    """Return (transform, shape, crs) of the reference raster all suitability maps are aligned to."""
+    with rasterio.open(reference_path or elevation_path) as src:
+        return src.transform, (src.height, src.width), src.crs
+
+
+def row_pixel_area_km2(transform, n_rows):
+    """
+    True area of one pixel in each grid row of a regular lat/lon grid.
+
+    A cell between latitudes phi1 and phi2 spanning dlon radians covers
+    R^2 * dlon * |sin(phi1) - sin(phi2)|, which shrinks towards the poles instead of
+    staying at the constant 13.67 km^2 used by the area-trend cells.
+
+    Returns:
+        ndarray: float64 vector of length n_rows (km^2 per pixel).
+    """
+    top = transform.f + transform.e * np.arange(n_rows)
+    bottom = top + transform.e
+    top, bottom = np.clip(top, -90, 90), np.clip(bottom, -90, 90)
+    dlon = np.deg2rad(abs(transform.a))
+    return EARTH_RADIUS_KM ** 2 * dlon * np.abs(np.sin(np.deg2rad(top)) - np.sin(np.deg2rad(bottom)))
+
+
+# ========== ZONE LAYERS ==========
+def _fingerprint(spec):
+    return hashlib.sha1(json.dumps(spec, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _source_stamp(path):
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}:{st.st_size}:{int(st.st_mtime)}"
+
+
+def polygon_zones(vector_path, name_column, transform, shape):
+    """Rasterize polygons (countries, protected areas, ...) into integer zone ids."""
+    import geopandas as gpd
+
+    gdf = gpd.read_file(vector_path).to_crs("EPSG:4326")
+    gdf = gdf[gdf.geometry.notna()].reset_index(drop=True)
+    names = gdf[name_column].astype(str).tolist()
+    zones = rasterize(((geom, idx) for idx, geom in enumerate(gdf.geometry)),
+                      out_shape=shape, transform=transform, fill=NO_ZONE, dtype="int32")
+    return zones, names
+
+
+def elevation_band_zones(band_edges, reference_path=None):
+    """Zone ids from elevation bands, e.g. edges [0, 1000, 2000, 3000, 4000, 5000, 9000]."""
+    with rasterio.open(reference_path or elevation_path) as src:
+        elev = src.read(1).astype(float)
+        if src.nodata is not None:
+            elev[elev == src.nodata] = np.nan
+    edges = np.asarray(band_edges, dtype=float)
+    zones = np.digitize(elev, edges) - 1
+    zones[(zones < 0) | (zones >= len(edges) - 1) | np.isnan(elev)] = NO_ZONE
+    names = [f"{int(lo)}-{int(hi)} m" for lo, hi in zip(edges[:-1], edges[1:])]
+    return zones.astype("int32"), names
+
+
+def box_zones(boxes, transform, shape):
+    """Zone ids for named lat/lon boxes, e.g. {"Himalaya": (25, 38, 78, 105)} as (lat_min, lat_max, lon_min, lon_max)."""
+    lats = transform.f + transform.e * (np.arange(shape[0]) + 0.5)
+    lons = transform.c + transform.a * (np.arange(shape[1]) + 0.5)
+    zones = np.full(shape, NO_ZONE, dtype="int32")
+    for idx, (lat_min, lat_max, lon_min, lon_max) in enumerate(boxes.values()):
+        rows = (lats >= lat_min) & (lats <= lat_max)
+        cols = (lons >= lon_min) & (lons <= lon_max)
+        zones[np.ix_(rows, cols)] = idx
+    return zones, list(boxes)
+
+
+def build_zone_layer(name, kind, cache_dir="zones", **params):
+    """
+    Build (or load from cache) one integer zone raster aligned to the suitability grid.
+
+    The raster is stored as '<cache_dir>/<name>.npy' with a JSON sidecar holding the zone
+    names and a fingerprint of the parameters and source files, so it is rasterized once
+    and only rebuilt when its inputs change.
+
+    Parameters:
+        name (str): Layer name used for the cache files and in the output table.
+        kind (str): 'polygons', 'elevation_bands' or 'boxes'.
+        cache_dir (str): Where zone rasters are cached.
+        **params: vector_path/name_column, band_edges, or boxes depending on kind.
+
+    Returns:
+        dict: {"name", "zones" (int32 grid, -1 = outside every zone), "names"}
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    transform, shape, _ = load_grid()
+    spec = {"kind": kind, "params": params, "grid": [list(transform)[:6], shape]}
+    for key in ("vector_path",):
+        if key in params:
+            spec[key] = _source_stamp(params[key])
+    if kind == "elevation_bands":
+        spec["elevation"] = _source_stamp(elevation_path)
+    fp = _fingerprint(spec)
+
+    npy_path = os.path.join(cache_dir, f"{name}.npy")
+    meta_path = os.path.join(cache_dir, f"{name}.json")
+    if os.path.exists(npy_path) and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("fingerprint") == fp:
+            return {"name": name, "zones": np.load(npy_path, mmap_mode='r'), "names": meta["names"]}
+
+    print(f"Rasterizing zone layer '{name}' ({kind})...")
+    if kind == "polygons":
+        zones, names = polygon_zones(params["vector_path"], params["name_column"], transform, shape)
+    elif kind == "elevation_bands":
+        zones, names = elevation_band_zones(params["band_edges"])
+    elif kind == "boxes":
+        zones, names = box_zones(params["boxes"], transform, shape)
+    else:
+        raise ValueError(f"Unknown zone layer kind: {kind}")
+
+    np.save(npy_path, zones)
+    with open(meta_path, "w") as f:
+        json.dump({"fingerprint": fp, "names": names}, f, indent=2)
+    return {"name": name, "zones": zones, "names": names}
+
+
+# ========== ZONAL STATISTICS ==========
+def zonal_statistics(map_paths, layers, threshold=0.5, output_csv=None):
+    """
+    Per-zone suitable area, mean suitability and pixel counts for many maps and zone layers.
+
+    Each map is read exactly once; every layer is then summarised with a handful of
+    ``np.bincount`` calls over the flattened zone ids, so adding another layer costs
+    one more bincount pass rather than another read of every map.
+
+    Parameters:
+        map_paths (dict): {label: path to suitability_map_*.npy}.
+        layers (list): Zone layers from build_zone_layer.
+        threshold (float): Suitability above which a pixel counts as suitable habitat.
+        output_csv (str, optional): Where to save the long-format result table.
+
+    Returns:
+        pd.DataFrame: One row per (map, layer, zone).
+    """
+    transform, shape, _ = load_grid()
+    pixel_area = np.repeat(row_pixel_area_km2(transform, shape[0]), shape[1])
+
+    # Zone ids shifted by one so NO_ZONE lands in bin 0 and can be dropped afterwards.
+    flat_layers = []
+    for layer in layers:
+        z = np.asarray(layer["zones"]).ravel().astype(np.int64) + 1
+        n_bins = len(layer["names"]) + 1
+        zone_area = np.bincount(z, weights=pixel_area, minlength=n_bins)
+        flat_layers.append((layer, z, n_bins, zone_area))
+
+    rows = []
+    for label, path in map_paths.items():
+        if not os.path.exists(path):
+            print(f"Missing file: {path}")
+            continue
+        data = np.load(path).ravel()
+        valid = ~np.isnan(data)
+        suitable = valid & (data > threshold)
+        values = np.where(valid, data, 0.0)
+
+        for layer, z, n_bins, zone_area in flat_layers:
+            n_valid = np.bincount(z, weights=valid, minlength=n_bins)
+            suit_sum = np.bincount(z, weights=values, minlength=n_bins)
+            n_suit = np.bincount(z, weights=suitable, minlength=n_bins)
+            suit_area = np.bincount(z, weights=pixel_area * suitable, minlength=n_bins)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean_suit = suit_sum / n_valid
+            for zone_id, zone_name in enumerate(layer["names"], start=1):
+                rows.append({
+                    "Map": label,
+                    "Layer": layer["name"],
+                    "Zone": zone_name,
+                    "Valid_Pixels": int(n_valid[zone_id]),
+                    "Mean_Suitability": mean_suit[zone_id],
+                    "Suitable_Pixels": int(n_suit[zone_id]),
+                    "Suitable_Area_km2": suit_area[zone_id],
+                    "Zone_Area_km2": zone_area[zone_id],
+                })
+
+    result = pd.DataFrame(rows)
+    if output_csv:
+        result.to_csv(output_csv, index=False)
+        print(f"Zonal statistics saved to: {output_csv}")
+    return result
+
+
+def suitability_map_paths(output_dir, years, future_labels=("SSP245", "SSP585")):
+    """{label: path} for the notebook's observed-year and 2050 scenario map names."""
+    paths = {str(year): os.path.join(output_dir, f"suitability_map_{year}_{year}.npy") for year in years}
+    for label in future_labels:
+        paths[f"2050_{label}"] = os.path.join(output_dir, f"suitability_map_2050_{label}.npy")
+    return paths
+
+
+if __name__ == "__main__":
+    layers = [
+        build_zone_layer("himalaya_box", "boxes", boxes={"Himalaya": (25, 38, 78, 105)}),
+        build_zone_layer("elevation_bands", "elevation_bands",
+                         band_edges=[0, 1000, 2000, 3000, 4000, 5000, 9000]),
+    ]
+    stats = zonal_statistics(suitability_map_paths("sdm_takin", range(2009, 2025)), layers,
+                             output_csv=os.path.join("sdm_takin", "zonal_statistics_takin.csv"))
+    print(stats.head(20))